@@ -0,0 +1,187 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .config import (
+    ANSWER_CACHE_ENABLED,
+    ANSWER_CACHE_MAX_ENTRIES,
+    ANSWER_CACHE_SIMILARITY,
+    ANSWER_CACHE_TTL_SECONDS,
+)
+from .metrics import CACHE_REQUESTS
+
+
+def normalize_question(question: str) -> str:
+    """Case, whitespace and trailing punctuation don't change the question."""
+    q = re.sub(r"\s+", " ", question.lower()).strip()
+    return q.rstrip("?!. ")
+
+
+def _entry_key(question: str, scope: str) -> str:
+    # Answers retrieved from different shard selections are different answers.
+    key = normalize_question(question)
+    return f"{scope}\0{key}" if scope else key
+
+
+class AnswerCache:
+    """
+    Cache of generated answers for repeated questions.
+
+    Lookups try an exact match on the normalized question first, then the
+    nearest cached question embedding above `similarity`. Entries expire
+    after `ttl` seconds, the least recently used are evicted beyond
+    `max_entries`, and everything is dropped when the corpus moves to a newer
+    version. Requests still answering from an older version (during a hot
+    swap) neither read nor store answers, so they cannot wipe or overwrite
+    the new version's entries.
+    `scope` names the namespaces a question was answered from; lookups only
+    match entries of the same scope.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, similarity: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity
+        self.version = None
+        # normalized question -> (answer, unit vector or None, stored_at)
+        self._entries: "OrderedDict[str, Tuple[str, Optional[np.ndarray], float]]" = OrderedDict()
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: List[str] = []
+        self._matrix_scopes: Optional[np.ndarray] = None
+        self._matrix_stored_at: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_version(self, version) -> bool:
+        """Move to a newer corpus version; False for a call from an older one."""
+        if self.version is None or version > self.version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._matrix = None
+            self.version = version
+        return version == self.version
+
+    def _expired(self, stored_at: float) -> bool:
+        return time.time() - stored_at > self.ttl
+
+    def get_exact(self, question: str, version, scope: str = "") -> Optional[str]:
+        """Answer for an identical (normalized) question, without embedding it."""
+        key = _entry_key(question, scope)
+        with self._lock:
+            if not self._check_version(version):
+                return None
+            entry = self._entries.get(key)
+            if entry is None or self._expired(entry[2]):
+                return None
+            self._entries.move_to_end(key)
+            self.exact_hits += 1
+        CACHE_REQUESTS.inc(cache="answer", outcome="exact_hit")
+        return entry[0]
+
+    def get_similar(self, vector: List[float], version, scope: str = "") -> Optional[str]:
+        """Answer for the closest cached question, if it is similar enough."""
+        v = _unit(vector)
+        with self._lock:
+            answer = self._nearest(v, version, scope)
+            if answer is None:
+                self.misses += 1
+            else:
+                self.semantic_hits += 1
+        CACHE_REQUESTS.inc(cache="answer", outcome="miss" if answer is None else "semantic_hit")
+        return answer
+
+    def _nearest(self, v: np.ndarray, version, scope: str) -> Optional[str]:
+        if not self._check_version(version):
+            return None
+        if self._matrix is None:
+            self._rebuild_matrix()
+        if not self._matrix_keys:
+            return None
+
+        scores = self._matrix @ v
+        scores[self._matrix_scopes != scope] = -np.inf
+        # Entries may have expired since the matrix was built.
+        scores[time.time() - self._matrix_stored_at > self.ttl] = -np.inf
+        best = int(np.argmax(scores))
+        key = self._matrix_keys[best]
+        entry = self._entries.get(key)
+        if scores[best] < self.similarity or entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(
+        self, question: str, vector: Optional[List[float]], answer: str, version, scope: str = ""
+    ):
+        key = _entry_key(question, scope)
+        with self._lock:
+            if not self._check_version(version):
+                return
+            unit = _unit(vector) if vector is not None else None
+            self._entries[key] = (answer, unit, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._matrix = None
+
+    def _rebuild_matrix(self):
+        now = time.time()
+        for key in [k for k, e in self._entries.items() if now - e[2] > self.ttl]:
+            del self._entries[key]
+        keyed = [(k, e[1], e[2]) for k, e in self._entries.items() if e[1] is not None]
+        self._matrix_keys = [k for k, _, _ in keyed]
+        self._matrix_scopes = np.array(
+            [k.split("\0", 1)[0] if "\0" in k else "" for k in self._matrix_keys], dtype=object
+        )
+        self._matrix_stored_at = np.array([t for _, _, t in keyed], dtype="float64")
+        if keyed:
+            self._matrix = np.vstack([v for _, v, _ in keyed])
+        else:
+            self._matrix = np.zeros((0, 1), dtype="float32")
+
+    def stats(self) -> dict:
+        hits = self.exact_hits + self.semantic_hits
+        total = hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": (hits / total) if total else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+def _unit(vector: List[float]) -> np.ndarray:
+    v = np.asarray(vector, dtype="float32")
+    norm = np.linalg.norm(v)
+    return v / norm if norm else v
+
+
+_cache: Optional[AnswerCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> Optional[AnswerCache]:
+    """Return the process-wide answer cache, or None when disabled."""
+    global _cache
+    if not ANSWER_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AnswerCache(
+                    ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL_SECONDS, ANSWER_CACHE_SIMILARITY
+                )
+    return _cache
@@ -0,0 +1,189 @@
+"""
+Answer many questions at once, for bulk runs and re-ingest evaluations.
+
+Used by POST /ask/batch and as an offline CLI against the persisted index:
+
+    python -m app.batch questions.jsonl -o answers.jsonl --concurrency 8
+
+Input lines are JSON objects with a "question" (or "body"/"title") and an
+optional "id"/"request_id", JSON strings, or plain text questions. Output
+is JSONL, one result per question, written as answers complete; lines
+that are JSON but neither an object nor a string get an error result.
+"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional
+
+from .answer_cache import get_answer_cache, normalize_question
+from .config import BATCH_CONCURRENCY, CONTEXT_CANDIDATES
+from .context import assemble_context
+from .embeddings import embed_texts
+from .llm import NO_CONTEXT_ANSWER, generate_answer
+from .retriever import retrieve_batch
+from .shards import ShardedCorpus, ShardView, UnknownNamespace
+
+
+def answer_questions(
+    questions: List[str],
+    corpus: ShardView,
+    bypass_cache: bool = False,
+    concurrency: int = BATCH_CONCURRENCY,
+) -> Iterator[dict]:
+    """
+    Yield {"index", "question", "answer"[, "cache" | "no_context"]} for
+    every question, in completion order. Questions are embedded together, retrieved with one
+    multi-query FAISS search, and answered with at most `concurrency` LLM
+    calls in flight. Repeats of the same question are answered once.
+    """
+    version, scope = corpus.version, corpus.scope
+    cache = None if bypass_cache else get_answer_cache()
+
+    # Identical (normalized) questions share one answer.
+    groups: Dict[str, List[int]] = {}
+    for i, question in enumerate(questions):
+        groups.setdefault(normalize_question(question), []).append(i)
+
+    def results(indexes: List[int], answer: str, **extra) -> Iterator[dict]:
+        for i in indexes:
+            yield {"index": i, "question": questions[i], "answer": answer, **extra}
+
+    pending = []
+    for indexes in groups.values():
+        answer = cache.get_exact(questions[indexes[0]], version, scope) if cache is not None else None
+        if answer is not None:
+            yield from results(indexes, answer, cache="exact")
+        else:
+            pending.append(indexes)
+    if not pending:
+        return
+
+    embeddings = embed_texts([questions[indexes[0]] for indexes in pending])
+
+    misses, miss_embeddings = [], []
+    for indexes, embedding in zip(pending, embeddings):
+        answer = cache.get_similar(embedding, version, scope) if cache is not None else None
+        if answer is not None:
+            yield from results(indexes, answer, cache="semantic")
+        else:
+            misses.append(indexes)
+            miss_embeddings.append(embedding)
+    if not misses:
+        return
+
+    hits_per_question, _ = retrieve_batch(
+        [questions[indexes[0]] for indexes in misses],
+        corpus,
+        top_k=CONTEXT_CANDIDATES,
+        query_embeddings=miss_embeddings,
+    )
+
+    def answer(indexes: List[int], embedding, hits) -> tuple:
+        passages, _ = assemble_context(hits, corpus)
+        if not passages:
+            return indexes, NO_CONTEXT_ANSWER, {"no_context": True}
+        text = generate_answer(questions[indexes[0]], passages)
+        if cache is not None:
+            cache.put(questions[indexes[0]], embedding, text, version, scope)
+        return indexes, text, {}
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch-llm") as pool:
+        futures = {
+            pool.submit(answer, indexes, embedding, hits): indexes
+            for indexes, embedding, hits in zip(misses, miss_embeddings, hits_per_question)
+        }
+        for future in as_completed(futures):
+            try:
+                indexes, text, extra = future.result()
+            except Exception as e:
+                # One failed LLM call shouldn't sink the rest of the batch.
+                yield from results(futures[future], None, error=f"{type(e).__name__}: {e}")
+                continue
+            yield from results(indexes, text, **extra)
+
+
+def _read_questions(lines) -> List[dict]:
+    """
+    {"id", "question"} per question line, or {"line", "error"} for a JSON
+    line that is neither an object nor a string (e.g. a number or a list).
+    """
+    items = []
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            obj = json.loads(line)
+        except json.JSONDecodeError:
+            obj = line
+        if isinstance(obj, str):
+            obj = {"question": obj}
+        if not isinstance(obj, dict):
+            error = f"expected a JSON object or string, got {type(obj).__name__}"
+            items.append({"line": number, "error": error})
+            continue
+        question = obj.get("question") or obj.get("body") or obj.get("title")
+        if question:
+            items.append({"id": obj.get("id", obj.get("request_id")), "question": question})
+    return items
+
+
+def _load_corpus() -> Optional[ShardedCorpus]:
+    from .index_store import build_manifest, load_corpus
+    from .ingest import resolve_pdf_files
+
+    corpus, up_to_date = load_corpus(build_manifest(resolve_pdf_files()))
+    if corpus is not None and not up_to_date:
+        print("[BATCH] Source PDFs changed since the index was built; answering from the stored index", file=sys.stderr)
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions against the persisted index.")
+    parser.add_argument("input", help="JSONL (or plain text) questions file, '-' for stdin")
+    parser.add_argument("-o", "--output", help="JSONL output file (default: stdout)")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="LLM calls in flight")
+    parser.add_argument("--bypass-cache", action="store_true", help="don't use or fill the answer cache")
+    parser.add_argument(
+        "--namespace", action="append", dest="namespaces",
+        help="only search this namespace, e.g. pdf or confluence:ENG (repeatable; default all)",
+    )
+    args = parser.parse_args()
+
+    loaded = _load_corpus()
+    if loaded is None:
+        sys.exit("No compatible persisted index found; start the API once to build it.")
+    try:
+        corpus = loaded.select(args.namespaces)
+    except UnknownNamespace as e:
+        sys.exit(f"Unknown namespace {e.args[0]}; the index has: {', '.join(loaded.namespaces())}")
+
+    with (sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")) as f:
+        items = _read_questions(f)
+    rejected = [item for item in items if "error" in item]
+    items = [item for item in items if "error" not in item]
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    started = time.perf_counter()
+    try:
+        for item in rejected:
+            out.write(json.dumps(item) + "\n")
+        for result in answer_questions(
+            [item["question"] for item in items], corpus, args.bypass_cache, args.concurrency
+        ):
+            result["id"] = items[result["index"]]["id"]
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - started
+    rate = len(items) / elapsed * 60.0 if elapsed > 0 else float("inf")
+    print(f"[BATCH] Answered {len(items)} questions in {elapsed:.1f}s ({rate:.0f} questions/min)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+import copy
+import json
+import mmap
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+TEXT_FILE = "chunks.bin"
+DICTS_FILE = "chunk_dicts.json"
+# column name -> numpy dtype
+COLUMNS = {
+    "offsets": np.int64,   # n + 1 byte offsets into the text buffer
+    "page": np.int32,      # code into the page_id dictionary
+    "title": np.int32,     # code into the title dictionary
+    "position": np.int32,  # chunk_index within its page
+    "live": np.bool_,      # False once the row's page was removed
+}
+
+
+def _column_file(name: str) -> str:
+    return f"chunk_{name}.npy"
+
+
+class ChunkStore:
+    """
+    Columnar store for chunk text and metadata, addressed by row id (the
+    same id FAISS and BM25 use). All chunk text lives in one UTF-8 buffer
+    sliced by an offsets array; page ids and titles are dictionary-encoded
+    into int32 columns, and chunk positions are an int32 column. Compared
+    with a list of str plus a dict per chunk, this removes per-chunk Python
+    objects (and the GC work of tracking them) and repeated title strings.
+
+    Rows are append-only; removing a page only clears its rows' live flag,
+    so row ids stay stable. A loaded store is memory-mapped read-only and
+    shared between workers; the first mutation takes a private copy.
+    """
+
+    def __init__(self):
+        self._text = bytearray()
+        self._n = 0
+        self._columns: Dict[str, np.ndarray] = {
+            name: np.zeros(1 if name == "offsets" else 0, dtype=dtype)
+            for name, dtype in COLUMNS.items()
+        }
+        self._pages: List[str] = []
+        self._page_codes: Dict[str, int] = {}
+        self._titles: List[str] = []
+        self._title_codes: Dict[str, int] = {}
+        # page code -> runs of consecutive live rows. A page's chunks are
+        # appended together, so this is normally a single range per page.
+        self._page_spans: Dict[int, List[range]] = {}
+        self._read_only = False
+        self._mmap: Optional[mmap.mmap] = None
+
+    def __len__(self) -> int:
+        """Number of rows, including removed ones."""
+        return self._n
+
+    def _col(self, name: str) -> np.ndarray:
+        if name == "offsets":
+            return self._columns[name][: self._n + 1]
+        return self._columns[name][: self._n]
+
+    def live_count(self) -> int:
+        return int(np.count_nonzero(self._col("live")))
+
+    def live_rows(self) -> np.ndarray:
+        return np.flatnonzero(self._col("live"))
+
+    def removed_rows(self) -> np.ndarray:
+        return np.flatnonzero(~self._col("live"))
+
+    def is_live(self, row: int) -> bool:
+        return 0 <= row < self._n and bool(self._columns["live"][row])
+
+    def text_bytes(self, row: int) -> memoryview:
+        """
+        UTF-8 bytes of a row, as a zero-copy view into the buffer. Release it
+        before the next append: a live view pins the buffer's size.
+        """
+        offsets = self._columns["offsets"]
+        return memoryview(self._text)[int(offsets[row]): int(offsets[row + 1])]
+
+    def text(self, row: int) -> Optional[str]:
+        if not self.is_live(row):
+            return None
+        return str(self.text_bytes(row), "utf-8")
+
+    def texts(self, rows: Iterable[int]) -> Iterator[str]:
+        """Texts of the live rows among `rows`, decoded one at a time."""
+        for row in rows:
+            if self.is_live(row):
+                yield str(self.text_bytes(row), "utf-8")
+
+    def meta(self, row: int) -> Optional[dict]:
+        """Metadata dict of a row, built on demand; None for removed rows."""
+        if not self.is_live(row):
+            return None
+        return {
+            "page_id": self._pages[self._columns["page"][row]],
+            "title": self._titles[self._columns["title"][row]],
+            "chunk_index": int(self._columns["position"][row]),
+        }
+
+    def page_rows(self, page_id: str) -> List[int]:
+        """Live rows of a page, in row order."""
+        code = self._page_codes.get(page_id)
+        return [row for span in self._page_spans.get(code, ()) for row in span]
+
+    def _add_to_span(self, code: int, row: int):
+        spans = self._page_spans.setdefault(code, [])
+        if spans and spans[-1].stop == row:
+            spans[-1] = range(spans[-1].start, row + 1)
+        else:
+            spans.append(range(row, row + 1))
+
+    def _rebuild_spans(self):
+        self._page_spans = {}
+        live = self.live_rows()
+        if not len(live):
+            return
+        codes = self._col("page")[live]
+        # A new run starts where the page changes or rows stop being consecutive.
+        starts = np.flatnonzero(
+            np.concatenate(([True], (codes[1:] != codes[:-1]) | (live[1:] != live[:-1] + 1)))
+        )
+        ends = np.append(starts[1:], len(live))
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            first = int(live[start])
+            self._page_spans.setdefault(int(codes[start]), []).append(range(first, first + end - start))
+
+    def _code(self, value: str, values: List[str], codes: Dict[str, int]) -> int:
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(values)
+            values.append(value)
+        return code
+
+    def _ensure_writable(self):
+        if not self._read_only:
+            return
+        self._text = bytearray(self._text)
+        self._columns = {name: np.array(col) for name, col in self._columns.items()}
+        self._mmap = None
+        self._read_only = False
+
+    def copy(self) -> "ChunkStore":
+        """
+        A copy that can be changed without affecting this store. Buffer and
+        columns are shared until either store next writes, which then takes
+        its private copy first.
+        """
+        other = copy.copy(self)
+        other._pages = list(self._pages)
+        other._page_codes = dict(self._page_codes)
+        other._titles = list(self._titles)
+        other._title_codes = dict(self._title_codes)
+        other._page_spans = {code: list(spans) for code, spans in self._page_spans.items()}
+        self._read_only = other._read_only = True
+        return other
+
+    def _reserve(self, extra: int):
+        capacity = len(self._columns["live"])
+        if self._n + extra <= capacity:
+            return
+        capacity = max(self._n + extra, capacity * 2, 1024)
+        for name, col in self._columns.items():
+            size = capacity + 1 if name == "offsets" else capacity
+            grown = np.zeros(size, dtype=col.dtype)
+            grown[: len(col)] = col
+            self._columns[name] = grown
+
+    def append(self, chunks: List[str], metadatas: List[dict]) -> List[int]:
+        """Append chunks with their metadata. Returns the new row ids."""
+        self._ensure_writable()
+        self._reserve(len(chunks))
+        first = self._n
+        cols = self._columns
+        for i, (chunk, meta) in enumerate(zip(chunks, metadatas)):
+            row = first + i
+            self._text += chunk.encode("utf-8")
+            cols["offsets"][row + 1] = len(self._text)
+            code = self._code(meta["page_id"], self._pages, self._page_codes)
+            cols["page"][row] = code
+            self._add_to_span(code, row)
+            cols["title"][row] = self._code(meta.get("title") or "", self._titles, self._title_codes)
+            cols["position"][row] = meta.get("chunk_index", 0)
+            cols["live"][row] = True
+        self._n = first + len(chunks)
+        return list(range(first, self._n))
+
+    def remove_page(self, page_id: str) -> List[int]:
+        """Mark every row of a page removed. Returns the removed rows."""
+        rows = self.page_rows(page_id)
+        if rows:
+            self._ensure_writable()
+            self._columns["live"][rows] = False
+            del self._page_spans[self._page_codes[page_id]]
+        return rows
+
+    def nbytes(self) -> int:
+        """Bytes held by the text buffer and columns (dictionaries excluded)."""
+        return len(self._text) + sum(self._col(name).nbytes for name in COLUMNS)
+
+    def save(self, root: Path):
+        """Write buffer, columns and dictionaries into directory `root`."""
+        root = Path(root)
+        with (root / TEXT_FILE).open("wb") as f:
+            f.write(memoryview(self._text)[: int(self._columns["offsets"][self._n])])
+        for name in COLUMNS:
+            np.save(root / _column_file(name), self._col(name))
+        with (root / DICTS_FILE).open("w", encoding="utf-8") as f:
+            json.dump({"pages": self._pages, "titles": self._titles}, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, root: Path, mmap_files: bool = True) -> "ChunkStore":
+        """
+        Load a store written by save(). With mmap_files=True the buffer and
+        columns are memory-mapped read-only instead of read into memory.
+        """
+        root = Path(root)
+        store = cls()
+        with (root / DICTS_FILE).open("r", encoding="utf-8") as f:
+            dicts = json.load(f)
+        store._pages = dicts["pages"]
+        store._page_codes = {p: i for i, p in enumerate(store._pages)}
+        store._titles = dicts["titles"]
+        store._title_codes = {t: i for i, t in enumerate(store._titles)}
+
+        mode = "r" if mmap_files else None
+        store._columns = {
+            name: np.load(root / _column_file(name), mmap_mode=mode) for name in COLUMNS
+        }
+        store._n = len(store._columns["live"])
+        store._rebuild_spans()
+
+        text_path = root / TEXT_FILE
+        if mmap_files and text_path.stat().st_size > 0:
+            with text_path.open("rb") as f:
+                store._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            store._text = store._mmap
+        else:
+            store._text = bytearray(text_path.read_bytes())
+        store._read_only = mmap_files
+        return store
@@ -0,0 +1,271 @@
+import functools
+import logging
+import re
+import zlib
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .config import CHUNK_DEDUPE_JACCARD, CHUNK_ENCODING, CHUNK_TOKENS
+
+logger = logging.getLogger(__name__)
+
+# Bump when chunk boundaries change so persisted indexes are rebuilt.
+CHUNKER_VERSION = 3
+
+_LIST_ITEM = re.compile(r"^\s*(?:[-*•●▪◦–]|\(?\d{1,3}[.)]|\(?[a-zA-Z][.)])\s+")
+_MARKDOWN_HEADING = re.compile(r"^#{1,6}\s+")
+_LINK = re.compile(r"\[Link:|https?://")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_SIGNATURE_NOISE = re.compile(r"[\W\d_]+")
+
+# Near-duplicate detection: MinHash over word shingles, with LSH banding so
+# each chunk is only compared with chunks that share a band.
+_SHINGLE_WORDS = 3
+_MINHASH_BANDS = 16
+_MINHASH_ROWS = 4
+_MINHASH_PRIME = (1 << 32) + 15
+_rng = np.random.default_rng(14)
+_MINHASH_A = _rng.integers(1, 1 << 32, _MINHASH_BANDS * _MINHASH_ROWS, dtype=np.uint64)
+_MINHASH_B = _rng.integers(0, 1 << 32, _MINHASH_BANDS * _MINHASH_ROWS, dtype=np.uint64)
+del _rng
+
+
+@functools.lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(CHUNK_ENCODING)
+    except Exception as e:
+        # tiktoken fetches its BPE file on first use; without network access
+        # fall back to the usual ~4 characters per token estimate.
+        logger.warning("tiktoken encoding %s unavailable (%s); estimating tokens", CHUNK_ENCODING, e)
+        return None
+
+
+def count_tokens(text: str) -> int:
+    enc = _encoding()
+    if enc is None:
+        return max(1, (len(text) + 3) // 4)
+    return len(enc.encode(text, disallowed_special=()))
+
+
+@functools.lru_cache(maxsize=65536)
+def _word_tokens(word: str) -> int:
+    return count_tokens(" " + word)
+
+
+def _is_heading(line: str) -> bool:
+    if _MARKDOWN_HEADING.match(line):
+        return True
+    words = line.split()
+    return (
+        0 < len(words) <= 10
+        and len(line) <= 80
+        and line[0].isupper()
+        and line[-1] not in ".,;:!?)"
+        and not _LINK.search(line)
+    )
+
+
+def split_units(text: str) -> List[Tuple[str, str]]:
+    """
+    Split page text into (kind, text) units that are never cut in the middle:
+    "heading", "item" (list items, numbered steps, link lines) and "para".
+    Wrapped lines are joined back into their paragraph or list item.
+    """
+    units: List[Tuple[str, str]] = []
+    para: List[str] = []
+    in_item = False
+
+    def flush_para():
+        if para:
+            units.append(("para", " ".join(para)))
+            para.clear()
+
+    for raw in text.splitlines():
+        line = re.sub(r"\s+", " ", raw).strip()
+        if not line:
+            flush_para()
+            in_item = False
+            continue
+
+        if _LIST_ITEM.match(line) or (_LINK.search(line) and len(line) < 200):
+            flush_para()
+            units.append(("item", line))
+            in_item = True
+        elif not para and not in_item and _is_heading(line):
+            units.append(("heading", _MARKDOWN_HEADING.sub("", line)))
+        elif in_item:
+            # Continuation of a wrapped list item.
+            kind, previous = units[-1]
+            units[-1] = (kind, previous + " " + line)
+        else:
+            para.append(line)
+
+    flush_para()
+    return units
+
+
+def _split_oversized(text: str, budget: int) -> List[Tuple[str, int]]:
+    """Split a unit larger than the budget at sentence, then word, boundaries."""
+    pieces: List[Tuple[str, int]] = []
+    current: List[str] = []
+    current_tokens = 0
+
+    def flush():
+        nonlocal current_tokens
+        if current:
+            pieces.append((" ".join(current), current_tokens))
+            current.clear()
+            current_tokens = 0
+
+    for sentence in _SENTENCE_END.split(text):
+        n = count_tokens(sentence)
+        words = [sentence] if n <= budget else sentence.split()
+        for word in words:
+            n = n if len(words) == 1 else _word_tokens(word)
+            if current and current_tokens + n > budget:
+                flush()
+            current.append(word)
+            current_tokens += n
+    flush()
+    return pieces
+
+
+def chunk_text(text: str, max_tokens: int = CHUNK_TOKENS) -> List[str]:
+    """
+    Pack structural units into chunks of at most `max_tokens` tokens.
+
+    A heading starts a new chunk and is repeated at the top of every chunk
+    its section spills into, so each chunk says what it is about. Paragraphs,
+    list items and link lines stay whole unless a single one exceeds the
+    budget on its own.
+    """
+    chunks: List[str] = []
+    headings: List[str] = []
+    heading_tokens = 0
+    body: List[str] = []
+    body_tokens = 0
+
+    def emit():
+        nonlocal body_tokens
+        if body:
+            chunks.append("\n".join(headings + body))
+            body.clear()
+            body_tokens = 0
+
+    for kind, unit in split_units(text):
+        if kind == "heading":
+            if body:
+                emit()
+                headings = []
+                heading_tokens = 0
+            # Consecutive headings (section + subsection) stay together.
+            headings.append(unit)
+            heading_tokens += count_tokens(unit)
+            continue
+
+        # Don't let a run-away "heading" eat the budget of every chunk.
+        if heading_tokens > max_tokens // 2:
+            body[:0] = headings
+            body_tokens += heading_tokens
+            headings = []
+            heading_tokens = 0
+
+        budget = max_tokens - heading_tokens
+        n = count_tokens(unit)
+        pieces = [(unit, n)] if n <= budget else _split_oversized(unit, budget)
+        for piece, n in pieces:
+            if body and body_tokens + n > budget:
+                emit()
+            body.append(piece)
+            body_tokens += n
+
+    emit()
+    if not chunks and headings:
+        chunks.append("\n".join(headings))
+    return chunks
+
+
+def chunk_signature(chunk: str) -> str:
+    """Letters-only form of a chunk: page numbers, dates and punctuation don't count."""
+    return " ".join(_SIGNATURE_NOISE.sub(" ", chunk.lower()).split())
+
+
+def _minhash(signature: str) -> np.ndarray:
+    words = signature.split()
+    shingles = {
+        " ".join(words[i:i + _SHINGLE_WORDS])
+        for i in range(max(1, len(words) - _SHINGLE_WORDS + 1))
+    }
+    hashes = np.fromiter(
+        (zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles)
+    )
+    # (a*x + b) mod p stays below 2**64 for 32-bit a, x and b.
+    permuted = (np.outer(_MINHASH_A, hashes) + _MINHASH_B[:, None]) % np.uint64(_MINHASH_PRIME)
+    return permuted.min(axis=1)
+
+
+class ChunkDeduper:
+    """
+    Remembers the chunks of one ingest and flags later ones that repeat
+    them: identical up to page numbers, dates and punctuation, or sharing
+    at least `threshold` of their word shingles (estimated with MinHash).
+    That catches PDF headers and footers repeated on every page as well as
+    boilerplate pasted across Confluence pages with small edits.
+
+    Not thread-safe; one ingest feeds its batches through it in order.
+    """
+
+    def __init__(self, threshold: float = CHUNK_DEDUPE_JACCARD):
+        self.threshold = threshold
+        self._signatures: Set[str] = set()
+        # Row i is the MinHash of the i-th chunk kept; grown by doubling.
+        self._minhashes = np.zeros((64, _MINHASH_BANDS * _MINHASH_ROWS), dtype=np.uint64)
+        self._kept = 0
+        # (band, band hash) -> rows of _minhashes
+        self._buckets: Dict[Tuple[int, bytes], List[int]] = {}
+
+    def is_duplicate(self, chunk: str) -> bool:
+        """True if `chunk` repeats one seen before or has no words; otherwise remember it."""
+        signature = chunk_signature(chunk)
+        if not signature or signature in self._signatures:
+            return True
+        minhash = _minhash(signature)
+        bands = [
+            (band, minhash[band * _MINHASH_ROWS:(band + 1) * _MINHASH_ROWS].tobytes())
+            for band in range(_MINHASH_BANDS)
+        ]
+        candidates = {i for key in bands for i in self._buckets.get(key, ())}
+        if candidates:
+            agreement = (self._minhashes[list(candidates)] == minhash).mean(axis=1)
+            if agreement.max() >= self.threshold:
+                return True
+        self._signatures.add(signature)
+        if self._kept == len(self._minhashes):
+            self._minhashes = np.concatenate([self._minhashes, np.zeros_like(self._minhashes)])
+        self._minhashes[self._kept] = minhash
+        for key in bands:
+            self._buckets.setdefault(key, []).append(self._kept)
+        self._kept += 1
+        return False
+
+
+def dedupe_chunks(
+    chunks: Iterable[str], deduper: Optional[ChunkDeduper] = None
+) -> List[Tuple[int, str]]:
+    """
+    Drop chunks that are near-duplicates of an earlier one, in this page or
+    (with a shared `deduper`) any page before it in the same ingest, or
+    that carry no words at all. Returns (position, chunk) for the rest,
+    position being the chunk's index in `chunks`, so only chunks that were
+    neighbours before deduping look like neighbours after it.
+    """
+    deduper = deduper if deduper is not None else ChunkDeduper()
+    return [
+        (position, chunk)
+        for position, chunk in enumerate(chunks)
+        if not deduper.is_duplicate(chunk)
+    ]
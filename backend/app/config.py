@@ -4,6 +4,9 @@ import os
 CONFLUENCE_BASE_URL = os.getenv("CONFLUENCE_BASE_URL", "https://your-domain.atlassian.net/wiki")
 CONFLUENCE_EMAIL = os.getenv("CONFLUENCE_EMAIL")
 CONFLUENCE_API_TOKEN = os.getenv("CONFLUENCE_API_TOKEN")
+CONFLUENCE_WORKERS = int(os.getenv("CONFLUENCE_WORKERS", "8"))  # concurrent page fetches
+CONFLUENCE_PAGE_SIZE = int(os.getenv("CONFLUENCE_PAGE_SIZE", "50"))  # results per listing request
+CONFLUENCE_MAX_PAGES = int(os.getenv("CONFLUENCE_MAX_PAGES", "0"))  # 0 = crawl the whole space
 
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY") # Optional, used for embeddings and generation by default
@@ -11,8 +14,17 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY") # Optional, used for embeddings and
 
 # Behavior tuning
 TOP_K = int(os.getenv("TOP_K", "4"))
-RELEVANCE_THRESHOLD = float(os.getenv("RELEVANCE_THRESHOLD", "0.45"))
-CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "500")) # characters approximate
+RELEVANCE_THRESHOLD = float(os.getenv("RELEVANCE_THRESHOLD", "0.45"))  # min cosine for vector hits
+RRF_K = int(os.getenv("RRF_K", "60"))  # reciprocal rank fusion damping constant
+CONTEXT_CANDIDATES = int(os.getenv("CONTEXT_CANDIDATES", str(TOP_K * 2)))  # chunks retrieved before context assembly
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))  # max context tokens sent to the LLM
+CHUNKER = os.getenv("CHUNKER", "structured")  # "structured" (token-budgeted, respects headings/lists) or "chars"
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "300"))  # max tokens per chunk for the structured chunker
+CHUNK_ENCODING = os.getenv("CHUNK_ENCODING", "cl100k_base")  # tiktoken encoding used to count tokens
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "500")) # characters approximate, "chars" chunker only
+CHUNK_DEDUPE_JACCARD = float(os.getenv("CHUNK_DEDUPE_JACCARD", "0.8"))  # min word-shingle similarity for a chunk to be dropped as a near-duplicate
+SYNC_BATCH_PAGES = int(os.getenv("SYNC_BATCH_PAGES", "32"))  # pages chunked/embedded/applied per step of an ingest
+BM25_COMPACT_RATIO = float(os.getenv("BM25_COMPACT_RATIO", "0.2"))  # rewrite BM25 postings once this share of indexed docs is removed
 
 
 # LLM selection
@@ -30,6 +42,10 @@ PDF_PATH = os.getenv(
     "PDF_PATH",
     "/app/app/data/IQ-Access Requests and Resources for IIRIS Leadinsights Services Team-151225-094203.pdf",
 )
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "0"))  # extraction/OCR processes, 0 = one per CPU
+OCR_DPI = int(os.getenv("OCR_DPI", "300"))  # render resolution for pages that need OCR
+PDF_CACHE_ENABLED = os.getenv("PDF_CACHE_ENABLED", "true").lower() == "true"
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", "/app/cache/pdf")  # extracted pages per PDF, keyed by content hash
 
 # Bedrock embeddings
 BEDROCK_REGION = os.getenv("BEDROCK_REGION", "us-east-1")
@@ -37,6 +53,60 @@ BEDROCK_EMBED_MODEL = os.getenv(
     "BEDROCK_EMBED_MODEL",
     "amazon.titan-embed-text-v2:0",
 )
+BEDROCK_EMBED_DIMENSIONS = int(os.getenv("BEDROCK_EMBED_DIMENSIONS", "0"))  # Titan v2: 256, 512 or 1024; 0 = model default
 AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID", "")
 AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY", "")
-AWS_SESSION_TOKEN = os.getenv("AWS_SESSION_TOKEN", "")
\ No newline at end of file
+AWS_SESSION_TOKEN = os.getenv("AWS_SESSION_TOKEN", "")
+
+# Persisted index artifact (FAISS vectors + chunk store + source manifest)
+INDEX_DIR = os.getenv("INDEX_DIR", "/app/index")
+INDEX_MMAP = os.getenv("INDEX_MMAP", "true").lower() == "true"
+INDEX_KEEP_VERSIONS = int(os.getenv("INDEX_KEEP_VERSIONS", "3"))  # published versions kept on disk
+INDEX_POLL_SECONDS = float(os.getenv("INDEX_POLL_SECONDS", "2"))  # how often workers look for a new version, 0 disables
+
+# Local sentence-transformers embeddings instead of Bedrock Titan
+USE_LOCAL_EMBEDDINGS = os.getenv("USE_LOCAL_EMBEDDINGS", "false").lower() == "true"
+LOCAL_EMBED_MODEL = os.getenv("LOCAL_EMBED_MODEL", "all-MiniLM-L6-v2")
+LOCAL_EMBED_BATCH_SIZE = int(os.getenv("LOCAL_EMBED_BATCH_SIZE", "256"))  # texts per forward pass
+LOCAL_EMBED_PROCESSES = int(os.getenv("LOCAL_EMBED_PROCESSES", "1"))  # >1 spreads encoding over a process pool, 0 = one per CPU
+LOCAL_EMBED_QUANTIZE = os.getenv("LOCAL_EMBED_QUANTIZE", "false").lower() == "true"  # int8 dynamic quantization for CPU
+LOCAL_EMBED_WARMUP = os.getenv("LOCAL_EMBED_WARMUP", "true").lower() == "true"  # load the model in the background at startup
+
+# Embedding cache (content-addressed, persisted in SQLite)
+EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE_ENABLED", "true").lower() == "true"
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", "/app/cache/embeddings.sqlite3")
+EMBED_CACHE_MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "200000"))
+
+# Bedrock embedding throughput
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "8"))
+EMBED_RATE_LIMIT = float(os.getenv("EMBED_RATE_LIMIT", "20"))  # requests/sec, 0 disables
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "6"))
+EMBED_BACKOFF_BASE = float(os.getenv("EMBED_BACKOFF_BASE", "0.5"))  # seconds
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+
+# FAISS index type: "flat" (exact baseline), "hnsw", "ivf", "ivfpq" or "sq8"
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat").lower()
+FAISS_HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))
+FAISS_HNSW_EF_CONSTRUCTION = int(os.getenv("FAISS_HNSW_EF_CONSTRUCTION", "200"))
+FAISS_HNSW_EF_SEARCH = int(os.getenv("FAISS_HNSW_EF_SEARCH", "64"))
+FAISS_IVF_NLIST = int(os.getenv("FAISS_IVF_NLIST", "0"))  # 0 = derive from corpus size
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "16"))
+FAISS_PQ_M = int(os.getenv("FAISS_PQ_M", "64"))  # sub-quantizers for ivfpq
+FAISS_MIN_TRAIN_POINTS = int(os.getenv("FAISS_MIN_TRAIN_POINTS", "1000"))
+FAISS_VECTOR_DTYPE = os.getenv("FAISS_VECTOR_DTYPE", "float32").lower()  # stored vectors: "float32", "float16" or "int8"
+FAISS_RESCORE_FACTOR = int(os.getenv("FAISS_RESCORE_FACTOR", "4"))  # int8: candidates per result re-ranked with float16 vectors, 0 disables
+FAISS_COMPACT_RATIO = float(os.getenv("FAISS_COMPACT_RATIO", "0.2"))  # hnsw: rebuild once this share of stored vectors is deleted
+
+# Request path concurrency
+BLOCKING_IO_WORKERS = int(os.getenv("BLOCKING_IO_WORKERS", "32"))  # threads for Bedrock/FAISS work per worker process
+INGEST_JOB_HISTORY = int(os.getenv("INGEST_JOB_HISTORY", "100"))  # finished ingest jobs kept for status lookups
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))  # LLM calls in flight per /ask/batch request
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", "1000"))  # largest accepted /ask/batch request
+STARTUP_RETRY_AFTER = int(os.getenv("STARTUP_RETRY_AFTER", "5"))  # Retry-After seconds on 503s while the index is loading
+COALESCE_REQUESTS = os.getenv("COALESCE_REQUESTS", "true").lower() == "true"  # identical in-flight questions and embeddings share one call
+
+# Semantic answer cache
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "2000"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "86400"))
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))  # min cosine for a semantic hit
@@ -0,0 +1,182 @@
+import re
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Deque, Dict, Iterator, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .config import (
+    CONFLUENCE_API_TOKEN,
+    CONFLUENCE_BASE_URL,
+    CONFLUENCE_EMAIL,
+    CONFLUENCE_MAX_PAGES,
+    CONFLUENCE_PAGE_SIZE,
+    CONFLUENCE_WORKERS,
+)
+from .corpus import page_fingerprint
+
+
+def _html_to_text(html: str) -> str:
+    """
+    Very naive HTML -> text stripper.
+    For production use, consider BeautifulSoup.
+    """
+    clean = re.sub(r"<script.*?>.*?</script>", "", html, flags=re.S)
+    clean = re.sub(r"<style.*?>.*?</style>", "", clean, flags=re.S)
+    # Keep block structure (headings, paragraphs, list items, rows) as line
+    # breaks so the chunker can split on it.
+    clean = re.sub(r"<li[^>]*>", "\n- ", clean, flags=re.I)
+    clean = re.sub(r"<h[1-6][^>]*>", "\n\n", clean, flags=re.I)
+    clean = re.sub(r"</(?:p|div|h[1-6]|li|ul|ol|tr|table|blockquote|pre)>|<br\s*/?>", "\n", clean, flags=re.I)
+    clean = re.sub(r"<[^<]+?>", "", clean)
+    clean = re.sub(r"[ \t\r\f\v]+", " ", clean)
+    clean = re.sub(r" ?\n ?", "\n", clean)
+    clean = re.sub(r"\n{3,}", "\n\n", clean)
+    return clean.strip()
+
+
+def _make_session(workers: int) -> requests.Session:
+    """Pooled keep-alive session sized for the fetch workers, retrying 429/5xx."""
+    retry = Retry(
+        total=5,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class ConfluenceCrawler:
+    """
+    Crawls a Confluence space through the REST API.
+
+    The space listing only asks for page versions (no bodies). Pages whose
+    version matches the one already indexed are yielded as stubs without
+    text; only new or changed pages have their body fetched, concurrently
+    on a bounded pool. Pages are yielded as they arrive so chunking and
+    embedding can start before the crawl is done.
+    """
+
+    def __init__(
+        self,
+        base_url: str = CONFLUENCE_BASE_URL,
+        email: Optional[str] = CONFLUENCE_EMAIL,
+        api_token: Optional[str] = CONFLUENCE_API_TOKEN,
+        workers: int = CONFLUENCE_WORKERS,
+        page_size: int = CONFLUENCE_PAGE_SIZE,
+        session: Optional[requests.Session] = None,
+    ):
+        self.api_url = f"{base_url.rstrip('/')}/rest/api/content"
+        # Requires CONFLUENCE_EMAIL and CONFLUENCE_API_TOKEN if the space is private.
+        self.auth = (email, api_token) if email and api_token else None
+        self.workers = workers
+        self.page_size = page_size
+        self.session = session or _make_session(workers)
+        self.stats = {"listed": 0, "fetched": 0, "skipped": 0, "seconds": 0.0, "pages_per_sec": 0.0}
+
+    def _get(self, url: str, params: dict) -> dict:
+        r = self.session.get(url, params=params, auth=self.auth, timeout=30)
+        r.raise_for_status()
+        return r.json()
+
+    def list_pages(self, space_key: str, max_pages: int = CONFLUENCE_MAX_PAGES) -> Iterator[dict]:
+        """Page summaries (id, title, version, lastModified) for a whole space."""
+        params = {
+            "spaceKey": space_key,
+            "type": "page",
+            "expand": "version",
+            "limit": self.page_size,
+            "start": 0,
+        }
+        listed = 0
+        while True:
+            data = self._get(self.api_url, params)
+            items = data.get("results", [])
+            for item in items:
+                yield _summary(item)
+                listed += 1
+                if max_pages and listed >= max_pages:
+                    return
+
+            # Stop if the API indicates there are no more pages
+            has_next = bool(data.get("_links", {}).get("next"))
+            if not items or (not has_next and len(items) < self.page_size):
+                return
+            params["start"] += len(items)
+
+    def fetch_page(self, page_id: str) -> dict:
+        """Full page with its body converted to plain text."""
+        item = self._get(f"{self.api_url}/{page_id}", {"expand": "body.storage,version"})
+        page = _summary(item)
+        body = item.get("body", {}).get("storage", {}).get("value", "")
+        page["text"] = _html_to_text(body)
+        return page
+
+    def crawl(
+        self,
+        space_key: str,
+        known: Optional[Dict[str, str]] = None,
+        max_pages: int = CONFLUENCE_MAX_PAGES,
+    ) -> Iterator[dict]:
+        """
+        Yield every page of the space. `known` maps page id -> fingerprint of
+        the indexed revision (see Corpus.page_fingerprints); pages matching it
+        come back as text-less stubs so the caller still knows they exist.
+        """
+        known = known or {}
+        started = time.perf_counter()
+        self.stats.update(listed=0, fetched=0, skipped=0)
+        pending: Deque[Future] = deque()
+        # Keep a couple of requests queued per worker, not the whole space.
+        max_pending = self.workers * 2
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="confluence") as pool:
+            for summary in self.list_pages(space_key, max_pages):
+                self.stats["listed"] += 1
+                if known.get(summary["id"]) == page_fingerprint(summary):
+                    self.stats["skipped"] += 1
+                    yield summary
+                    continue
+
+                pending.append(pool.submit(self.fetch_page, summary["id"]))
+                while len(pending) >= max_pending or (pending and pending[0].done()):
+                    self.stats["fetched"] += 1
+                    yield pending.popleft().result()
+
+            while pending:
+                self.stats["fetched"] += 1
+                yield pending.popleft().result()
+
+        elapsed = time.perf_counter() - started
+        self.stats["seconds"] = elapsed
+        self.stats["pages_per_sec"] = self.stats["listed"] / elapsed if elapsed > 0 else 0.0
+        print(
+            f"[CONFLUENCE] Crawled {self.stats['listed']} pages of {space_key} in {elapsed:.2f}s "
+            f"({self.stats['pages_per_sec']:.1f} pages/sec; "
+            f"{self.stats['fetched']} fetched, {self.stats['skipped']} unchanged)"
+        )
+
+
+def _summary(item: dict) -> dict:
+    version = item.get("version") or {}
+    return {
+        "id": item.get("id"),
+        "title": item.get("title"),
+        "version": version.get("number"),
+        "last_modified": version.get("when"),
+    }
+
+
+def fetch_confluence_pages(space_key: str, limit: int = CONFLUENCE_MAX_PAGES) -> List[dict]:
+    """
+    Fetch all pages (with text) from a Confluence space using the REST API.
+    """
+    return list(ConfluenceCrawler().crawl(space_key, max_pages=limit))
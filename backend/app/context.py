@@ -0,0 +1,151 @@
+import re
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+from .chunking import count_tokens
+from .config import CONTEXT_TOKEN_BUDGET
+from .corpus import Corpus
+from .shards import ShardView
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_PUNCTUATION = re.compile(r"[^\w]+")
+# Sentences shorter than this (headings, "Done.") may legitimately repeat.
+_MIN_DEDUPE_WORDS = 4
+# Don't bother squeezing in a truncated passage smaller than this.
+_MIN_PARTIAL_TOKENS = 64
+# Longest chunk overlap looked for when stitching neighbours together.
+_MAX_OVERLAP_CHARS = 400
+
+
+def _join_neighbours(a: str, b: str) -> str:
+    """
+    Stitch chunk b onto the chunk before it on the same page: drop the
+    heading lines b repeats from a, then any character overlap between
+    the end of a and the start of b.
+    """
+    a_lines = set(line.strip() for line in a.splitlines())
+    b_lines = b.splitlines()
+    while b_lines and b_lines[0].strip() in a_lines:
+        b_lines.pop(0)
+    b = "\n".join(b_lines)
+
+    for k in range(min(len(a), len(b), _MAX_OVERLAP_CHARS), 9, -1):
+        if a.endswith(b[:k]):
+            return a + b[k:]
+    return a + "\n" + b if b else a
+
+
+def merge_adjacent(rows: List[Tuple[int, str, dict]], scores: Dict[int, float]) -> List[Tuple[float, str]]:
+    """
+    Merge chunks that are neighbours on the same page (consecutive
+    chunk_index) into single passages. Returns (score, text) per passage,
+    scored by its best chunk.
+    """
+    by_page: Dict[Tuple[Optional[str], str], List[Tuple[int, str, float]]] = {}
+    for row, chunk, meta in rows:
+        page = (meta.get("namespace"), meta["page_id"])
+        by_page.setdefault(page, []).append((meta["chunk_index"], chunk, scores[row]))
+
+    passages = []
+    for items in by_page.values():
+        items.sort(key=lambda item: item[0])
+        index, text, score = items[0]
+        for next_index, next_text, next_score in items[1:]:
+            if next_index == index + 1:
+                text = _join_neighbours(text, next_text)
+                score = max(score, next_score)
+            else:
+                passages.append((score, text))
+                text, score = next_text, next_score
+            index = next_index
+        passages.append((score, text))
+    return passages
+
+
+def _sentence_key(sentence: str) -> str:
+    # Unlike chunk signatures, digits count here: two steps that differ only
+    # by a ticket number or URL id are different instructions.
+    return " ".join(_PUNCTUATION.sub(" ", sentence.lower()).split())
+
+
+def _dedupe_sentences(text: str, seen: Set[str]) -> str:
+    lines = []
+    for line in text.splitlines():
+        kept = []
+        for sentence in _SENTENCE_END.split(line):
+            key = _sentence_key(sentence)
+            if len(key.split()) >= _MIN_DEDUPE_WORDS:
+                if key in seen:
+                    continue
+                seen.add(key)
+            kept.append(sentence)
+        if kept:
+            lines.append(" ".join(kept))
+    return "\n".join(lines).strip()
+
+
+def _truncate(text: str, budget: int) -> str:
+    """Longest prefix of whole sentences within `budget` tokens."""
+    lines: List[str] = []
+    used = 0
+    for line in text.splitlines():
+        kept = []
+        for sentence in _SENTENCE_END.split(line):
+            n = count_tokens(sentence)
+            if used + n > budget:
+                if kept:
+                    lines.append(" ".join(kept))
+                return "\n".join(lines)
+            kept.append(sentence)
+            used += n
+        lines.append(" ".join(kept))
+    return "\n".join(lines)
+
+
+def assemble_context(
+    hits: List[Tuple[int, float]],
+    corpus: Union[Corpus, ShardView],
+    budget: Optional[int] = None,
+) -> Tuple[List[str], dict]:
+    """
+    Turn retrieved (row_id, score) hits into the context passages sent to
+    the LLM: neighbouring chunks of a page are merged, sentences already
+    included are dropped, and passages are added best-first until the token
+    budget is spent. Returns (passages, stats).
+    """
+    budget = CONTEXT_TOKEN_BUDGET if budget is None else budget
+    scores = dict(hits)
+    rows = corpus.get_rows([row for row, _ in hits])
+    raw_tokens = sum(count_tokens(chunk) for _, chunk, _ in rows)
+
+    passages = merge_adjacent(rows, scores)
+    passages.sort(key=lambda p: p[0], reverse=True)
+
+    seen: Set[str] = set()
+    selected: List[str] = []
+    used = 0
+    for _, text in passages:
+        # Dedupe against a copy: sentences of a passage that doesn't make it
+        # into the budget must not be dropped from later passages.
+        text = _dedupe_sentences(text, set(seen))
+        if not text:
+            continue
+        n = count_tokens(text)
+        if used + n > budget:
+            remaining = budget - used
+            if remaining < _MIN_PARTIAL_TOKENS:
+                continue
+            text = _truncate(text, remaining)
+            if not text:
+                continue
+            n = count_tokens(text)
+        _dedupe_sentences(text, seen)
+        selected.append(text)
+        used += n
+
+    stats = {
+        "chunks": len(rows),
+        "passages": len(selected),
+        "raw_tokens": raw_tokens,
+        "context_tokens": used,
+    }
+    return selected, stats
@@ -0,0 +1,300 @@
+import hashlib
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .chunk_store import ChunkStore
+from .chunking import ChunkDeduper
+from .config import SYNC_BATCH_PAGES
+from .ingest import build_corpus_and_embeddings
+from .lexical_index import BM25Index
+from .metrics import INGEST_CHUNKS, INGEST_PAGES
+from .rwlock import RWLock
+
+if TYPE_CHECKING:
+    # faiss is imported on first use, so the API can start listening first.
+    from .faiss_index import FaissIndex
+
+
+def page_fingerprint(page: dict) -> str:
+    """
+    Identify a page revision. Confluence pages carry a version number (and
+    last-modified time); everything else (PDF pages) is fingerprinted by content.
+    """
+    if page.get("version") is not None:
+        if page.get("last_modified"):
+            return f"v{page['version']}@{page['last_modified']}"
+        return f"v{page['version']}"
+    raw = f"{page.get('title', '')}\0{page.get('text', '')}".encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()
+
+
+class Corpus:
+    """
+    Chunks, metadata, vector index and lexical index for every ingested page,
+    kept in step so single pages can be added, updated or removed.
+
+    Row ids are stable: a chunk's row in the chunk store, its FAISS id and
+    its BM25 doc id are the same number. Removed rows are marked dead.
+    """
+
+    def __init__(self):
+        self.index: Optional["FaissIndex"] = None
+        self.lexical = BM25Index()
+        self.store = ChunkStore()
+        # page_id -> {"fingerprint": ..., "source": ...}
+        self.pages: Dict[str, dict] = {}
+        # Searches take the read side; applying an ingest takes the write side.
+        self.lock = RWLock()
+        # Bumped on every change, so caches derived from search results
+        # (e.g. cached answers) know when they are stale.
+        self.version = 0
+        # Published index version this corpus was loaded from or saved as.
+        self.artifact: Optional[str] = None
+
+    @classmethod
+    def from_store(
+        cls,
+        index: Optional["FaissIndex"],
+        store: ChunkStore,
+        pages: Dict[str, dict],
+        lexical: Optional[BM25Index] = None,
+    ) -> "Corpus":
+        corpus = cls()
+        corpus.index = index
+        corpus.store = store
+        corpus.pages = pages
+        if lexical is not None:
+            corpus.lexical = lexical
+        else:
+            # No saved postings: rebuild them from the stored text.
+            rows = store.live_rows().tolist()
+            corpus.lexical.add(store.texts(rows), rows)
+        return corpus
+
+    @classmethod
+    def from_parts(
+        cls,
+        index: Optional["FaissIndex"],
+        chunks: List[str],
+        metadatas: List[dict],
+        pages: Dict[str, dict],
+    ) -> "Corpus":
+        """Corpus over chunks whose vectors are already in `index` under ids 0..n-1."""
+        store = ChunkStore()
+        store.append(chunks, metadatas)
+        return cls.from_store(index, store, pages)
+
+    def copy(self) -> "Corpus":
+        """
+        A copy to build the next version of this shard on while this one
+        keeps serving: changes to either never show in the other. Data the
+        two still have in common (e.g. memory-mapped files) is shared until
+        one of them changes it.
+        """
+        with self.lock.read():
+            other = Corpus()
+            other.index = self.index.copy() if self.index is not None else None
+            other.lexical = self.lexical.copy()
+            other.store = self.store.copy()
+            other.pages = dict(self.pages)
+            other.version = self.version
+            other.artifact = self.artifact
+        return other
+
+    def size(self) -> int:
+        """Number of live chunks."""
+        return self.lexical.size()
+
+    @property
+    def has_vectors(self) -> bool:
+        return self.index is not None
+
+    def lexical_search(self, query: str, top_k: int) -> List[Tuple[int, float]]:
+        with self.lock.read():
+            return self.lexical.search(query, top_k)
+
+    def vector_search(self, vector: List[float], top_k: int) -> List[Tuple[int, float]]:
+        with self.lock.read():
+            if self.index is None:
+                return []
+            return self.index.search_ids(vector, top_k)
+
+    def vector_search_batch(
+        self, vectors: List[List[float]], top_k: int
+    ) -> List[List[Tuple[int, float]]]:
+        with self.lock.read():
+            if self.index is None:
+                return [[] for _ in vectors]
+            return self.index.search_ids_batch(vectors, top_k)
+
+    def get_chunks(self, rows: List[int]) -> List[str]:
+        """Chunk texts for row ids, skipping rows removed since they were retrieved."""
+        with self.lock.read():
+            return list(self.store.texts(rows))
+
+    def get_rows(self, rows: List[int]) -> List[Tuple[int, str, dict]]:
+        """(row, chunk text, metadata) for row ids, skipping removed rows."""
+        with self.lock.read():
+            return [
+                (r, self.store.text(r), self.store.meta(r))
+                for r in rows
+                if self.store.is_live(r)
+            ]
+
+    def page_fingerprints(self, source: str) -> Dict[str, str]:
+        """Fingerprints of the indexed revision of every page from `source`."""
+        with self.lock.read():
+            return {
+                page_id: info["fingerprint"]
+                for page_id, info in self.pages.items()
+                if info["source"] == source
+            }
+
+    def sync_pages(
+        self,
+        pages: Iterable[dict],
+        source: str,
+        prune: bool = True,
+        batch_pages: int = SYNC_BATCH_PAGES,
+    ) -> dict:
+        """
+        Bring the corpus in line with `pages` from one source (a PDF folder,
+        a Confluence space). Only new or changed pages are chunked and
+        embedded; with prune=True, pages of that source that are no longer
+        present are removed. Returns counts of what changed.
+
+        `pages` may be a generator: changed pages are processed in batches of
+        `batch_pages` as they arrive, so embedding overlaps with extraction
+        or crawling. Chunking and embedding run without holding the lock, so
+        searches keep being served during an ingest; only each apply step
+        blocks them. Near-duplicate chunks are dropped across every batch of
+        the sync, not just within one.
+        """
+        deduper = ChunkDeduper()
+        seen = set()
+        batch: List[dict] = []
+        updated = 0
+        unchanged = 0
+
+        def flush():
+            prepared = build_corpus_and_embeddings(batch, deduper)
+            with self.lock.write():
+                self._apply(batch, source, *prepared)
+            INGEST_PAGES.inc(len(batch), source=source, outcome="updated")
+            INGEST_CHUNKS.inc(len(prepared[0]), source=source)
+
+        for p in pages:
+            seen.add(p["id"])
+            with self.lock.read():
+                indexed = self.pages.get(p["id"], {}).get("fingerprint")
+            if indexed == page_fingerprint(p):
+                unchanged += 1
+                INGEST_PAGES.inc(source=source, outcome="unchanged")
+                continue
+            batch.append(p)
+            updated += 1
+            if len(batch) >= batch_pages:
+                flush()
+                batch = []
+        if batch:
+            flush()
+
+        removed = []
+        with self.lock.write():
+            if prune:
+                removed = [
+                    page_id for page_id, info in self.pages.items()
+                    if info["source"] == source and page_id not in seen
+                ]
+            for page_id in removed:
+                self._remove_page(page_id)
+            chunks = self.size()
+        if removed:
+            INGEST_PAGES.inc(len(removed), source=source, outcome="removed")
+        self._rebuild_indexes_if_due()
+
+        return {
+            "updated": updated,
+            "removed": len(removed),
+            "unchanged": unchanged,
+            "chunks": chunks,
+        }
+
+    def upsert_pages(self, pages: List[dict], source: str):
+        """(Re)index the given pages, replacing any previous revision."""
+        prepared = build_corpus_and_embeddings(pages)
+        with self.lock.write():
+            self._apply(pages, source, *prepared)
+        self._rebuild_indexes_if_due()
+
+    def remove_page(self, page_id: str):
+        with self.lock.write():
+            self._remove_page(page_id)
+        self._rebuild_indexes_if_due()
+
+    def _rebuild_indexes_if_due(self):
+        """
+        Once a sync is complete, swap in a rebuilt vector index if the
+        current one has outgrown its training or collected too many
+        tombstones (see FaissIndex.rebuild_due), and compacted BM25 postings
+        once enough documents were removed. Both are built under the read
+        lock, so searches keep using the old ones meanwhile; only the swap
+        takes the write lock.
+        """
+        with self.lock.read():
+            index, lexical, version = self.index, self.lexical, self.version
+            rebuilt = index.rebuilt() if index is not None and index.rebuild_due() else None
+            compacted = lexical.compacted() if lexical.compaction_due() else None
+            if rebuilt is None and compacted is None:
+                return
+        with self.lock.write():
+            if self.index is not index or self.lexical is not lexical or self.version != version:
+                return
+            if rebuilt is not None:
+                self.index = rebuilt
+            if compacted is not None:
+                self.lexical = compacted
+        if rebuilt is not None:
+            print(f"[FAISS] Rebuilt {rebuilt.index_type} index on {rebuilt.size()} vectors")
+
+    def _apply(
+        self,
+        pages: List[dict],
+        source: str,
+        chunks: List[str],
+        metadatas: List[dict],
+        vectors: np.ndarray,
+    ):
+        for p in pages:
+            self._remove_rows(p["id"])
+
+        rows = self.store.append(chunks, metadatas)
+
+        if len(vectors):
+            if self.index is None:
+                from .faiss_index import FaissIndex
+
+                self.index = FaissIndex(vectors.shape[1])
+            self.index.add(vectors, None, rows)
+        self.lexical.add(chunks, rows)
+
+        for p in pages:
+            self.pages[p["id"]] = {"fingerprint": page_fingerprint(p), "source": source}
+        if pages:
+            self.version += 1
+
+    def _remove_page(self, page_id: str):
+        self._remove_rows(page_id)
+        self.pages.pop(page_id, None)
+        self.version += 1
+
+    def _remove_rows(self, page_id: str):
+        rows = self.store.page_rows(page_id)
+        if not rows:
+            return
+        if self.index is not None:
+            self.index.remove_ids(rows)
+        for row in rows:
+            self.lexical.remove(row, self.store.text(row))
+        self.store.remove_page(page_id)
@@ -0,0 +1,177 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .config import EMBED_CACHE_ENABLED, EMBED_CACHE_MAX_ENTRIES, EMBED_CACHE_PATH
+from .metrics import CACHE_REQUESTS
+
+# SQLite caps the number of bound parameters per statement.
+_SQL_BATCH = 500
+# last_used updates of cache hits are kept in memory and written in one
+# statement once this many are pending or this many seconds have passed.
+_TOUCH_FLUSH_ENTRIES = 1000
+_TOUCH_FLUSH_SECONDS = 30.0
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def cache_key(model_id: str, text: str) -> str:
+    """Content address of an embedding: the model plus the normalized text."""
+    raw = f"{model_id}\0{_normalize(text)}".encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent (model, text) -> float32 vector cache backed by SQLite.
+    Least-recently-used entries are evicted once max_entries is exceeded.
+
+    Reads don't write: the last_used time of hits is batched in memory and
+    flushed periodically (and before evicting). The row count is tracked
+    in memory too, and only re-counted when it says an eviction is due.
+    """
+
+    def __init__(self, path: str, max_entries: int):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+        )
+        self._conn.commit()
+        # key -> last_used not yet written
+        self._touched: Dict[str, float] = {}
+        self._flushed_at = time.time()
+        (self._count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+
+    def get_many(self, model_id: str, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Return cached vectors in input order, None where the text is not
+        cached. Vectors are read-only float32 views of the stored blobs.
+        """
+        keys = [cache_key(model_id, t) for t in texts]
+        found = {}
+        now = time.time()
+
+        with self._lock:
+            unique = list(dict.fromkeys(keys))
+            for i in range(0, len(unique), _SQL_BATCH):
+                batch = unique[i:i + _SQL_BATCH]
+                marks = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype="float32")
+                    self._touched[key] = now
+            if (
+                len(self._touched) >= _TOUCH_FLUSH_ENTRIES
+                or now - self._flushed_at >= _TOUCH_FLUSH_SECONDS
+            ):
+                self._flush_touched()
+                self._conn.commit()
+
+            results = [found.get(k) for k in keys]
+            hits = sum(1 for v in results if v is not None)
+            self.hits += hits
+            self.misses += len(results) - hits
+        CACHE_REQUESTS.inc(hits, cache="embedding", outcome="hit")
+        CACHE_REQUESTS.inc(len(results) - hits, cache="embedding", outcome="miss")
+
+        return results
+
+    def put_many(self, model_id: str, texts: List[str], vectors: Sequence[Sequence[float]]):
+        now = time.time()
+        rows = [
+            (cache_key(model_id, t), np.asarray(v, dtype="float32").tobytes(), now)
+            for t, v in zip(texts, vectors)
+        ]
+        with self._lock:
+            # Keys are content addresses: an existing row already holds this vector.
+            cur = self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                rows,
+            )
+            self._count += max(cur.rowcount, 0)
+            if self._count > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def _flush_touched(self):
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                [(used, key) for key, used in self._touched.items()],
+            )
+            self._touched = {}
+        self._flushed_at = time.time()
+
+    def _evict(self):
+        # Other workers share the file, so the running count can drift; the
+        # real count is only needed now, when it says the cache is full.
+        (self._count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        excess = self._count - self.max_entries
+        if excess <= 0:
+            return
+        # Recent hits must count before picking the least recently used.
+        self._flush_touched()
+        # Evict a little extra so we don't pay for a delete on every insert.
+        excess += self.max_entries // 10
+        cur = self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN ("
+            " SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+            (excess,),
+        )
+        self.evictions += cur.rowcount
+        self._count -= cur.rowcount
+
+    def size(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        return count
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+            "evictions": self.evictions,
+            "entries": self.size(),
+        }
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Return the process-wide embedding cache, or None when disabled."""
+    global _cache
+    if not EMBED_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache(EMBED_CACHE_PATH, EMBED_CACHE_MAX_ENTRIES)
+    return _cache
@@ -1,60 +1,221 @@
 import json
-import os
-from typing import List
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
 
-import boto3
-
-from .config import BEDROCK_REGION, BEDROCK_EMBED_MODEL, AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_SESSION_TOKEN
-
-# Optional fallback to local model
-LOCAL_MODEL = False
-
-
-if os.getenv("USE_LOCAL_EMBEDDINGS", "false").lower() == "true":
-    LOCAL_MODEL = True
-
-
-if LOCAL_MODEL:
-    from sentence_transformers import SentenceTransformer
-    _local_model = SentenceTransformer("all-MiniLM-L6-v2")
+import numpy as np
 
+from .config import BEDROCK_REGION, BEDROCK_EMBED_MODEL, BEDROCK_EMBED_DIMENSIONS, AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_SESSION_TOKEN
+from .config import EMBED_BACKOFF_BASE, EMBED_BATCH_SIZE, EMBED_CONCURRENCY, EMBED_MAX_RETRIES, EMBED_RATE_LIMIT
+from .config import USE_LOCAL_EMBEDDINGS
+from . import local_embeddings
+from .embedding_cache import get_embedding_cache
+from .metrics import BEDROCK_CALLS, BEDROCK_TOKENS
+from .singleflight import SingleFlight
+from .throttle import TokenBucket, call_with_backoff
 
 _bedrock_client = None
+_embed_executor = None
+_rate_limiter = TokenBucket(EMBED_RATE_LIMIT)
+# Concurrent requests for the same text share one model call.
+_query_flights = SingleFlight("embed_query")
+_bedrock_flights = SingleFlight("bedrock_embed")
+# Width of Bedrock vectors, known up front when BEDROCK_EMBED_DIMENSIONS is
+# set, otherwise learned from the first response.
+_embed_dim: Optional[int] = BEDROCK_EMBED_DIMENSIONS or None
+
+_EMBEDDING_ARRAY = re.compile(rb'"embedding"\s*:\s*\[([^\]]*)\]')
+_TOKEN_COUNT = re.compile(rb'"inputTextTokenCount"\s*:\s*(\d+)')
+
+_RETRYABLE_ERROR_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceUnavailableException",
+    "ModelNotReadyException",
+}
+
+
+def embedding_model_id() -> str:
+    """Identifier of the active embedding model, used to key persisted vectors."""
+    if USE_LOCAL_EMBEDDINGS:
+        return local_embeddings.model_id()
+    if BEDROCK_EMBED_DIMENSIONS:
+        return f"{BEDROCK_EMBED_MODEL}:{BEDROCK_EMBED_DIMENSIONS}d"
+    return BEDROCK_EMBED_MODEL
+
+
+def ingest_batch_size() -> int:
+    """Texts per embed_texts() call during ingest."""
+    if USE_LOCAL_EMBEDDINGS:
+        return local_embeddings.ingest_batch_size()
+    return EMBED_BATCH_SIZE
 
 
 def _get_bedrock_client():
     global _bedrock_client
     if _bedrock_client is None:
+        import boto3
+
         _bedrock_client = boto3.client("bedrock-runtime", region_name=BEDROCK_REGION, aws_access_key_id=AWS_ACCESS_KEY_ID, aws_secret_access_key=AWS_SECRET_ACCESS_KEY, aws_session_token=AWS_SESSION_TOKEN)
     return _bedrock_client
 
 
-def _embed_single(text: str) -> List[float]:
-    client = _get_bedrock_client()
-    body = json.dumps({"inputText": text})
+def _get_embed_executor() -> ThreadPoolExecutor:
+    global _embed_executor
+    if _embed_executor is None:
+        _embed_executor = ThreadPoolExecutor(
+            max_workers=EMBED_CONCURRENCY, thread_name_prefix="bedrock-embed"
+        )
+    return _embed_executor
+
+
+def _is_throttling_error(e: Exception) -> bool:
+    from botocore.exceptions import ClientError
+
+    if isinstance(e, ClientError):
+        return e.response.get("Error", {}).get("Code") in _RETRYABLE_ERROR_CODES
+    return False
 
-    resp = client.invoke_model(
-        modelId=BEDROCK_EMBED_MODEL,
-        body=body,
-        accept="application/json",
-        contentType="application/json",
-    )
 
-    payload = json.loads(resp["body"].read())
-    embedding = payload.get("embedding") or payload.get("embeddings", [None])[0]
-    if embedding is None:
-        raise RuntimeError(f"Bedrock response missing embedding: {payload}")
-    return embedding
+def _request_body(text: str) -> str:
+    request = {"inputText": text}
+    if BEDROCK_EMBED_DIMENSIONS:
+        request["dimensions"] = BEDROCK_EMBED_DIMENSIONS
+    return json.dumps(request)
 
 
-def embed_texts(texts: List[str]) -> List[List[float]]:
-    """Return list of embeddings for the given list of texts using Bedrock Titan."""
-    if LOCAL_MODEL:
-        return _local_model.encode(texts).tolist()
+def _parse_embedding(raw: bytes) -> np.ndarray:
+    """
+    Parse the "embedding" array of a Titan response straight into float32,
+    without materialising a Python float per component. Falls back to the
+    JSON parser for any other response shape.
+    """
+    match = _EMBEDDING_ARRAY.search(raw)
+    if match is not None:
+        vector = np.fromstring(match.group(1), dtype=np.float32, sep=",")
+        tokens = _TOKEN_COUNT.search(raw)
+        tokens = int(tokens.group(1)) if tokens else None
+    else:
+        payload = json.loads(raw)
+        embedding = payload.get("embedding") or payload.get("embeddings", [None])[0]
+        if embedding is None:
+            raise RuntimeError(f"Bedrock response missing embedding: {payload}")
+        vector = np.asarray(embedding, dtype=np.float32)
+        tokens = payload.get("inputTextTokenCount")
+    if tokens:
+        BEDROCK_TOKENS.inc(tokens, model=BEDROCK_EMBED_MODEL, direction="input")
+    return vector
 
-    return [_embed_single(t) for t in texts]
 
+def _embed_single(text: str) -> np.ndarray:
+    # Covers texts embedded by overlapping ingests, batches and queries.
+    return _bedrock_flights.do(text, lambda: _invoke_embed(text))
+
+
+def _invoke_embed(text: str) -> np.ndarray:
+    client = _get_bedrock_client()
+    body = _request_body(text)
+
+    def invoke():
+        _rate_limiter.acquire()
+        try:
+            resp = client.invoke_model(
+                modelId=BEDROCK_EMBED_MODEL,
+                body=body,
+                accept="application/json",
+                contentType="application/json",
+            )
+        except Exception as e:
+            outcome = "throttled" if _is_throttling_error(e) else "error"
+            BEDROCK_CALLS.inc(model=BEDROCK_EMBED_MODEL, outcome=outcome)
+            raise
+        BEDROCK_CALLS.inc(model=BEDROCK_EMBED_MODEL, outcome="ok")
+        return resp
+
+    resp = call_with_backoff(
+        invoke,
+        _is_throttling_error,
+        max_retries=EMBED_MAX_RETRIES,
+        base_delay=EMBED_BACKOFF_BASE,
+    )
 
-def embed_query(text: str) -> List[float]:
-    """Return embedding for the given text."""
-    return embed_texts([text])[0]
\ No newline at end of file
+    vector = _parse_embedding(resp["body"].read())
+    if BEDROCK_EMBED_DIMENSIONS and len(vector) != BEDROCK_EMBED_DIMENSIONS:
+        raise RuntimeError(
+            f"Bedrock returned {len(vector)} dimensions, expected {BEDROCK_EMBED_DIMENSIONS}"
+        )
+    return vector
+
+
+def _embed_uncached(texts: List[str]) -> np.ndarray:
+    global _embed_dim
+    if USE_LOCAL_EMBEDDINGS:
+        return local_embeddings.encode(texts)
+
+    out = None
+    start = 0
+    if _embed_dim is None and texts:
+        first = _embed_single(texts[0])
+        _embed_dim = len(first)
+        out = np.empty((len(texts), _embed_dim), dtype=np.float32)
+        out[0] = first
+        start = 1
+    if out is None:
+        out = np.empty((len(texts), _embed_dim or 0), dtype=np.float32)
+
+    def fill(i: int):
+        out[i] = _embed_single(texts[i])
+
+    if len(texts) - start <= 1:
+        for i in range(start, len(texts)):
+            fill(i)
+    else:
+        # Bounded fan-out; each call writes its own row of the result.
+        list(_get_embed_executor().map(fill, range(start, len(texts))))
+    return out
+
+
+def embed_texts(texts: List[str]) -> np.ndarray:
+    """
+    Return a float32 (len(texts), dim) matrix of embeddings for the given
+    texts, using Bedrock Titan or the local model. Texts already in the
+    embedding cache skip the model call entirely.
+    """
+    cache = get_embedding_cache()
+    if cache is None:
+        return _embed_uncached(texts)
+
+    model_id = embedding_model_id()
+    cached = cache.get_many(model_id, texts)
+
+    # Embed each distinct missing text once, even if it repeats in the batch.
+    missing = {}
+    for i, v in enumerate(cached):
+        if v is None:
+            missing.setdefault(texts[i], []).append(i)
+
+    fresh_texts = list(missing)
+    fresh = _embed_uncached(fresh_texts) if fresh_texts else None
+    if fresh is not None:
+        dim = fresh.shape[1]
+    else:
+        dim = len(cached[0]) if cached else 0
+
+    vectors = np.empty((len(texts), dim), dtype=np.float32)
+    for i, v in enumerate(cached):
+        if v is not None:
+            vectors[i] = v
+    if fresh is not None:
+        cache.put_many(model_id, fresh_texts, fresh)
+        for text, vector in zip(fresh_texts, fresh):
+            vectors[missing[text]] = vector
+
+    return vectors
+
+
+def embed_query(text: str) -> np.ndarray:
+    """
+    Return embedding for the given text. Identical queries in flight at the
+    same time share one lookup and model call (and get the same array).
+    """
+    return _query_flights.do(text, lambda: embed_texts([text])[0])
\ No newline at end of file
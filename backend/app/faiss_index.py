@@ -1,40 +1,524 @@
+import copy
+import math
+import os
+
 import faiss
 import numpy as np
-from typing import List, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from .config import (
+    FAISS_COMPACT_RATIO,
+    FAISS_HNSW_EF_CONSTRUCTION,
+    FAISS_HNSW_EF_SEARCH,
+    FAISS_HNSW_M,
+    FAISS_INDEX_TYPE,
+    FAISS_IVF_NLIST,
+    FAISS_MIN_TRAIN_POINTS,
+    FAISS_NPROBE,
+    FAISS_PQ_M,
+    FAISS_RESCORE_FACTOR,
+    FAISS_VECTOR_DTYPE,
+)
+
+INDEX_TYPES = ("flat", "hnsw", "ivf", "ivfpq", "sq8")
+
+# Index types that must see training data before vectors can be added.
+_TRAINED_TYPES = ("ivf", "ivfpq", "sq8")
+
+# Training sample cap for rebuilt(); FAISS subsamples beyond this anyway
+# (at most 256 points per IVF list or PQ centroid).
+_MAX_TRAIN_POINTS = 100_000
+# Vectors reconstructed and re-added per step by rebuilt().
+_REBUILD_CHUNK = 65_536
+
+# Stored vector precision -> FAISS codec for the flat, hnsw and ivf types.
+# ivfpq and sq8 already choose their own encoding.
+VECTOR_DTYPES = {"float32": "Flat", "float16": "SQfp16", "int8": "SQ8"}
+
+
+def _ivf_nlist(n: int) -> int:
+    if FAISS_IVF_NLIST > 0:
+        return FAISS_IVF_NLIST
+    # ~4*sqrt(n) lists, keeping at least 39 training points per centroid.
+    return max(1, min(int(4 * math.sqrt(n)), n // 39))
+
+
+def _pq_m(dim: int) -> int:
+    # PQ needs the number of sub-quantizers to divide the dimension.
+    m = min(FAISS_PQ_M, dim)
+    while dim % m:
+        m -= 1
+    return m
+
+
+def _ivf_ids(ivf) -> np.ndarray:
+    """Ids stored in an IVF index's inverted lists."""
+    invlists = ivf.invlists
+    parts = [
+        faiss.rev_swig_ptr(invlists.get_ids(l), invlists.list_size(l)).copy()
+        for l in range(ivf.nlist)
+        if invlists.list_size(l)
+    ]
+    return np.concatenate(parts) if parts else np.zeros(0, dtype="int64")
+
+
+def _stand_in_dtype(vector_dtype: str) -> str:
+    # Codec of the flat index used until there is enough data to train on;
+    # it must not need training itself.
+    return "float32" if vector_dtype == "float32" else "float16"
+
+
+def _is_stand_in(index: faiss.Index) -> bool:
+    base = faiss.downcast_index(index.index) if hasattr(index, "id_map") else index
+    if isinstance(base, faiss.IndexFlat):
+        return True
+    return isinstance(base, faiss.IndexScalarQuantizer) and base.sq.qtype == faiss.ScalarQuantizer.QT_fp16
+
+
+def _exact_path(path: str) -> str:
+    # float16 copies of int8-stored vectors, saved next to the index.
+    return os.path.splitext(path)[0] + "_f16.npy"
+
+
+def factory_string(index_type: str, dim: int, n: int, vector_dtype: str = "float32") -> str:
+    """FAISS index_factory description for an index type and training set size."""
+    codec = VECTOR_DTYPES[vector_dtype]
+    if index_type == "flat":
+        return codec
+    if index_type == "hnsw":
+        return f"HNSW{FAISS_HNSW_M}" if codec == "Flat" else f"HNSW{FAISS_HNSW_M},{codec}"
+    if index_type == "ivf":
+        return f"IVF{_ivf_nlist(n)},{codec}"
+    if index_type == "ivfpq":
+        return f"IVF{_ivf_nlist(n)},PQ{_pq_m(dim)}"
+    if index_type == "sq8":
+        return "SQ8"
+    raise ValueError(f"Unknown FAISS index type {index_type!r}; expected one of {INDEX_TYPES}")
 
 
 class FaissIndex:
-    def __init__(self, dim: int):
+    """
+    Cosine-similarity vector index. Each vector keeps a stable int64 id (the
+    chunk row id) across adds and removals, so it can be dropped or replaced
+    per page_id: IVF indexes store ids themselves, the others live in an
+    IndexIDMap2.
+
+    Indexes that need training (ivf, ivfpq, sq8, int8 storage) start as an
+    exact flat index, since brute force is both exact and fast while small.
+    Once it holds FAISS_MIN_TRAIN_POINTS vectors, and again whenever it has
+    doubled since, rebuild_due() is true and rebuilt() returns the
+    configured index trained on every vector: nlist is sized for the whole
+    corpus and int8 value ranges cover all of it.
+
+    HNSW graphs cannot delete, so removed ids are tombstoned and filtered
+    out of results; once more than FAISS_COMPACT_RATIO of the stored vectors
+    are tombstones, rebuild_due() is true as well and rebuilt() drops them.
+
+    vector_dtype sets the stored precision: float16 halves memory with no
+    measurable recall loss; int8 quarters it, and searches then fetch
+    FAISS_RESCORE_FACTOR times more candidates and re-rank them against a
+    float16 copy of the vectors, which is memory-mapped once published.
+    """
+
+    def __init__(
+        self,
+        dim: int,
+        index_type: str = FAISS_INDEX_TYPE,
+        vector_dtype: str = FAISS_VECTOR_DTYPE,
+    ):
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown FAISS index type {index_type!r}; expected one of {INDEX_TYPES}")
+        if vector_dtype not in VECTOR_DTYPES:
+            raise ValueError(f"Unknown vector dtype {vector_dtype!r}; expected one of {tuple(VECTOR_DTYPES)}")
         self.dim = dim
-        self.index = faiss.IndexFlatIP(dim)
-        self.metadatas = []
+        self.index_type = index_type
+        self.vector_dtype = vector_dtype
+        self._rescore = vector_dtype == "int8" and FAISS_RESCORE_FACTOR > 0
+        # Row i holds the normalized float16 vector of id i (rescoring only).
+        self._exact = np.zeros((0, dim), dtype=np.float16)
+        self.metadatas: Dict[int, dict] = {}
+        self._page_ids: Dict[str, List[int]] = {}
+        self._next_id = 0
+        # Ids removed from index types that cannot delete in place (HNSW).
+        self._tombstones = set()
+        self._read_only = False
+        # File a memory-mapped index was loaded from; _ensure_writable reads
+        # it again rather than copying the mapped index.
+        self._mmap_path: Optional[str] = None
+        # Vectors the current index was trained on; 0 while it is the exact
+        # stand-in for an index type that needs training.
+        self._trained_size = 0
+        if self._needs_training():
+            self.index: faiss.Index = self._create("flat", 0, _stand_in_dtype(vector_dtype))
+        else:
+            self.index = self._create(index_type, 0)
+
+    def _needs_training(self) -> bool:
+        # int8 storage learns its value range from the data, like sq8.
+        return self.index_type in _TRAINED_TYPES or self.vector_dtype == "int8"
+
+    def _create(self, index_type: str, n: int, vector_dtype: Optional[str] = None) -> faiss.Index:
+        base = faiss.index_factory(
+            self.dim,
+            factory_string(index_type, self.dim, n, vector_dtype or self.vector_dtype),
+            faiss.METRIC_INNER_PRODUCT,
+        )
+        if index_type == "hnsw":
+            base.hnsw.efConstruction = FAISS_HNSW_EF_CONSTRUCTION
+        ivf = faiss.try_extract_index_ivf(base)
+        if ivf is not None:
+            # IndexIDMap's removal assumes the inner index shifts rows down
+            # like a flat index; IVF doesn't, so it keeps the ids itself. The
+            # hash map lets remove_ids and reconstruct find vectors by id.
+            ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+            index = base
+        else:
+            index = faiss.IndexIDMap2(base)
+        self.set_search_params(nprobe=FAISS_NPROBE, ef_search=FAISS_HNSW_EF_SEARCH, index=index)
+        return index
+
+    def _train(self, sample: np.ndarray, n: int):
+        """Replace the (empty) index with the configured type, trained on `sample` for `n` vectors."""
+        self.index = self._create(self.index_type, n)
+        self.index.train(sample)
+        self._trained_size = n
+
+    def _stored_ids(self) -> np.ndarray:
+        if hasattr(self.index, "id_map"):
+            return faiss.vector_to_array(self.index.id_map)
+        return _ivf_ids(faiss.extract_index_ivf(self.index))
 
-    def add(self, vectors: List[List[float]], metadatas: List[dict]):
-        arr = np.array(vectors).astype("float32")
+    def _live_ids(self) -> np.ndarray:
+        ids = self._stored_ids()
+        if self._tombstones:
+            ids = ids[~np.isin(ids, np.fromiter(self._tombstones, dtype="int64"))]
+        return ids
+
+    def _vectors(self, ids: np.ndarray) -> np.ndarray:
+        """Normalized float32 vectors for ids, preferring the float16 copy over lossy codes."""
+        if self._rescore and len(ids) and int(ids.max()) < len(self._exact):
+            return self._exact[ids].astype(np.float32)
+        return self.index.reconstruct_batch(ids)
+
+    def rebuild_due(self) -> bool:
+        """True when rebuilt() would train a better index or drop enough tombstones."""
+        if self._tombstones and len(self._tombstones) > FAISS_COMPACT_RATIO * self.index.ntotal:
+            return True
+        if not self._needs_training():
+            return False
+        n = self.size()
+        return n >= FAISS_MIN_TRAIN_POINTS and n >= 2 * self._trained_size
+
+    def rebuilt(self) -> "FaissIndex":
+        """
+        A new index with the same settings and vectors, trained on all of
+        them (or a random sample of _MAX_TRAIN_POINTS). Leaves this index
+        untouched, so searches can keep using it while the new one builds.
+        """
+        ids = self._live_ids()
+        fresh = FaissIndex(self.dim, self.index_type, self.vector_dtype)
+        if self._needs_training() and len(ids) >= FAISS_MIN_TRAIN_POINTS:
+            sample = ids
+            if len(ids) > _MAX_TRAIN_POINTS:
+                sample = np.sort(np.random.default_rng(0).choice(ids, _MAX_TRAIN_POINTS, replace=False))
+            fresh._train(self._vectors(sample), len(ids))
+        for start in range(0, len(ids), _REBUILD_CHUNK):
+            chunk = ids[start:start + _REBUILD_CHUNK]
+            fresh.add(self._vectors(chunk), None, chunk)
+        fresh.metadatas = dict(self.metadatas)
+        fresh._page_ids = {page_id: list(rows) for page_id, rows in self._page_ids.items()}
+        fresh._next_id = self._next_id
+        return fresh
+
+    def set_search_params(
+        self,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        index: Optional[faiss.Index] = None,
+    ):
+        """Tune the speed/recall trade-off: IVF nprobe and HNSW efSearch."""
+        index = index if index is not None else self.index
+        if index is None:
+            return
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None and nprobe is not None:
+            ivf.nprobe = min(nprobe, ivf.nlist)
+        base = faiss.downcast_index(index.index) if hasattr(index, "id_map") else index
+        if hasattr(base, "hnsw") and ef_search is not None:
+            base.hnsw.efSearch = ef_search
+
+    def _ensure_writable(self):
+        # A memory-mapped index is backed by a read-only file, and an index
+        # shared by copy() with another FaissIndex; take a private copy before
+        # the first mutation. Memory-mapped IVF lists are OnDiskInvertedLists,
+        # which cannot be serialized back into memory, so an index still
+        # backed by its file is read again from it without mmap.
+        if self._read_only:
+            if self._mmap_path is not None:
+                self.index = faiss.read_index(self._mmap_path)
+            else:
+                self.index = faiss.deserialize_index(faiss.serialize_index(self.index))
+            self.set_search_params(nprobe=FAISS_NPROBE, ef_search=FAISS_HNSW_EF_SEARCH)
+            self._read_only = False
+            self._mmap_path = None
+
+    def copy(self) -> "FaissIndex":
+        """
+        A copy that can be changed without affecting this index. The FAISS
+        index and float16 vectors are shared until either copy next writes,
+        which then takes its private copy first.
+        """
+        other = copy.copy(self)
+        for index in (self, other):
+            index._read_only = True
+            # Read-only views: _store_exact copies before writing.
+            index._exact = self._exact.view()
+            index._exact.flags.writeable = False
+        other.metadatas = dict(self.metadatas)
+        other._page_ids = {page_id: list(ids) for page_id, ids in self._page_ids.items()}
+        other._tombstones = set(self._tombstones)
+        return other
+
+    def _store_exact(self, ids: List[int], arr: np.ndarray):
+        exact = self._exact
+        capacity = len(exact)
+        if max(ids) >= capacity:
+            capacity = max(max(ids) + 1, capacity * 2, 1024)
+        if capacity != len(exact) or not exact.flags.writeable:
+            # Grow, or take a private copy of a memory-mapped file.
+            grown = np.zeros((capacity, self.dim), dtype=np.float16)
+            grown[: len(exact)] = exact
+            self._exact = exact = grown
+        exact[ids] = arr
+
+    def _rescore_hits(
+        self, queries: np.ndarray, indices: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Re-rank candidate ids by their float16 inner product with each query."""
+        valid = indices >= 0
+        candidates = self._exact[np.where(valid, indices, 0)].astype(np.float32)
+        scores = np.einsum("qkd,qd->qk", candidates, queries)
+        scores[~valid] = -np.inf
+        order = np.argsort(-scores, axis=1, kind="stable")
+        return np.take_along_axis(scores, order, 1), np.take_along_axis(indices, order, 1)
+
+    def add(
+        self,
+        vectors: Union[np.ndarray, List[List[float]]],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[Sequence[int]] = None,
+    ) -> List[int]:
+        """
+        Add vectors under the given ids (default: next free ids). Returns the
+        ids. Callers that keep metadata themselves (Corpus) pass None and
+        manage removals by id. A float32 matrix (what embed_texts returns) is
+        normalized in place instead of copied.
+        """
+        arr = np.ascontiguousarray(vectors, dtype=np.float32)
+        if ids is None:
+            ids = range(self._next_id, self._next_id + len(arr))
+        ids = [int(i) for i in ids]
 
         # normalize for cosine similarity
         faiss.normalize_L2(arr)
 
-        self.index.add(arr)
-        self.metadatas.extend(metadatas)
+        if (
+            self._needs_training() and not self._trained_size
+            and self.index.ntotal == 0 and len(arr) >= FAISS_MIN_TRAIN_POINTS
+        ):
+            # The whole index arrives at once (a full build): train on it
+            # directly rather than via the flat stand-in and a rebuild.
+            self._train(arr, len(arr))
 
-    def search(
+        self._ensure_writable()
+        self.index.add_with_ids(arr, np.array(ids, dtype="int64"))
+        if self._rescore and ids:
+            self._store_exact(ids, arr)
+
+        self._tombstones.difference_update(ids)
+        for i, meta in zip(ids, metadatas or ()):
+            self.metadatas[i] = meta
+            page_id = meta.get("page_id")
+            if page_id is not None:
+                self._page_ids.setdefault(page_id, []).append(i)
+        if ids:
+            self._next_id = max(self._next_id, max(ids) + 1)
+        return ids
+
+    def remove_ids(self, ids: Sequence[int]):
+        ids = [int(i) for i in ids]
+        if not ids or self.index is None:
+            return
+        self._ensure_writable()
+        try:
+            self.index.remove_ids(np.array(ids, dtype="int64"))
+        except RuntimeError:
+            # HNSW graphs do not support deletion; hide the ids at search time.
+            self._tombstones.update(ids)
+        for i in ids:
+            meta = self.metadatas.pop(i, None)
+            if meta is None:
+                continue
+            page_rows = self._page_ids.get(meta.get("page_id"))
+            if page_rows is not None:
+                page_rows.remove(i)
+                if not page_rows:
+                    del self._page_ids[meta.get("page_id")]
+
+    def remove_page(self, page_id: str) -> List[int]:
+        """Remove every vector belonging to page_id. Returns the removed ids."""
+        ids = list(self._page_ids.get(page_id, []))
+        self.remove_ids(ids)
+        return ids
+
+    def upsert_page(
+        self,
+        page_id: str,
+        vectors: List[List[float]],
+        metadatas: List[dict],
+        ids: Optional[Sequence[int]] = None,
+    ) -> List[int]:
+        """Replace all vectors of page_id with the given ones."""
+        self.remove_page(page_id)
+        return self.add(vectors, metadatas, ids)
+
+    def search_ids(
         self, vector: List[float], top_k: int = 4
-    ) -> List[Tuple[dict, float]]:
-        v = np.array([vector]).astype("float32")
+    ) -> List[Tuple[int, float]]:
+        """Return (row_id, cosine score) pairs; row_id indexes the chunk list."""
+        return self.search_ids_batch([vector], top_k)[0]
+
+    def search_ids_batch(
+        self, vectors: List[List[float]], top_k: int = 4
+    ) -> List[List[Tuple[int, float]]]:
+        """search_ids for many query vectors in a single FAISS call."""
+        if self.index is None or self.index.ntotal == 0:
+            return [[] for _ in vectors]
+
+        v = np.array(vectors, dtype="float32").reshape(len(vectors), -1)
 
         # normalize for cosine similarity
         faiss.normalize_L2(v)
 
-        distances, indices = self.index.search(v, top_k)
+        want = top_k * FAISS_RESCORE_FACTOR if self._rescore else top_k
+        dead = len(self._tombstones)
+        # Over-fetch for tombstoned hits in proportion to their share, with
+        # room for a few replaced pages clustered near the query. Only rows
+        # still short after that are searched again with the full margin.
+        extra = min(dead, 2 * want * dead // max(self.index.ntotal - dead, 1) + 32)
+        hits = self._search_live(v, top_k, min(want + extra, self.index.ntotal))
+        short = [
+            i for i, row in enumerate(hits)
+            if len(row) < top_k and extra < dead and want + extra < self.index.ntotal
+        ]
+        if short:
+            retry = self._search_live(v[short], top_k, min(want + dead, self.index.ntotal))
+            for i, row in zip(short, retry):
+                hits[i] = row
+        return hits
 
-        results = []
-        for score, idx in zip(distances[0], indices[0]):
-            if idx == -1:
-                continue
-            results.append((self.metadatas[idx], float(score)))
+    def _search_live(self, v: np.ndarray, top_k: int, fetch: int) -> List[List[Tuple[int, float]]]:
+        distances, indices = self.index.search(v, fetch)
+        if self._rescore:
+            distances, indices = self._rescore_hits(v, indices)
+
+        return [
+            [
+                (int(idx), float(score))
+                for score, idx in zip(row_distances, row_indices)
+                if idx != -1 and int(idx) not in self._tombstones
+            ][:top_k]
+            for row_distances, row_indices in zip(distances, indices)
+        ]
 
-        return results
+    def search(
+        self, vector: List[float], top_k: int = 4
+    ) -> List[Tuple[dict, float]]:
+        return [
+            (self.metadatas[idx], score)
+            for idx, score in self.search_ids(vector, top_k)
+        ]
 
     def size(self):
-        return self.index.ntotal
+        if self.index is None:
+            return 0
+        return self.index.ntotal - len(self._tombstones)
+
+    def save(self, path: str):
+        """Write the FAISS vectors to disk. Metadatas are persisted separately."""
+        faiss.write_index(self.index, path)
+        if self._rescore:
+            np.save(_exact_path(path), self._exact[: self._next_id])
+
+    @classmethod
+    def load(
+        cls,
+        path: str,
+        metadatas: Optional[List[Optional[dict]]] = None,
+        mmap: bool = False,
+        removed_ids: Optional[Sequence[int]] = None,
+    ) -> "FaissIndex":
+        """
+        Load vectors written by save(). metadatas is indexed by vector id, with
+        None for removed ids; callers without per-id metadata pass the removed
+        ids instead. With mmap=True the index data is memory-mapped instead of
+        copied, so startup does not scale with index size.
+        """
+        index = None
+        read_only = False
+        if mmap:
+            try:
+                index = faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+                read_only = True
+            except RuntimeError:
+                # Not every index type supports mmap; fall back to a regular read.
+                index = None
+        if index is None:
+            index = faiss.read_index(path)
+
+        obj = cls.__new__(cls)
+        obj.dim = index.d
+        obj.index_type = FAISS_INDEX_TYPE
+        obj.vector_dtype = FAISS_VECTOR_DTYPE
+        obj.index = index
+        exact_path = _exact_path(path)
+        obj._rescore = FAISS_RESCORE_FACTOR > 0 and os.path.exists(exact_path)
+        if obj._rescore:
+            obj._exact = np.load(exact_path, mmap_mode="r" if mmap else None)
+        else:
+            obj._exact = np.zeros((0, obj.dim), dtype=np.float16)
+        obj.metadatas = {}
+        obj._page_ids = {}
+        obj._tombstones = set()
+        obj._read_only = read_only
+        obj._mmap_path = path if read_only else None
+        # A saved index of a trained type is either trained, on about its
+        # current size, or still the flat stand-in.
+        ivf = faiss.try_extract_index_ivf(index)
+        if obj._needs_training() and not _is_stand_in(index):
+            obj._trained_size = index.ntotal
+        else:
+            obj._trained_size = 0
+        obj._next_id = len(metadatas) if metadatas is not None else 0
+        for i, meta in enumerate(metadatas or ()):
+            if meta is None:
+                continue
+            obj.metadatas[i] = meta
+            page_id = meta.get("page_id")
+            if page_id is not None:
+                obj._page_ids.setdefault(page_id, []).append(i)
+        # Ids still in the index without metadata were removed from an index
+        # type that cannot delete in place.
+        if hasattr(index, "id_map"):
+            stored_ids = faiss.vector_to_array(index.id_map)
+            if metadatas is not None:
+                obj._tombstones = {int(i) for i in stored_ids if int(i) not in obj.metadatas}
+            elif removed_ids is not None and len(removed_ids):
+                obj._tombstones = set(np.intersect1d(stored_ids, removed_ids).tolist())
+            if len(stored_ids):
+                obj._next_id = max(obj._next_id, int(stored_ids.max()) + 1)
+        elif ivf is not None and index.ntotal:
+            obj._next_id = max(obj._next_id, int(_ivf_ids(ivf).max()) + 1)
+        # Search-time parameters are not part of the serialized index.
+        obj.set_search_params(nprobe=FAISS_NPROBE, ef_search=FAISS_HNSW_EF_SEARCH)
+        return obj
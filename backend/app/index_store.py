@@ -0,0 +1,325 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows dev boxes run a single worker
+    fcntl = None
+
+from .chunk_store import ChunkStore
+from .chunking import CHUNKER_VERSION
+from .config import CHUNK_ENCODING, CHUNK_SIZE, CHUNK_TOKENS, CHUNKER, FAISS_INDEX_TYPE, FAISS_VECTOR_DTYPE
+from .config import INDEX_DIR, INDEX_KEEP_VERSIONS, INDEX_MMAP
+from .corpus import Corpus
+from .embeddings import embedding_model_id
+from .lexical_index import BM25Index
+from .shards import ShardedCorpus
+
+# Bump when the on-disk layout changes so old artifacts are rebuilt.
+ARTIFACT_FORMAT = 7
+
+# Layout under INDEX_DIR:
+#   shards/<namespace>-<hash>/s000007/
+#                      one shard: index.faiss (+ index_f16.npy for int8
+#                      storage), chunk store files (see chunk_store.py),
+#                      BM25 postings (see lexical_index.py), pages.json
+#   versions/v000042/  shards.json (namespace -> shard directory), manifest.json
+#   CURRENT      name of the live version, swapped atomically on publish
+#   writer.lock  held by whichever worker is building or ingesting
+#   jobs/<id>.json  status of each ingest job, so any worker can report it
+#   jobs.lock    held while a job file is read or written
+# Published versions and shards are never modified, so every uvicorn worker
+# can memory-map the same files and share them through the page cache, and
+# versions share the directories of shards they didn't change.
+MANIFEST_FILE = "manifest.json"
+INDEX_FILE = "index.faiss"
+PAGES_FILE = "pages.json"
+SHARDS_FILE = "shards.json"
+SHARDS_DIR = "shards"
+VERSIONS_DIR = "versions"
+CURRENT_FILE = "CURRENT"
+LOCK_FILE = "writer.lock"
+JOBS_DIR = "jobs"
+JOBS_LOCK_FILE = "jobs.lock"
+
+_writer_thread_lock = threading.Lock()
+_jobs_thread_lock = threading.Lock()
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def build_manifest(source_files: List[Path]) -> dict:
+    """
+    Describe everything the persisted index depends on: source file hashes,
+    the embedding model and dimensions, the chunking settings and the FAISS
+    index type and vector precision. Any change means a rebuild.
+    """
+    return {
+        "format": ARTIFACT_FORMAT,
+        "embed_model": embedding_model_id(),
+        "chunker": CHUNKER,
+        "chunker_version": CHUNKER_VERSION,
+        "chunk_size": CHUNK_SIZE if CHUNKER == "chars" else CHUNK_TOKENS,
+        "chunk_encoding": CHUNK_ENCODING,
+        "index_type": FAISS_INDEX_TYPE,
+        "vector_dtype": FAISS_VECTOR_DTYPE,
+        "sources": {p.name: file_sha256(p) for p in source_files},
+    }
+
+
+def _compatible(stored: dict, manifest: dict) -> bool:
+    """Same format, model, chunking and index type; sources may differ."""
+    strip = lambda m: {k: v for k, v in m.items() if k != "sources"}
+    return strip(stored) == strip(manifest)
+
+
+@contextmanager
+def _file_lock(path: Path, thread_lock: threading.Lock):
+    """Exclusive lock across threads (thread_lock) and worker processes (flock on path)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with thread_lock:
+        with path.open("a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+
+@contextmanager
+def writer_lock(index_dir: str = INDEX_DIR):
+    """
+    Serialize index builds and ingests across threads and worker processes,
+    so two workers never build the same version or publish over each other.
+    """
+    with _file_lock(Path(index_dir) / LOCK_FILE, _writer_thread_lock):
+        yield
+
+
+@contextmanager
+def jobs_lock(index_dir: str = INDEX_DIR):
+    """
+    Serialize reads and writes of ingest job files (JOBS_DIR). Separate from
+    writer_lock, which a running ingest holds for its whole duration.
+    """
+    with _file_lock(Path(index_dir) / JOBS_LOCK_FILE, _jobs_thread_lock):
+        yield
+
+
+def current_version(index_dir: str = INDEX_DIR) -> Optional[str]:
+    """Name of the published version workers should be serving, if any."""
+    try:
+        return (Path(index_dir) / CURRENT_FILE).read_text(encoding="utf-8").strip() or None
+    except OSError:
+        return None
+
+
+def _load_shard(root: Path) -> Corpus:
+    with (root / PAGES_FILE).open("r", encoding="utf-8") as f:
+        pages = json.load(f)
+    store = ChunkStore.load(root, mmap_files=INDEX_MMAP)
+    index = None
+    if (root / INDEX_FILE).exists():
+        from .faiss_index import FaissIndex
+
+        index = FaissIndex.load(
+            str(root / INDEX_FILE), mmap=INDEX_MMAP, removed_ids=store.removed_rows()
+        )
+    lexical = BM25Index.load(root, mmap_files=INDEX_MMAP)
+    return Corpus.from_store(index, store, pages, lexical)
+
+
+def load_corpus(
+    manifest: dict,
+    index_dir: str = INDEX_DIR,
+    previous: Optional[ShardedCorpus] = None,
+) -> Tuple[Optional[ShardedCorpus], bool]:
+    """
+    Load the current published corpus if it was built with compatible
+    settings. Returns (corpus or None, up_to_date). up_to_date is True only
+    when the stored source hashes also match, i.e. nothing needs re-syncing.
+    The returned corpus records the version it came from in `artifact`.
+
+    Shards of `previous` that were loaded from the same shard directory and
+    not modified since are reused instead of loaded again, so a new version
+    that only changed one namespace only loads that shard.
+    """
+    name = current_version(index_dir)
+    if name is None:
+        return None, False
+    root = Path(index_dir) / VERSIONS_DIR / name
+    manifest_path = root / MANIFEST_FILE
+
+    try:
+        with manifest_path.open("r", encoding="utf-8") as f:
+            stored = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"[INDEX] Ignoring unreadable manifest {manifest_path}: {e}")
+        return None, False
+
+    if not _compatible(stored, manifest):
+        return None, False
+
+    corpus = ShardedCorpus()
+    try:
+        with (root / SHARDS_FILE).open("r", encoding="utf-8") as f:
+            shard_dirs = json.load(f)
+        for namespace, shard_dir in shard_dirs.items():
+            if (
+                previous is not None
+                and namespace in previous.loaded
+                and previous.published.get(namespace, (None,))[0] == shard_dir
+                and previous.is_published(namespace)
+            ):
+                shard = previous.shards[namespace]
+            else:
+                shard = _load_shard(Path(index_dir) / SHARDS_DIR / shard_dir)
+                shard.artifact = shard_dir
+            corpus.shards[namespace] = shard
+            corpus.published[namespace] = (shard_dir, shard.version)
+            corpus.loaded.add(namespace)
+    except Exception as e:
+        print(f"[INDEX] Failed to load persisted index {name}: {e}")
+        return None, False
+
+    corpus.artifact = name
+    return corpus, stored == manifest
+
+
+def _next_version(parent: Path, prefix: str = "v") -> str:
+    numbers = [
+        int(p.name[len(prefix):]) for p in parent.iterdir()
+        if p.is_dir() and p.name.startswith(prefix) and p.name[len(prefix):].isdigit()
+    ]
+    return f"{prefix}{max(numbers, default=0) + 1:06d}"
+
+
+def _shard_slug(namespace: str) -> str:
+    # Readable, filesystem-safe, and distinct even when two names sanitize alike.
+    safe = re.sub(r"[^A-Za-z0-9_.-]+", "-", namespace).strip("-.") or "shard"
+    return f"{safe}-{hashlib.sha1(namespace.encode('utf-8')).hexdigest()[:8]}"
+
+
+def _write_atomic(path: Path, text: str):
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _prune_versions(root: Path, keep: int):
+    """
+    Delete old versions beyond the newest `keep`, then shard directories no
+    remaining version refers to. Workers still mapping a deleted index keep
+    their mapping (the inode lives until unmapped); keeping a few back
+    covers workers that are mid-load.
+    """
+    current = current_version(str(root))
+    versions = sorted(
+        p for p in (root / VERSIONS_DIR).iterdir() if p.is_dir() and p.name.startswith("v")
+    )
+    for path in versions[: max(0, len(versions) - keep)]:
+        if path.name != current:
+            shutil.rmtree(path, ignore_errors=True)
+
+    referenced = set()
+    for path in (root / VERSIONS_DIR).iterdir():
+        if not (path.is_dir() and path.name.startswith("v")):
+            continue
+        try:
+            with (path / SHARDS_FILE).open("r", encoding="utf-8") as f:
+                referenced.update(json.load(f).values())
+        except (OSError, json.JSONDecodeError):
+            # Can't tell what this version needs; keep every shard.
+            return
+    for parent in (root / SHARDS_DIR).iterdir():
+        for path in parent.iterdir():
+            if path.name.startswith("s") and f"{parent.name}/{path.name}" not in referenced:
+                shutil.rmtree(path, ignore_errors=True)
+
+
+def _save_shard(shards_root: Path, namespace: str, shard: Corpus) -> Tuple[str, int]:
+    """Write one shard to a new directory. Returns (its path under shards/, shard version saved)."""
+    parent = shards_root / _shard_slug(namespace)
+    parent.mkdir(parents=True, exist_ok=True)
+    name = _next_version(parent, prefix="s")
+    staging = parent / f".{name}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir()
+
+    # Hold off ingest writes so index and chunk store are a consistent snapshot.
+    with shard.lock.read():
+        version = shard.version
+        if shard.index is not None and shard.index.index is not None:
+            shard.index.save(str(staging / INDEX_FILE))
+
+        shard.store.save(staging)
+        shard.lexical.save(staging)
+        with (staging / PAGES_FILE).open("w", encoding="utf-8") as f:
+            json.dump(shard.pages, f, ensure_ascii=False, separators=(",", ":"))
+
+    os.rename(staging, parent / name)
+    return f"{parent.name}/{name}", version
+
+
+def save_corpus(manifest: dict, corpus: ShardedCorpus, index_dir: str = INDEX_DIR) -> str:
+    """
+    Publish the corpus as a new read-only version. Only shards changed
+    since they were last published are written, each to a fresh shard
+    directory; the version itself is a small directory listing which shard
+    directory serves each namespace, plus the manifest. It is renamed into
+    place before CURRENT is switched to it, so readers only ever see a
+    complete version. Callers hold writer_lock(). Returns the new
+    version's name.
+    """
+    root = Path(index_dir)
+    versions = root / VERSIONS_DIR
+    versions.mkdir(parents=True, exist_ok=True)
+    (root / SHARDS_DIR).mkdir(parents=True, exist_ok=True)
+
+    shard_dirs = {}
+    written = []
+    for namespace, shard in sorted(corpus.shards.items()):
+        if not corpus.is_published(namespace):
+            corpus.published[namespace] = _save_shard(root / SHARDS_DIR, namespace, shard)
+            # The in-memory shard is now a private copy; reload it mapped.
+            corpus.loaded.discard(namespace)
+            shard.artifact = corpus.published[namespace][0]
+            written.append(namespace)
+        shard_dirs[namespace] = corpus.published[namespace][0]
+
+    name = _next_version(versions)
+    staging = versions / f".{name}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir()
+    with (staging / SHARDS_FILE).open("w", encoding="utf-8") as f:
+        json.dump(shard_dirs, f, indent=2, sort_keys=True)
+    with (staging / MANIFEST_FILE).open("w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    os.rename(staging, versions / name)
+    corpus.artifact = name
+    _write_atomic(root / CURRENT_FILE, name + "\n")
+    _prune_versions(root, INDEX_KEEP_VERSIONS)
+    print(
+        f"[INDEX] Published index version {name} ({corpus.size()} chunks, "
+        f"rewrote shards: {', '.join(written) or 'none'})"
+    )
+    return name
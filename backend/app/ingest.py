@@ -1,92 +1,21 @@
-import requests
-import re
-from typing import List
+import time
+from typing import Iterator, List, Optional, Tuple
 
+import numpy as np
+
+from .chunking import ChunkDeduper, chunk_text, dedupe_chunks
 from .config import (
     CHUNK_SIZE,
-    CONFLUENCE_API_TOKEN,
-    CONFLUENCE_BASE_URL,
-    CONFLUENCE_EMAIL,
+    CHUNKER,
     PDF_PATH,
 )
-from .embeddings import embed_texts
+from .embedding_cache import get_embedding_cache
+from .embeddings import embed_texts, ingest_batch_size
+from .pdf_pipeline import iter_pdf_pages
 from pathlib import Path
-import PyPDF2
-from pdf2image import convert_from_path
-import pytesseract
-
-
-def fetch_confluence_pages(space_key: str, limit: int = 200) -> List[dict]:
-    """
-    Fetch pages from a Confluence space using the REST API.
-    Requires CONFLUENCE_EMAIL and CONFLUENCE_API_TOKEN if the space is private.
-    """
-    results = []
-    start = 0
-    base_url = CONFLUENCE_BASE_URL.rstrip("/")
-    url = f"{base_url}/rest/api/content"
-    auth = (
-        (CONFLUENCE_EMAIL, CONFLUENCE_API_TOKEN)
-        if CONFLUENCE_EMAIL and CONFLUENCE_API_TOKEN
-        else None
-    )
-    params = {
-        "spaceKey": space_key,
-        "expand": "body.storage",
-        "limit": 50,
-        "type": "page",
-    }
-
-    while True:
-        params["start"] = start
-
-        r = requests.get(url, params=params, auth=auth)
-        r.raise_for_status()
-        data = r.json()
-
-        items = data.get("results", [])
-        if not items:
-            break
-
-        for item in items:
-            title = item.get("title")
-            if idx == 0:
-                print("Title: ", title)
-                print("Body: ", body)
-            page_id = item.get("id")
-            body = item.get("body", {}).get("storage", {}).get("value", "")
-            text = _html_to_text(body)
-
-            results.append({
-                "id": page_id,
-                "title": title,
-                "text": text,
-            })
-
-        start += params["limit"]
-        if start >= limit:
-            break
 
-        # Stop if the API indicates there are no more pages
-        if data.get("size", 0) < params["limit"]:
-            break
 
-    return results
-
-
-def _html_to_text(html: str) -> str:
-    """
-    Very naive HTML -> text stripper.
-    For production use, consider BeautifulSoup.
-    """
-    clean = re.sub(r"<script.*?>.*?</script>", "", html, flags=re.S)
-    clean = re.sub(r"<style.*?>.*?</style>", "", clean, flags=re.S)
-    clean = re.sub(r"<[^<]+?>", "", clean)
-    clean = re.sub(r"\s+", " ", clean)
-    return clean.strip()
-
-
-def chunk_text(
+def chunk_text_by_chars(
     text: str,
     chunk_size: int = CHUNK_SIZE,
     overlap: int = 50,
@@ -94,6 +23,7 @@ def chunk_text(
     """
     Chunk text into overlapping windows by characters.
     Returns list of chunk strings.
+    Kept for comparison (CHUNKER=chars); see chunking.chunk_text.
     """
     text = text.strip()
 
@@ -112,25 +42,38 @@ def chunk_text(
     return chunks
 
 
-def build_corpus_and_embeddings(pages: List[dict]):
+def split_page(text: str, deduper: Optional[ChunkDeduper] = None) -> List[Tuple[int, str]]:
+    """
+    Chunk one page's text with the configured chunker. Returns (position
+    within the page, chunk) pairs; positions skip chunks dropped as
+    duplicates of earlier ones seen by `deduper` (by default, only this
+    page's).
+    """
+    if CHUNKER == "chars":
+        return list(enumerate(chunk_text_by_chars(text)))
+    return dedupe_chunks(chunk_text(text), deduper)
+
+
+def build_corpus_and_embeddings(pages: List[dict], deduper: Optional[ChunkDeduper] = None):
     """
     Given list of pages from Confluence, produce chunks,
-    compute embeddings and metadata list.
+    compute embeddings and metadata list. Embeddings come back as one
+    float32 (n_chunks, dim) matrix.
+
+    Chunks that near-duplicate one already seen by `deduper` (by default,
+    one from an earlier page of this batch) are not embedded at all.
     """
     all_chunks = []
     metadatas = []
     texts_to_embed = []
+    deduper = deduper if deduper is not None else ChunkDeduper()
 
-    for idx, p in enumerate(pages):
-        if idx == 0:
-            print(p["text"])
-        chunks = chunk_text(p["text"]) if p.get("text") else []
-        if idx == 0:
-            print("Chunks: ", chunks)
+    for p in pages:
+        # Repeated headers, footers and boilerplate are kept once: on the
+        # first page of the ingest that has them.
+        chunks = split_page(p["text"], deduper) if p.get("text") else []
 
-        for i, c in enumerate(chunks):
-            if idx == 0:
-                print("Chunk: ", c)
+        for i, c in chunks:
             meta = {
                 "page_id": p["id"],
                 "title": p["title"],
@@ -140,28 +83,39 @@ def build_corpus_and_embeddings(pages: List[dict]):
             metadatas.append(meta)
             texts_to_embed.append(c)
 
-    # Compute embeddings in batches
-    batch_size = 16
-    vectors = []
+    # Compute embeddings in batches; each batch is embedded concurrently
+    # (Bedrock) or as a few large forward passes (local model).
+    batch_size = ingest_batch_size()
+    vectors = np.zeros((0, 0), dtype=np.float32)
+    started = time.perf_counter()
 
     for i in range(0, len(texts_to_embed), batch_size):
         batch = texts_to_embed[i:i + batch_size]
         vs = embed_texts(batch)
-        vectors.extend(vs)
+        if i == 0:
+            # One matrix for the whole ingest batch, sized once the width is known.
+            vectors = np.empty((len(texts_to_embed), vs.shape[1]), dtype=np.float32)
+        vectors[i:i + len(batch)] = vs
+
+    elapsed = time.perf_counter() - started
+    if texts_to_embed:
+        rate = len(texts_to_embed) / elapsed if elapsed > 0 else float("inf")
+        print(
+            f"[EMBED] Embedded {len(texts_to_embed)} chunks in {elapsed:.2f}s "
+            f"({rate:.1f} chunks/sec)"
+        )
+
+    cache = get_embedding_cache()
+    if cache is not None:
+        print(f"[EMBED] Cache stats: {cache.stats()}")
 
     return all_chunks, metadatas, vectors
 
 
-def load_pdf_pages(pdf_path: str = PDF_PATH) -> List[dict]:
+def resolve_pdf_files(pdf_path: str = PDF_PATH) -> List[Path]:
     """
-    Load one or more PDF files and return a list of page dicts matching the shape
-    expected by build_corpus_and_embeddings.
-
-    Behavior:
-    - Resolve the configured PDF_PATH (file) via common fallbacks.
-    - Load that file AND any other PDFs living in the same directory.
-      This lets you drop multiple onboarding PDFs into app/data and have
-      them all indexed together.
+    Resolve the configured PDF_PATH (file) via common fallbacks and return
+    that file plus any other PDFs living in the same directory.
     """
     # Try the provided path and a couple of common fallbacks inside the container.
     candidate_paths = [
@@ -191,66 +145,25 @@ def load_pdf_pages(pdf_path: str = PDF_PATH) -> List[dict]:
     if not pdf_files:
         raise FileNotFoundError(f"No PDF files found near: {root_path}")
 
-    pages: List[dict] = []
-
-    for pdf in pdf_files:
-        # Pre-render all pages as images once for this PDF (used for OCR fallback)
-        try:
-            images = convert_from_path(str(pdf), dpi=300)
-        except Exception as e:
-            print(f"[PDF] Failed to render images for {pdf}: {e}")
-            images = []
-
-        with pdf.open("rb") as f:
-            reader = PyPDF2.PdfReader(f)
-            local_count = 0
-            for idx, page in enumerate(reader.pages):
-                text = page.extract_text() or ""
-
-                # Try to extract hyperlinks from the page
-                links_text = ""
-                try:
-                    if "/Annots" in page:
-                        annotations = page["/Annots"]
-                        for annotation in annotations:
-                            annotation_obj = annotation.get_object()
-                            if annotation_obj.get("/Subtype") == "/Link":
-                                uri = annotation_obj.get("/A", {}).get("/URI")
-                                if uri:
-                                    links_text += f" [Link: {uri}]\n"
-                except Exception as e:
-                    # Link extraction is optional, don't fail if it doesn't work
-                    pass
+    return pdf_files
 
-                # Fallback to OCR if we didn't get any text
-                if not text.strip() and idx < len(images):
-                    try:
-                        text = pytesseract.image_to_string(images[idx]) or ""
-                    except Exception as e:
-                        print(f"[OCR] Failed on {pdf} page {idx}: {e}")
 
-                # Append link information to the text if found
-                if links_text:
-                    text = text + "\n\n" + links_text
-
-                # If still empty, skip this page so we don't pollute the index
-                if not text.strip():
-                    continue
-
-                pages.append(
-                    {
-                        "id": f"{pdf.name}-page-{idx}",
-                        "title": pdf.name,
-                        "text": text,
-                    }
-                )
-                local_count += 1
+def load_pdf_pages(pdf_path: str = PDF_PATH) -> Iterator[dict]:
+    """
+    Load one or more PDF files and yield page dicts matching the shape
+    expected by build_corpus_and_embeddings.
 
-        # Log loaded pages for each PDF for visibility
-        print(f"[PDF] Loaded {local_count} pages with text from {pdf}")
+    Behavior:
+    - Resolve the configured PDF_PATH (file) via common fallbacks.
+    - Load that file AND any other PDFs living in the same directory.
+      This lets you drop multiple onboarding PDFs into app/data and have
+      them all indexed together.
+    - Text extraction and OCR run in a process pool (see pdf_pipeline);
+      only pages without a text layer are rendered for OCR.
+    """
+    pdf_files = resolve_pdf_files(pdf_path)
 
-    # Optional: log a short preview of each page (can be noisy for many PDFs)
-    for p in pages:
+    for p in iter_pdf_pages(pdf_files):
+        # Optional: log a short preview of each page (can be noisy for many PDFs)
         print({"id": p["id"], "title": p["title"], "text_preview": p["text"][:2000]})
-
-    return pages
+        yield p
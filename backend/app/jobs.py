@@ -0,0 +1,104 @@
+import json
+import os
+import re
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from .config import INDEX_DIR, INGEST_JOB_HISTORY
+from .index_store import JOBS_DIR, jobs_lock
+
+_JOB_ID_RE = re.compile(r"[0-9a-f]{32}")
+
+
+class JobQueue:
+    """
+    Runs long jobs (ingestion) one at a time on a background thread and keeps
+    their status for polling. Jobs run in submission order, so two ingests
+    never race each other.
+
+    Status lives in one JSON file per job under INDEX_DIR/jobs, read and
+    written under jobs_lock(), so every uvicorn worker can report on a job
+    whichever worker accepted it.
+    """
+
+    def __init__(self, index_dir: str = INDEX_DIR, history: int = INGEST_JOB_HISTORY):
+        self.index_dir = index_dir
+        self.history = history
+        self._root = Path(index_dir) / JOBS_DIR
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-job")
+
+    def submit(self, kind: str, fn: Callable[[], dict], **params) -> dict:
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "kind": kind,
+            "params": params,
+            "status": "queued",
+            "worker": os.getpid(),
+            "submitted_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+        }
+        with jobs_lock(self.index_dir):
+            self._write(job)
+            self._trim()
+        self._executor.submit(self._run, job, fn)
+        return dict(job)
+
+    def _run(self, job: dict, fn: Callable[[], dict]):
+        job["status"] = "running"
+        job["started_at"] = time.time()
+        with jobs_lock(self.index_dir):
+            self._write(job)
+        try:
+            job["result"] = fn()
+            job["status"] = "succeeded"
+        except Exception as e:
+            traceback.print_exc()
+            job["error"] = f"{type(e).__name__}: {e}"
+            job["status"] = "failed"
+        finally:
+            job["finished_at"] = time.time()
+            with jobs_lock(self.index_dir):
+                self._write(job)
+
+    # The helpers below expect jobs_lock() to be held.
+
+    def _write(self, job: dict):
+        self._root.mkdir(parents=True, exist_ok=True)
+        with (self._root / f"{job['job_id']}.json").open("w", encoding="utf-8") as f:
+            json.dump(job, f)
+
+    def _read_all(self) -> List[dict]:
+        jobs = []
+        for path in self._root.glob("*.json"):
+            try:
+                with path.open("r", encoding="utf-8") as f:
+                    jobs.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return sorted(jobs, key=lambda job: job["submitted_at"])
+
+    def _trim(self):
+        finished = [job for job in self._read_all() if job["status"] in ("succeeded", "failed")]
+        for job in finished[: max(0, len(finished) - self.history)]:
+            (self._root / f"{job['job_id']}.json").unlink(missing_ok=True)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        if not _JOB_ID_RE.fullmatch(job_id):
+            return None
+        with jobs_lock(self.index_dir):
+            try:
+                with (self._root / f"{job_id}.json").open("r", encoding="utf-8") as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                return None
+
+    def list(self) -> List[dict]:
+        with jobs_lock(self.index_dir):
+            return self._read_all()
@@ -0,0 +1,312 @@
+import copy
+import hashlib
+import json
+import math
+import re
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .config import BM25_COMPACT_RATIO
+
+META_FILE = "bm25.json"
+# column name -> numpy dtype
+COLUMNS = {
+    "terms": np.int64,     # sorted term keys (see _term_key)
+    "offsets": np.int64,   # len(terms) + 1 offsets into docs/tfs
+    "docs": np.int32,      # doc ids of each term's postings
+    "tfs": np.uint16,      # term frequency of each posting
+    "doc_lens": np.int32,  # tokens per doc id
+}
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Words that carry no signal for onboarding questions; they would otherwise
+# match nearly every chunk and make every query look like a lexical hit.
+_STOPWORDS = {
+    "the", "and", "for", "how", "can", "you", "your", "are", "with", "what",
+    "does", "this", "that", "from", "into", "have", "has", "get", "who",
+    "where", "when", "which", "will", "should", "would", "could", "our",
+    "there", "their", "about", "need", "want",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens, dropping very short words and stopwords."""
+    return [
+        t for t in _TOKEN_RE.findall(text.lower())
+        if len(t) > 2 and t not in _STOPWORDS
+    ]
+
+
+def _term_key(term: str) -> int:
+    """64-bit key of a term; saved postings are looked up by key, not by string."""
+    digest = hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+def _column_file(name: str) -> str:
+    return f"bm25_{name}.npy"
+
+
+class BM25Index:
+    """
+    Inverted index (token -> postings) with Okapi BM25 scoring.
+    A query only touches the postings of its own terms; documents can be
+    added and removed individually when pages change.
+
+    Postings live in two segments. The base segment is columnar: postings
+    sorted by term key and sliced by an offsets array, as save() writes
+    them and load() memory-maps them, so loading a shard does not
+    re-tokenize its text. Documents added since are in a dict of postings
+    lists. Searches score both.
+
+    Removing a document only tombstones it: searches skip its postings and
+    discount it from document frequencies. compacted() merges both
+    segments without them once compaction_due(); save() writes them
+    merged the same way.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._base: Dict[str, np.ndarray] = {
+            name: np.zeros(1 if name == "offsets" else 0, dtype=dtype)
+            for name, dtype in COLUMNS.items() if name != "doc_lens"
+        }
+        # Postings of docs added after the base segment was built, as
+        # flat int32 (doc id, tf) pairs per term.
+        self.postings: Dict[str, array] = {}
+        self._lens = np.zeros(0, dtype=np.int32)
+        self._n = 0
+        self._read_only = False
+        self._live = 0
+        self._total_len = 0
+        self._removed: set = set()
+        self._removed_array: Optional[np.ndarray] = None
+        # term -> postings of removed docs still in its postings lists
+        self._removed_df: Counter = Counter()
+
+    @classmethod
+    def from_texts(cls, texts: List[Optional[str]], **kwargs) -> "BM25Index":
+        """Index texts under their list positions; None entries are skipped."""
+        index = cls(**kwargs)
+        rows = [i for i, t in enumerate(texts) if t is not None]
+        index.add([texts[i] for i in rows], rows)
+        return index
+
+    def _ensure_writable(self):
+        if not self._read_only:
+            return
+        self._lens = np.array(self._lens)
+        self._read_only = False
+
+    def copy(self) -> "BM25Index":
+        """
+        A copy that can be changed without affecting this index. The base
+        segment is never written in place and stays shared; doc lengths are
+        shared until either index next adds a doc.
+        """
+        other = copy.copy(self)
+        other.postings = {term: array("i", postings) for term, postings in self.postings.items()}
+        other._removed = set(self._removed)
+        other._removed_df = Counter(self._removed_df)
+        self._read_only = other._read_only = True
+        return other
+
+    def _reserve(self, n: int):
+        if n <= len(self._lens):
+            return
+        grown = np.zeros(max(n, len(self._lens) * 2, 1024), dtype=np.int32)
+        grown[: self._n] = self._lens[: self._n]
+        self._lens = grown
+
+    def add(self, texts: List[str], doc_ids: Optional[Sequence[int]] = None):
+        """Index texts under doc_ids (default: continue from the current size)."""
+        if doc_ids is None:
+            doc_ids = range(self._n, self._n + len(texts))
+        doc_ids = list(doc_ids)
+        if self._removed.intersection(doc_ids):
+            # A reused doc id must not bring its old postings back.
+            self._compact()
+        self._ensure_writable()
+        for doc_id, text in zip(doc_ids, texts):
+            if doc_id >= self._n:
+                self._reserve(doc_id + 1)
+                self._n = doc_id + 1
+            tokens = tokenize(text)
+            for term, tf in Counter(tokens).items():
+                postings = self.postings.get(term)
+                if postings is None:
+                    postings = self.postings[term] = array("i")
+                postings.append(doc_id)
+                postings.append(tf)
+            self._lens[doc_id] = len(tokens)
+            self._live += 1
+            self._total_len += len(tokens)
+
+    def remove(self, doc_id: int, text: str):
+        """Tombstone doc_id, whose indexed text was `text`."""
+        if doc_id in self._removed:
+            return
+        self._removed.add(doc_id)
+        self._removed_array = None
+        self._removed_df.update(set(tokenize(text)))
+        self._total_len -= int(self._lens[doc_id])
+        self._live -= 1
+
+    def size(self) -> int:
+        return self._live
+
+    def compaction_due(self) -> bool:
+        return len(self._removed) > BM25_COMPACT_RATIO * (self._live + len(self._removed))
+
+    def _merged(self) -> Dict[str, np.ndarray]:
+        """Base columns for both segments merged, without removed docs."""
+        base = self._base
+        counts = [len(postings) // 2 for postings in self.postings.values()]
+        pairs = np.frombuffer(
+            b"".join(postings.tobytes() for postings in self.postings.values()), dtype=np.int32
+        ).reshape(-1, 2)
+        delta_keys = np.array([_term_key(term) for term in self.postings], dtype=np.int64)
+        keys = np.concatenate((
+            np.repeat(base["terms"], np.diff(base["offsets"])),
+            np.repeat(delta_keys, counts),
+        ))
+        docs = np.concatenate((base["docs"], pairs[:, 0]))
+        tfs = np.concatenate((
+            base["tfs"],
+            np.minimum(pairs[:, 1], np.iinfo(np.uint16).max).astype(np.uint16),
+        ))
+        if self._removed:
+            keep = ~np.isin(docs, self._removed_docs())
+            keys, docs, tfs = keys[keep], docs[keep], tfs[keep]
+        # Stable, so each term keeps its postings in insertion (doc id) order.
+        order = np.argsort(keys, kind="stable")
+        keys, docs, tfs = keys[order], docs[order], tfs[order]
+        terms, starts = np.unique(keys, return_index=True)
+        return {
+            "terms": terms,
+            "offsets": np.append(starts, len(keys)).astype(np.int64),
+            "docs": docs,
+            "tfs": tfs,
+        }
+
+    def compacted(self) -> "BM25Index":
+        """
+        A copy with both segments merged into the base and without the
+        tombstoned postings. Leaves this index untouched, so searches can
+        keep using it meanwhile.
+        """
+        index = BM25Index(self.k1, self.b)
+        index._base = self._merged()
+        index._lens = np.array(self._lens[: self._n])
+        index._n = self._n
+        index._live = self._live
+        index._total_len = self._total_len
+        return index
+
+    def _compact(self):
+        self._base = self._merged()
+        self.postings = {}
+        self._removed.clear()
+        self._removed_array = None
+        self._removed_df.clear()
+
+    def _removed_docs(self) -> np.ndarray:
+        if self._removed_array is None:
+            self._removed_array = np.fromiter(self._removed, dtype=np.int32, count=len(self._removed))
+        return self._removed_array
+
+    def _term_postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(doc ids, tfs) of a term in both segments, tombstoned docs included."""
+        terms = self._base["terms"]
+        key = _term_key(term)
+        i = int(np.searchsorted(terms, key))
+        docs, tfs = [], []
+        if i < len(terms) and terms[i] == key:
+            start, end = self._base["offsets"][i], self._base["offsets"][i + 1]
+            docs.append(self._base["docs"][start:end])
+            tfs.append(self._base["tfs"][start:end])
+        postings = self.postings.get(term)
+        if postings:
+            pairs = np.frombuffer(postings, dtype=np.int32).reshape(-1, 2)
+            docs.append(pairs[:, 0])
+            tfs.append(pairs[:, 1])
+        if not docs:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return np.concatenate(docs).astype(np.int64), np.concatenate(tfs).astype(np.float64)
+
+    def _idf(self, df: int) -> float:
+        n = self._live
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, top_k: int = 4) -> List[Tuple[int, float]]:
+        """Return up to top_k (doc_id, score) pairs, best first. Empty if no term matches."""
+        if not self._live:
+            return []
+
+        avg_len = self._total_len / self._live or 1.0
+        all_docs, all_scores = [], []
+
+        for term in set(tokenize(query)):
+            docs, tfs = self._term_postings(term)
+            df = len(docs) - self._removed_df.get(term, 0)
+            if df <= 0:
+                continue
+            idf = self._idf(df)
+            norm = self.k1 * (1 - self.b + self.b * self._lens[docs] / avg_len)
+            all_docs.append(docs)
+            all_scores.append(idf * tfs * (self.k1 + 1) / (tfs + norm))
+
+        if not all_docs:
+            return []
+        docs, scores = np.concatenate(all_docs), np.concatenate(all_scores)
+        if self._removed:
+            keep = ~np.isin(docs, self._removed_docs())
+            docs, scores = docs[keep], scores[keep]
+        ids, inverse = np.unique(docs, return_inverse=True)
+        totals = np.bincount(inverse, weights=scores, minlength=len(ids))
+        if top_k < len(ids):
+            top = np.argpartition(-totals, top_k - 1)[:top_k]
+        else:
+            top = np.arange(len(ids))
+        # Best first; equal scores in doc id order.
+        top = top[np.lexsort((ids[top], -totals[top]))]
+        return [(int(ids[i]), float(totals[i])) for i in top]
+
+    def save(self, root: Path):
+        """Write both segments, merged and without removed docs, into directory `root`."""
+        root = Path(root)
+        columns = self._merged()
+        columns["doc_lens"] = self._lens[: self._n]
+        for name in COLUMNS:
+            np.save(root / _column_file(name), columns[name])
+        with (root / META_FILE).open("w", encoding="utf-8") as f:
+            json.dump(
+                {"k1": self.k1, "b": self.b, "live": self._live, "total_len": self._total_len},
+                f,
+            )
+
+    @classmethod
+    def load(cls, root: Path, mmap_files: bool = True) -> "BM25Index":
+        """
+        Load an index written by save(). With mmap_files=True the postings
+        are memory-mapped read-only instead of read into memory.
+        """
+        root = Path(root)
+        with (root / META_FILE).open("r", encoding="utf-8") as f:
+            meta = json.load(f)
+        index = cls(meta["k1"], meta["b"])
+        mode = "r" if mmap_files else None
+        columns = {name: np.load(root / _column_file(name), mmap_mode=mode) for name in COLUMNS}
+        index._lens = columns.pop("doc_lens")
+        index._n = len(index._lens)
+        index._base = columns
+        index._read_only = mmap_files
+        index._live = meta["live"]
+        index._total_len = meta["total_len"]
+        return index
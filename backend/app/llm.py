@@ -2,14 +2,7 @@ import json
 import logging
 import os
 import re
-from typing import List
-
-import boto3
-
-try:
-    import openai
-except Exception:
-    openai = None
+from typing import Dict, Iterator, List, Optional
 
 from .config import (
     ANTHROPIC_VERSION,
@@ -22,6 +15,7 @@ from .config import (
     AWS_SECRET_ACCESS_KEY,
     AWS_SESSION_TOKEN,
 )
+from .metrics import BEDROCK_CALLS, BEDROCK_TOKENS, stage
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +25,8 @@ _bedrock_client = None
 def _get_bedrock_client():
     global _bedrock_client
     if _bedrock_client is None:
+        import boto3
+
         _bedrock_client = boto3.client(
             "bedrock-runtime",
             region_name=BEDROCK_REGION,
@@ -41,16 +37,14 @@ def _get_bedrock_client():
     return _bedrock_client
 
 
-def _collect_bedrock_stream(response) -> str:
+def _iter_bedrock_stream(response) -> Iterator[str]:
     """
-    Consume a Bedrock streaming response and return the concatenated text.
-    Mirrors the pattern from bedrock_collect_stream_bedrock in the user's snippet.
+    Yield text deltas from a Bedrock streaming response as they arrive.
     """
     body = response.get("body")
-    collected_chunks: List[str] = []
 
     if body is None:
-        return ""
+        return
 
     for event in body:
         if "chunk" not in event:
@@ -67,18 +61,42 @@ def _collect_bedrock_stream(response) -> str:
             logger.error("JSON decoding failed for Bedrock chunk.")
             continue
 
+        _record_usage(payload)
         delta = payload.get("delta", {})
         text = delta.get("text")
         if text:
-            collected_chunks.append(text)
+            yield text
+
+
+def _record_usage(payload: dict):
+    # Anthropic streams report input tokens on message_start and the running
+    # output count on message_delta.
+    kind = payload.get("type")
+    if kind == "message_start":
+        tokens = payload.get("message", {}).get("usage", {}).get("input_tokens")
+        if tokens:
+            BEDROCK_TOKENS.inc(tokens, model=BEDROCK_CLAUDE_MODEL, direction="input")
+    elif kind == "message_delta":
+        tokens = payload.get("usage", {}).get("output_tokens")
+        if tokens:
+            BEDROCK_TOKENS.inc(tokens, model=BEDROCK_CLAUDE_MODEL, direction="output")
+
+
+def _collect_bedrock_stream(response) -> str:
+    """
+    Consume a Bedrock streaming response and return the concatenated text.
+    Mirrors the pattern from bedrock_collect_stream_bedrock in the user's snippet.
+    """
+    collected_chunks: List[str] = list(_iter_bedrock_stream(response))
 
     final_text = "".join(collected_chunks).strip()
     return final_text
 
 
-def _invoke_claude(prompt: str, chat_session_id: str = "") -> str:
+def _start_claude_stream(prompt: str, chat_session_id: str = ""):
     """
     Call Bedrock Claude 3.5 with streaming response, following the provided pattern.
+    Returns the raw streaming response.
     """
     client = _get_bedrock_client()
 
@@ -106,21 +124,41 @@ def _invoke_claude(prompt: str, chat_session_id: str = "") -> str:
             accept="application/json",
         )
         logger.info("API request sent, processing streaming response.")
-        return _collect_bedrock_stream(response)
+        BEDROCK_CALLS.inc(model=BEDROCK_CLAUDE_MODEL, outcome="ok")
+        return response
     except Exception:
+        BEDROCK_CALLS.inc(model=BEDROCK_CLAUDE_MODEL, outcome="error")
         logger.exception("Unexpected error in Bedrock Claude invocation")
         raise
 
 
+def _invoke_claude(prompt: str, chat_session_id: str = "") -> str:
+    """
+    Call Bedrock Claude 3.5 and return the full answer once streaming completes.
+    """
+    return _collect_bedrock_stream(_start_claude_stream(prompt, chat_session_id))
+
+
+def _stream_claude(prompt: str, chat_session_id: str = "") -> Iterator[str]:
+    """
+    Call Bedrock Claude 3.5 and yield text deltas as they arrive.
+    """
+    yield from _iter_bedrock_stream(_start_claude_stream(prompt, chat_session_id))
+
+
+# URL mappings for common service names, injected after the first mention
+# when the model leaves the link out.
+_ANSWER_URL_MAPPINGS = {
+    "Informa IT Service Hub": "https://informa.service-now.com/iportal?id=sc_home",
+    "IT Service Hub": "https://informa.service-now.com/iportal?id=sc_home",
+}
+
+
 def _post_process_answer(answer: str) -> str:
     """
     Post-process the answer to ensure URLs are included when service names are mentioned.
     """
-    # URL mappings for common service names
-    url_mappings = {
-        "Informa IT Service Hub": "https://informa.service-now.com/iportal?id=sc_home",
-        "IT Service Hub": "https://informa.service-now.com/iportal?id=sc_home",
-    }
+    url_mappings = _ANSWER_URL_MAPPINGS
 
     # Check if answer mentions service names but doesn't include the URL
     answer_lower = answer.lower()
@@ -139,50 +177,167 @@ def _post_process_answer(answer: str) -> str:
     return answer
 
 
-def generate_answer(question: str, context_chunks: List[str]) -> str:
+class StreamingPostProcessor:
+    """
+    Streaming equivalent of _post_process_answer. Text passes through a small
+    sliding buffer: enough is held back to recognise a service name split
+    across deltas and to see whether the model wrote the URL right after it.
+    The URL is injected after the first mention unless it has already
+    appeared in the stream or follows within the lookahead window.
+    """
+
+    def __init__(self, url_mappings: Optional[Dict[str, str]] = None):
+        self.url_mappings = url_mappings or _ANSWER_URL_MAPPINGS
+        terms = sorted(self.url_mappings, key=len, reverse=True)
+        self._pattern = re.compile("|".join(re.escape(t) for t in terms), re.IGNORECASE)
+        self._canonical = {t.lower(): t for t in terms}
+        self._max_term = max(len(t) for t in terms)
+        self._lookahead = max(len(u) for u in self.url_mappings.values()) + 8
+        self._pending = ""
+        self._tail = ""
+        self._seen_urls = set()
+        self._started = False
+
+    def feed(self, delta: str) -> str:
+        """Add a delta; return the text that is now safe to emit."""
+        self._pending += delta
+        return self._drain(final=False)
+
+    def finish(self) -> str:
+        """Flush whatever is still buffered at the end of the stream."""
+        return self._drain(final=True).rstrip()
+
+    def _drain(self, final: bool) -> str:
+        out = []
+        while True:
+            # A URL may straddle what was already emitted and the buffer.
+            window = self._tail + self._pending
+            for url in self.url_mappings.values():
+                if url in window:
+                    self._seen_urls.add(url)
+
+            match = None
+            for m in self._pattern.finditer(self._pending):
+                url = self.url_mappings[self._canonical[m.group(0).lower()]]
+                if url not in self._seen_urls:
+                    match = m
+                    break
+
+            if match is None:
+                # A service name may be split across deltas; keep its prefix.
+                keep = 0 if final else self._max_term - 1
+                cut = max(0, len(self._pending) - keep)
+                out.append(self._pending[:cut])
+                self._pending = self._pending[cut:]
+                break
+
+            if not final and len(self._pending) - match.end() < self._lookahead:
+                # Not enough text after the name yet to tell if the URL follows.
+                out.append(self._pending[:match.start()])
+                self._pending = self._pending[match.start():]
+                break
+
+            url = self.url_mappings[self._canonical[match.group(0).lower()]]
+            out.append(self._pending[:match.end()] + f" ({url})")
+            self._pending = self._pending[match.end():]
+            self._seen_urls.add(url)
+
+        text = "".join(out)
+        self._tail = (self._tail + text)[-self._lookahead:]
+        if not self._started:
+            # Match the non-streaming path, which strips the answer.
+            text = text.lstrip()
+            self._started = bool(text)
+        return text
+
+
+# Returned when retrieval finds nothing relevant; the LLM is not called.
+NO_CONTEXT_ANSWER = "I can only answer onboarding and team-related questions."
+
+
+def generate_answer(
+    question: str,
+    context_chunks: List[str],
+    timings: Optional[Dict[str, float]] = None,
+) -> str:
     """
     Send a prompt to the configured LLM and return the answer text.
     The function builds an instruction that tells the model
-    to rely only on the given context.
+    to rely only on the given context. Prompt building and the model call
+    are recorded in `timings` as prompt_ms and llm_ms.
     """
-    prompt = _build_rag_prompt(context_chunks, question)
+    with stage("prompt", timings):
+        prompt = _build_rag_prompt(context_chunks, question)
 
     provider = LLM_PROVIDER.lower()
 
     if provider == "openai":
-        if openai is None:
+        try:
+            import openai
+        except Exception:
             raise RuntimeError("openai library is required")
 
         openai.api_key = os.getenv("OPENAI_API_KEY")
         model = os.getenv("OPENAI_CHAT_MODEL", "gpt-4o-mini")
 
-        resp = openai.ChatCompletion.create(
-            model=model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a helpful assistant answering only from the provided context.",
-                },
-                {
-                    "role": "user",
-                    "content": prompt,
-                },
-            ],
-            max_tokens=400,
-            temperature=0.0,
-        )
+        with stage("llm", timings):
+            resp = openai.ChatCompletion.create(
+                model=model,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "You are a helpful assistant answering only from the provided context.",
+                    },
+                    {
+                        "role": "user",
+                        "content": prompt,
+                    },
+                ],
+                max_tokens=400,
+                temperature=0.0,
+            )
 
         answer = resp["choices"][0]["message"]["content"].strip()
         return _post_process_answer(answer)
 
     if provider == "claude":
-        answer = _invoke_claude(prompt)
+        with stage("llm", timings):
+            answer = _invoke_claude(prompt)
         return _post_process_answer(answer)
 
     # Default: return concatenated context (safe fallback)
     return "\n\n".join(context_chunks)
 
 
+def generate_answer_stream(
+    question: str,
+    context_chunks: List[str],
+    timings: Optional[Dict[str, float]] = None,
+) -> Iterator[str]:
+    """
+    Streaming variant of generate_answer: yield answer text as the model
+    produces it, with service-name URLs injected on the fly.
+    """
+    provider = LLM_PROVIDER.lower()
+
+    if provider != "claude":
+        # Only Bedrock Claude is streamed end to end; other providers
+        # return their full answer as a single delta.
+        yield generate_answer(question, context_chunks, timings)
+        return
+
+    with stage("prompt", timings):
+        prompt = _build_rag_prompt(context_chunks, question)
+    post = StreamingPostProcessor()
+    for delta in _stream_claude(prompt):
+        text = post.feed(delta)
+        if text:
+            yield text
+    tail = post.finish()
+    if tail:
+        yield tail
+
+
 def _build_rag_prompt(context_chunks: List[str], question: str) -> str:
     ctx = "\n\n".join([f"Context {i + 1}:\n{c}" for i, c in enumerate(context_chunks)])
 
@@ -0,0 +1,161 @@
+"""
+Local sentence-transformers embedding backend (USE_LOCAL_EMBEDDINGS=true).
+
+Nothing heavy happens at import: the model is loaded on first use, or by
+warm_up() on a background thread at startup. Texts are sorted by length so
+each forward pass pads to similar lengths, encoded in large batches, and on
+multi-core hosts optionally spread over a process pool, each worker holding
+its own (optionally int8-quantized) copy of the model.
+"""
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import List, Optional
+
+import numpy as np
+
+from .config import (
+    LOCAL_EMBED_BATCH_SIZE,
+    LOCAL_EMBED_MODEL,
+    LOCAL_EMBED_PROCESSES,
+    LOCAL_EMBED_QUANTIZE,
+)
+
+_model = None
+_model_lock = threading.Lock()
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_warmup_thread: Optional[threading.Thread] = None
+
+# Set in pool worker processes by _init_worker.
+_worker_model = None
+
+
+def model_id() -> str:
+    """Identifier of the local model; quantized vectors differ, so they get their own id."""
+    return f"local:{LOCAL_EMBED_MODEL}" + ("+qint8" if LOCAL_EMBED_QUANTIZE else "")
+
+
+def _load_model(name: str, quantize: bool):
+    from sentence_transformers import SentenceTransformer
+
+    if not quantize:
+        return SentenceTransformer(name)
+
+    # Dynamic int8 quantization of the Linear layers; CPU only.
+    import torch
+
+    model = SentenceTransformer(name, device="cpu")
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def get_model():
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                started = time.perf_counter()
+                _model = _load_model(LOCAL_EMBED_MODEL, LOCAL_EMBED_QUANTIZE)
+                print(
+                    f"[EMBED] Loaded local model {model_id()} "
+                    f"in {time.perf_counter() - started:.1f}s"
+                )
+    return _model
+
+
+def _process_count() -> int:
+    if LOCAL_EMBED_PROCESSES <= 0:
+        return os.cpu_count() or 1
+    return LOCAL_EMBED_PROCESSES
+
+
+def _init_worker(name: str, quantize: bool, threads: int):
+    global _worker_model
+    import torch
+
+    # Split the cores between workers instead of every worker using all of them.
+    torch.set_num_threads(threads)
+    _worker_model = _load_model(name, quantize)
+
+
+def _encode_shard(texts: List[str], batch_size: int) -> np.ndarray:
+    return _worker_model.encode(
+        texts, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False
+    )
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                workers = _process_count()
+                threads = max(1, (os.cpu_count() or 1) // workers)
+                # spawn: forking a process that has already initialised torch's
+                # thread pools can deadlock the children.
+                _pool = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(LOCAL_EMBED_MODEL, LOCAL_EMBED_QUANTIZE, threads),
+                )
+    return _pool
+
+
+def ingest_batch_size() -> int:
+    """Texts to hand to encode() per call during ingest: a few batches per worker."""
+    return LOCAL_EMBED_BATCH_SIZE * _process_count() * 4
+
+
+def encode(texts: List[str], batch_size: int = LOCAL_EMBED_BATCH_SIZE) -> np.ndarray:
+    """
+    Embed texts; returns a float32 (len(texts), dim) matrix in input order.
+    Large inputs go to the process pool when LOCAL_EMBED_PROCESSES > 1;
+    queries and small batches are encoded in-process.
+    """
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+    order = np.argsort([len(t) for t in texts], kind="stable")
+    ordered = [texts[i] for i in order]
+
+    workers = _process_count()
+    if workers > 1 and len(texts) >= 2 * batch_size:
+        # Contiguous shards of the sorted texts, several per worker so a
+        # shard of long texts doesn't leave the others idle.
+        shard = max(batch_size, math.ceil(len(texts) / (workers * 4)))
+        shards = [ordered[i:i + shard] for i in range(0, len(ordered), shard)]
+        vectors = np.vstack(list(_get_pool().map(_encode_shard, shards, repeat(batch_size))))
+    else:
+        vectors = get_model().encode(
+            ordered, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False
+        )
+
+    out = np.empty_like(vectors, dtype=np.float32)
+    out[order] = vectors
+    return out
+
+
+def _warm_up():
+    started = time.perf_counter()
+    try:
+        encode(["warm up"])
+        if _process_count() > 1:
+            # Start every worker (each loads its own model copy).
+            pool = _get_pool()
+            list(pool.map(_encode_shard, [["warm up"]] * _process_count(), repeat(1)))
+    except Exception as e:
+        print(f"[EMBED] Local model warm-up failed: {e}")
+        return
+    print(f"[EMBED] Local embeddings warm in {time.perf_counter() - started:.1f}s")
+
+
+def warm_up():
+    """Load the model (and start the worker pool) on a background thread."""
+    global _warmup_thread
+    if _warmup_thread is None:
+        _warmup_thread = threading.Thread(target=_warm_up, name="embed-warmup", daemon=True)
+        _warmup_thread.start()
@@ -1,16 +1,47 @@
+import asyncio
+import json
+import logging
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
 
-from .ingest import fetch_confluence_pages, build_corpus_and_embeddings
-from .faiss_index import FaissIndex
+from . import local_embeddings
+from .answer_cache import get_answer_cache, normalize_question
+from .batch import answer_questions
+from .config import BATCH_MAX_QUESTIONS, BLOCKING_IO_WORKERS, CONTEXT_CANDIDATES, INDEX_POLL_SECONDS
+from .config import LOCAL_EMBED_WARMUP, STARTUP_RETRY_AFTER, USE_LOCAL_EMBEDDINGS
+from .context import assemble_context
+from .embedding_cache import get_embedding_cache
 from .embeddings import embed_query
-from .llm import generate_answer
-from .config import TOP_K
+from .index_store import build_manifest, current_version, load_corpus, save_corpus, writer_lock
+from .jobs import JobQueue
+from .llm import NO_CONTEXT_ANSWER, generate_answer, generate_answer_stream
+from .metrics import (
+    ANSWERS,
+    CACHE_ENTRIES,
+    CACHE_HIT_RATIO,
+    CORPUS_CHUNKS,
+    CORPUS_VERSION,
+    INDEX_ARTIFACT,
+    INDEX_VECTORS,
+    INGEST_JOB_STATUS,
+    REGISTRY,
+    RequestMetricsMiddleware,
+    server_timing,
+    stage,
+)
+from .retriever import retrieve
+from .shards import ShardedCorpus, ShardView, UnknownNamespace
+from .singleflight import AsyncSingleFlight
 
+logger = logging.getLogger(__name__)
 
 app = FastAPI()
 
@@ -21,16 +52,47 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let the browser's devtools show the per-stage breakdown of /ask.
+    expose_headers=["Server-Timing"],
 )
-
-# In-memory objects
-INDEX: Optional[FaissIndex] = None
-ALL_CHUNKS = []
-METADATAS = []
+app.add_middleware(RequestMetricsMiddleware)
+
+# The corpus being served: one shard per namespace ("pdf", and
+# "confluence:<space>" per ingested space). Under `uvicorn --workers N`
+# every worker memory-maps the same published index version and swaps this
+# reference when a newer version is published (see _watch_index). Request
+# handlers read it once, so an in-flight query finishes on the version it
+# started on.
+CORPUS = ShardedCorpus()
+# Manifest the persisted corpus is saved under (set at startup).
+MANIFEST: dict = {}
+# Set once the startup load or build has installed a corpus. The port opens
+# before that, so liveness probes pass during a long first ingest.
+READY = threading.Event()
+STARTUP_ERROR: Optional[str] = None
+
+# Namespace (and corpus source name) of the local PDFs; Confluence spaces
+# use "confluence:<key>".
+PDF_SOURCE = "pdf"
+
+# Blocking work (boto3, requests, FAISS) never runs on the event loop:
+# /ask goes through a bounded thread pool, ingestion through a job queue.
+_request_executor = ThreadPoolExecutor(
+    max_workers=BLOCKING_IO_WORKERS, thread_name_prefix="ask"
+)
+INGEST_JOBS = JobQueue()
+# Identical questions arriving together (a new cohort all asking the same
+# thing) share one embedding, retrieval and Claude call per endpoint.
+_ask_flights = AsyncSingleFlight("ask")
+_stream_flights = AsyncSingleFlight("ask_stream")
 
 
 class AskRequest(BaseModel):
     question: str
+    # Skip the answer cache (e.g. to check a fresh answer after editing docs).
+    bypass_cache: bool = False
+    # Only search these namespaces (see GET /namespaces); default all.
+    namespaces: Optional[List[str]] = None
 
 
 class IngestRequest(BaseModel):
@@ -40,55 +102,292 @@ class IngestRequest(BaseModel):
 @app.on_event("startup")
 async def startup_event():
     """
-    Called once when FastAPI server starts
+    Called once when FastAPI server starts. Loading or building the index
+    runs on a background thread so uvicorn starts accepting connections at
+    once; /readyz reports when it is done.
     """
-    global INDEX, ALL_CHUNKS, METADATAS
-
     print("🚀 Server starting...")
+    threading.Thread(target=_prepare_index, name="index-startup", daemon=True).start()
 
-    # OPTIONAL: Auto-ingest on startup
-    # Commented Confluence ingestion for now; switch to local PDF ingestion.
-    # space_key = "ENG"  # example
-    # pages = fetch_confluence_pages(space_key)
-    from .ingest import load_pdf_pages
 
-    pages = load_pdf_pages()
-    ALL_CHUNKS, METADATAS, embeddings = build_corpus_and_embeddings(pages)
+def _prepare_index():
+    global STARTUP_ERROR
+    started = time.perf_counter()
+    try:
+        _load_or_build_index()
+    except Exception as e:
+        STARTUP_ERROR = f"{type(e).__name__}: {e}"
+        logger.exception("Index startup failed")
+        return
+    READY.set()
+    print(f"✅ Ready in {time.perf_counter() - started:.1f}s")
 
-    if embeddings:
-        dim = len(embeddings[0])
-        INDEX = FaissIndex(dim)
-        INDEX.add(embeddings, METADATAS)
-    else:
-        INDEX = None
+    if INDEX_POLL_SECONDS > 0:
+        threading.Thread(target=_watch_index, name="index-watcher", daemon=True).start()
 
-    print("✅ Confluence data ingested & FAISS index ready")
 
+def _load_or_build_index():
+    global MANIFEST
 
-@app.post("/ingest")
+    # OPTIONAL: Auto-ingest on startup
+    # Commented Confluence ingestion for now; switch to local PDF ingestion.
+    # space_key = "ENG"  # example
+    # pages = ConfluenceCrawler().crawl(space_key)
+    from .ingest import load_pdf_pages, resolve_pdf_files
+
+    if USE_LOCAL_EMBEDDINGS and LOCAL_EMBED_WARMUP:
+        # Load the model while the index is being loaded.
+        local_embeddings.warm_up()
+
+    # Reuse the published corpus when it was built with the same embedding
+    # model and settings. If the source PDFs are unchanged there is nothing
+    # to do; otherwise only new or changed pages get chunked and embedded.
+    MANIFEST = build_manifest(resolve_pdf_files())
+    loaded, up_to_date = load_corpus(MANIFEST)
+    if loaded is not None and up_to_date:
+        _install_corpus(loaded)
+        print(f"✅ Loaded persisted index {CORPUS.artifact} ({CORPUS.size()} chunks)")
+    else:
+        # Only one worker builds; the others wait here and then find the
+        # version it published up to date.
+        with writer_lock():
+            loaded, up_to_date = load_corpus(MANIFEST)
+            if loaded is not None:
+                _install_corpus(loaded)
+            if up_to_date:
+                print(f"✅ Loaded persisted index {CORPUS.artifact} ({CORPUS.size()} chunks)")
+            else:
+                stats = CORPUS.shard(PDF_SOURCE).sync_pages(load_pdf_pages(), source=PDF_SOURCE)
+                save_corpus(MANIFEST, CORPUS)
+                _load_published()
+                print(f"✅ PDF data ingested & FAISS index ready: {stats}")
+
+
+def _install_corpus(corpus: ShardedCorpus):
+    """Start serving `corpus`; queries already running keep their old reference."""
+    global CORPUS
+    # Keep versions increasing within this process so the answer cache
+    # never mistakes the new corpus for the one it replaces.
+    if corpus.version <= CORPUS.version:
+        corpus.base_version += CORPUS.version + 1 - corpus.version
+    CORPUS = corpus
+
+
+def _load_published() -> bool:
+    """
+    Swap to the current published version, memory-mapped. Also used by the
+    worker that just published, so it drops its private ingest copy of the
+    vectors and shares the page cache with the other workers.
+    """
+    loaded, _ = load_corpus(MANIFEST, previous=CORPUS)
+    if loaded is None:
+        return False
+    _install_corpus(loaded)
+    print(f"[INDEX] Serving index version {loaded.artifact} ({loaded.size()} chunks)")
+    return True
+
+
+def _watch_index():
+    """Pick up versions published by other workers (or other hosts sharing INDEX_DIR)."""
+    while True:
+        time.sleep(INDEX_POLL_SECONDS)
+        try:
+            name = current_version()
+            if name is not None and name != CORPUS.artifact:
+                _load_published()
+        except Exception:
+            logger.exception("Index hot-swap failed; still serving %s", CORPUS.artifact)
+
+
+def _run_confluence_ingest(space_key: str) -> dict:
+    from .confluence import ConfluenceCrawler
+
+    with writer_lock():
+        # Build on the latest published version, which another worker may
+        # have produced since this one last swapped.
+        if current_version() != CORPUS.artifact:
+            _load_published()
+
+        # The space has its own shard; no other namespace is touched, and
+        # only this shard is written when publishing. It is synced on a
+        # private copy, so the served shard (and the files it maps) stays
+        # as it is until the published version replaces it. Pages already
+        # indexed at the same version are not re-fetched; the per-page
+        # fingerprints persisted with the shard are the crawl state.
+        source = f"confluence:{space_key}"
+        corpus = CORPUS.fork(source)
+        shard = corpus.shard(source)
+        crawler = ConfluenceCrawler()
+        pages = crawler.crawl(space_key, known=shard.page_fingerprints(source))
+        stats = shard.sync_pages(pages, source=source)
+        stats["namespace"] = source
+        stats["crawl"] = dict(crawler.stats)
+        stats["index_version"] = save_corpus(MANIFEST, corpus)
+        _load_published()
+    return stats
+
+
+def _serving_corpus() -> ShardedCorpus:
+    """The corpus to answer from; a fast 503 until startup has installed one."""
+    if not READY.is_set():
+        detail = "Index failed to load" if STARTUP_ERROR else "Index is loading"
+        raise HTTPException(
+            status_code=503, detail=detail, headers={"Retry-After": str(STARTUP_RETRY_AFTER)}
+        )
+    return CORPUS
+
+
+def _searchable(namespaces: Optional[List[str]]) -> ShardView:
+    """The shards a request searches: 503 while loading, 404 for unknown namespaces."""
+    try:
+        view = _serving_corpus().select(namespaces)
+    except UnknownNamespace as e:
+        raise HTTPException(status_code=404, detail=f"Unknown namespace: {e.args[0]}")
+    if not view.has_vectors:
+        raise HTTPException(status_code=500, detail="Index not initialized")
+    return view
+
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving. Fails only if startup crashed."""
+    if STARTUP_ERROR:
+        return JSONResponse({"status": "failed", "error": STARTUP_ERROR}, status_code=503)
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: an index is loaded. Reports the published version being served."""
+    if not READY.is_set():
+        status = "failed" if STARTUP_ERROR else "loading"
+        return JSONResponse(
+            {"status": status, "error": STARTUP_ERROR},
+            status_code=503,
+            headers={"Retry-After": str(STARTUP_RETRY_AFTER)},
+        )
+    corpus = CORPUS
+    return {
+        "status": "ready",
+        "index_version": corpus.artifact,
+        "chunks": corpus.size(),
+        "namespaces": corpus.namespaces(),
+    }
+
+
+@app.get("/namespaces")
+async def namespaces():
+    """Searchable namespaces (shards), for the `namespaces` filter of /ask."""
+    corpus = _serving_corpus()
+    return {
+        "namespaces": [
+            {
+                "namespace": ns,
+                "chunks": shard.size(),
+                "pages": len(shard.pages),
+                "shard": shard.artifact,
+            }
+            for ns, shard in sorted(corpus.shards.items())
+        ]
+    }
+
+
+@app.post("/ingest", status_code=202)
 async def ingest(request: IngestRequest):
     """
-    Manual ingestion endpoint
+    Manual ingestion endpoint. Queues a background job and returns at once;
+    poll /ingest/{job_id} for progress. Re-ingesting a space only re-embeds
+    pages that changed, and leaves other spaces and the PDFs in place.
     """
-    global INDEX, ALL_CHUNKS, METADATAS
-
-    pages = fetch_confluence_pages(request.space_key)
-    ALL_CHUNKS, METADATAS, embeddings = build_corpus_and_embeddings(pages)
+    # Ingests build on the startup corpus and its manifest.
+    _serving_corpus()
+    # Job status is a file under INDEX_DIR; keep that off the event loop.
+    return await run_blocking(
+        lambda: INGEST_JOBS.submit(
+            "confluence",
+            lambda: _run_confluence_ingest(request.space_key),
+            space_key=request.space_key,
+        )
+    )
 
-    if embeddings:
-        dim = len(embeddings[0])
-        INDEX = FaissIndex(dim)
-        INDEX.add(embeddings, METADATAS)
-    else:
-        INDEX = None
 
-    return {"status": "success", "chunks": len(ALL_CHUNKS)}
+@app.get("/ingest/{job_id}")
+async def ingest_status(job_id: str):
+    """Status of an ingest job, whichever worker accepted or is running it."""
+    job = await run_blocking(INGEST_JOBS.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown ingest job")
+    return job
+
+
+@app.get("/ingest")
+async def ingest_jobs():
+    return {"jobs": await run_blocking(INGEST_JOBS.list)}
+
+
+def _cache_stats() -> dict:
+    answer_cache = get_answer_cache()
+    embedding_cache = get_embedding_cache()
+    return {
+        "answers": answer_cache.stats() if answer_cache is not None else None,
+        "embeddings": embedding_cache.stats() if embedding_cache is not None else None,
+    }
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return _cache_stats()
+
+
+def _refresh_gauges():
+    """Point-in-time gauges are read from their owners on every scrape."""
+    corpus = CORPUS
+    CORPUS_VERSION.set(corpus.version)
+    CORPUS_CHUNKS.clear()
+    INDEX_VECTORS.clear()
+    for ns, shard in corpus.shards.items():
+        CORPUS_CHUNKS.set(shard.size(), namespace=ns)
+        INDEX_VECTORS.set(shard.index.size() if shard.index is not None else 0, namespace=ns)
+    INDEX_ARTIFACT.clear()
+    if corpus.artifact is not None:
+        INDEX_ARTIFACT.set(1, version=corpus.artifact)
+
+    caches = _cache_stats()
+    answers = caches["answers"]
+    if answers is not None:
+        CACHE_HIT_RATIO.set(answers["hit_rate"], cache="answer")
+        CACHE_ENTRIES.set(answers["entries"], cache="answer")
+    embeddings = caches["embeddings"]
+    if embeddings is not None:
+        CACHE_HIT_RATIO.set(embeddings["hit_rate"], cache="embedding")
+        CACHE_ENTRIES.set(embeddings["entries"], cache="embedding")
+
+    INGEST_JOB_STATUS.clear()
+    for status in ("queued", "running", "succeeded", "failed"):
+        INGEST_JOB_STATUS.set(0, status=status)
+    for job in INGEST_JOBS.list():
+        INGEST_JOB_STATUS.inc(status=job["status"])
+
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus scrape endpoint: request and per-stage latency histograms,
+    Bedrock calls and tokens, cache hit rates, index size and ingest
+    progress.
+    """
+    # The embedding cache stats query SQLite and job status is read from
+    # files; keep that off the event loop.
+    await run_blocking(_refresh_gauges)
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
 
 def _score_chunk_overlap(question: str, chunk: str) -> int:
     """
     Lexical overlap score between question and a chunk.
     Counts how many non-trivial (len>3) question tokens appear in the chunk.
+    No longer on the /ask path (see retriever.retrieve); kept for comparing
+    against BM25 rankings.
     """
     q_tokens = set(re.findall(r"\w+", question.lower()))
     text = chunk.lower()
@@ -108,44 +407,250 @@ def _rerank_chunks_by_question_overlap(question: str, chunks):
     )
 
 
+def _lookup_cached_answer(question: str, bypass_cache: bool, corpus: ShardView):
+    """
+    Try the answer cache before doing any retrieval or generation.
+    Returns (answer or None, cache kind, query embedding, corpus version, timings).
+    The embedding is computed at most once and reused for retrieval on a miss.
+    Answers are only shared between requests searching the same namespaces.
+    """
+    timings = {}
+    version = corpus.version
+    cache = None if bypass_cache else get_answer_cache()
+    if cache is None:
+        return None, None, None, version, timings
+
+    answer = cache.get_exact(question, version, corpus.scope)
+    if answer is not None:
+        return answer, "exact", None, version, timings
+
+    with stage("embed", timings):
+        query_embedding = embed_query(question)
+
+    answer = cache.get_similar(query_embedding, version, corpus.scope)
+    if answer is not None:
+        return answer, "semantic", query_embedding, version, timings
+    return None, None, query_embedding, version, timings
+
+
+def _store_answer(question: str, query_embedding, answer: str, version, scope: str, bypass_cache: bool):
+    cache = None if bypass_cache else get_answer_cache()
+    if cache is not None:
+        cache.put(question, query_embedding, answer, version, scope)
+
+
+def _retrieve_context(question: str, corpus: ShardView, query_embedding=None):
+    """Return (context passages, per-stage timings) for a question."""
+    # Hybrid retrieval: BM25 keeps exact mentions like "GitHub Access" or
+    # "Vault Access" in play, FAISS catches paraphrases, and reciprocal rank
+    # fusion picks the few chunks both agree are most relevant.
+    hits, timings = retrieve(
+        question, corpus, top_k=CONTEXT_CANDIDATES, query_embedding=query_embedding
+    )
+
+    # Merge neighbouring chunks, drop repeated sentences and keep the best
+    # passages within the prompt token budget.
+    with stage("context", timings):
+        passages, stats = assemble_context(hits, corpus)
+    logger.info(
+        "ask context: %d chunks -> %d passages, %d -> %d input tokens",
+        stats["chunks"], stats["passages"], stats["raw_tokens"], stats["context_tokens"],
+    )
+    return passages, timings
+
+
+def _answer_question(question: str, bypass_cache: bool = False, corpus: Optional[ShardView] = None) -> dict:
+    """
+    Blocking part of /ask: retrieval, Bedrock embedding and Claude calls.
+    Runs on the request executor so the event loop stays free.
+    """
+    corpus = corpus if corpus is not None else CORPUS.select()
+    cached, kind, query_embedding, version, timings = _lookup_cached_answer(
+        question, bypass_cache, corpus
+    )
+    if cached is not None:
+        ANSWERS.inc(endpoint="ask", result=f"cache_{kind}")
+        return {"answer": cached, "cache": kind, "timings": timings}
+
+    relevant_chunks, retrieval_timings = _retrieve_context(question, corpus, query_embedding)
+    timings.update(retrieval_timings)
+
+    if not relevant_chunks:
+        ANSWERS.inc(endpoint="ask", result="no_context")
+        return {"answer": NO_CONTEXT_ANSWER, "timings": timings}
+
+    with stage("generate", timings):
+        answer = generate_answer(question, relevant_chunks, timings)
+
+    logger.info("ask timings: %s", timings)
+    _store_answer(question, query_embedding, answer, version, corpus.scope, bypass_cache)
+    ANSWERS.inc(endpoint="ask", result="generated")
+
+    return {"answer": answer, "timings": timings}
+
+
+async def run_blocking(fn, *args):
+    """Run a blocking call on the bounded request executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_request_executor, fn, *args)
+
+
+def _flight_key(question: str, bypass_cache: bool, corpus: ShardView) -> tuple:
+    # Same question against the same index and shards; a bypass_cache request
+    # must not be handed an answer that came out of the cache.
+    return normalize_question(question), corpus.version, corpus.scope, bypass_cache
+
+
 @app.post("/ask")
 async def ask(request: AskRequest):
     """
     Main chat endpoint
     """
-    if INDEX is None:
-        raise HTTPException(status_code=500, detail="Index not initialized")
+    corpus = _searchable(request.namespaces)
+    result, joined = await _ask_flights.do(
+        _flight_key(request.question, request.bypass_cache, corpus),
+        lambda: run_blocking(_answer_question, request.question, request.bypass_cache, corpus),
+    )
+    if joined:
+        ANSWERS.inc(endpoint="ask", result="coalesced")
+        result = dict(result, coalesced=True)
+    return JSONResponse(result, headers={"Server-Timing": server_timing(result["timings"])})
 
-    question = request.question
 
-    # First, try to find strong lexical matches anywhere in the corpus.
-    # This guarantees that if the PDF explicitly mentions something like
-    # "GitHub Access", "Vault Access", etc., we surface those chunks even
-    # if the vector search doesn't.
-    if ALL_CHUNKS:
-        lexically_sorted = _rerank_chunks_by_question_overlap(question, ALL_CHUNKS)
-        top_score = _score_chunk_overlap(question, lexically_sorted[0])
-        if top_score > 0:
-            relevant_chunks = lexically_sorted[: TOP_K * 2]
-        else:
-            # Fall back to vector search + rerank if no lexical hits.
-            query_embedding = embed_query(question)
-            search_results = INDEX.search(query_embedding, TOP_K * 3)
-            candidate_chunks = [
-                ALL_CHUNKS[meta["chunk_index"]] for meta, score in search_results
-            ]
-            relevant_chunks = _rerank_chunks_by_question_overlap(
-                question, candidate_chunks
-            )[: TOP_K * 2]
-    else:
-        relevant_chunks = []
+def _sse(data: dict, event: str = "") -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
 
-    if not relevant_chunks:
-        return {
-            "answer": "I can only answer onboarding and team-related questions."
+
+_STREAM_END = object()
+
+
+class AskBatchRequest(BaseModel):
+    questions: List[str]
+    bypass_cache: bool = False
+    namespaces: Optional[List[str]] = None
+
+
+@app.post("/ask/batch")
+async def ask_batch(request: AskBatchRequest):
+    """
+    Answer many questions in one request, streamed back as JSONL in
+    completion order (each line carries the question's index), followed by
+    a summary line. Built for throughput, e.g. replaying question sets
+    after a re-ingest.
+    """
+    corpus = _searchable(request.namespaces)
+    if len(request.questions) > BATCH_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=413, detail=f"At most {BATCH_MAX_QUESTIONS} questions per batch"
+        )
+
+    def lines():
+        # A sync generator: Starlette iterates it on a worker thread.
+        started = time.perf_counter()
+        for result in answer_questions(request.questions, corpus, request.bypass_cache):
+            if "error" in result:
+                outcome = "error"
+            elif result.get("no_context"):
+                outcome = "no_context"
+            else:
+                outcome = f"cache_{result['cache']}" if "cache" in result else "generated"
+            ANSWERS.inc(endpoint="batch", result=outcome)
+            yield json.dumps(result) + "\n"
+        elapsed = time.perf_counter() - started
+        summary = {
+            "questions": len(request.questions),
+            "seconds": elapsed,
+            "questions_per_minute": len(request.questions) / elapsed * 60.0 if elapsed > 0 else None,
         }
+        yield json.dumps({"summary": summary}) + "\n"
 
-    answer = generate_answer(question, relevant_chunks)
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
-    return {"answer": answer}
 
+async def _stream_events(question: str, bypass_cache: bool, corpus: ShardView):
+    """
+    Producer behind /ask/stream: yields (data, event name) pairs, shared by
+    every identical stream request in flight. Any failure, whether in the
+    cache lookup, retrieval or generation, ends the stream with an error
+    event rather than cutting it off.
+    """
+    try:
+        async for item in _answer_events(question, bypass_cache, corpus):
+            yield item
+    except Exception as e:
+        ANSWERS.inc(endpoint="stream", result="error")
+        logger.exception("Streaming answer failed")
+        yield {"error": str(e)}, "error"
+
+
+async def _answer_events(question: str, bypass_cache: bool, corpus: ShardView):
+    cached, kind, query_embedding, version, timings = await run_blocking(
+        _lookup_cached_answer, question, bypass_cache, corpus
+    )
+    if cached is not None:
+        ANSWERS.inc(endpoint="stream", result=f"cache_{kind}")
+        yield {"delta": cached}, ""
+        yield {"timings": timings, "cache": kind}, "done"
+        return
+
+    relevant_chunks, retrieval_timings = await run_blocking(
+        _retrieve_context, question, corpus, query_embedding
+    )
+    timings.update(retrieval_timings)
+    if not relevant_chunks:
+        ANSWERS.inc(endpoint="stream", result="no_context")
+        yield {"delta": NO_CONTEXT_ANSWER}, ""
+        yield {"timings": timings}, "done"
+        return
+
+    started = time.perf_counter()
+    deltas = generate_answer_stream(question, relevant_chunks, timings)
+    parts = []
+    with stage("generate", timings):
+        while True:
+            # Each pull may block on the Bedrock stream; keep it off the loop.
+            delta = await run_blocking(next, deltas, _STREAM_END)
+            if delta is _STREAM_END:
+                break
+            if "first_token_ms" not in timings:
+                timings["first_token_ms"] = (time.perf_counter() - started) * 1000.0
+            parts.append(delta)
+            yield {"delta": delta}, ""
+
+    _store_answer(question, query_embedding, "".join(parts), version, corpus.scope, bypass_cache)
+    ANSWERS.inc(endpoint="stream", result="generated")
+    logger.info("ask/stream timings: %s", timings)
+    yield {"timings": timings}, "done"
+
+
+@app.post("/ask/stream")
+async def ask_stream(request: AskRequest):
+    """
+    Streaming chat endpoint (Server-Sent Events). Emits `data: {"delta": ...}`
+    as Claude produces tokens, then `event: done` with timings, or
+    `event: error` if answering fails at any point. Headers go out before any
+    stage has run, so timings travel in the done event instead of a
+    Server-Timing header. A request joining an identical stream already in
+    flight gets every token from the start, and `"coalesced": true` in done.
+    """
+    corpus = _searchable(request.namespaces)
+    question = request.question
+    shared, joined = _stream_flights.stream(
+        _flight_key(question, request.bypass_cache, corpus),
+        lambda: _stream_events(question, request.bypass_cache, corpus),
+    )
+    if joined:
+        ANSWERS.inc(endpoint="stream", result="coalesced")
+
+    async def events():
+        async for data, event in shared:
+            if joined and event == "done":
+                data = dict(data, coalesced=True)
+            yield _sse(data, event)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,276 @@
+"""
+Lightweight in-process metrics: counters, gauges and histograms rendered in
+the Prometheus text format on GET /metrics, plus a stage timer that feeds
+both the per-request timings dict and the latency histograms.
+
+Everything is a dict lookup and a lock-protected add, cheap enough to leave
+on for every request; there is no dependency on prometheus_client.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+# Seconds; covers a sub-millisecond BM25 lookup up to a slow Claude answer.
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(n, "")) for n in self.labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def clear(self):
+        """Drop all label sets (for gauges recomputed on every scrape)."""
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._values: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "rag_http_request_seconds", "HTTP request latency, until the last body byte is sent.",
+    ("method", "route", "status"),
+))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "rag_stage_seconds", "Latency of each /ask pipeline stage.", ("stage",),
+))
+ANSWERS = REGISTRY.register(Counter(
+    "rag_answers_total", "Questions answered, by how the answer was produced.", ("endpoint", "result"),
+))
+BEDROCK_CALLS = REGISTRY.register(Counter(
+    "rag_bedrock_calls_total", "Bedrock model invocations (each retry counts).", ("model", "outcome"),
+))
+BEDROCK_TOKENS = REGISTRY.register(Counter(
+    "rag_bedrock_tokens_total", "Tokens reported by Bedrock.", ("model", "direction"),
+))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "rag_cache_requests_total", "Cache lookups, by outcome.", ("cache", "outcome"),
+))
+CACHE_HIT_RATIO = REGISTRY.register(Gauge(
+    "rag_cache_hit_ratio", "Share of cache lookups that were hits.", ("cache",),
+))
+CACHE_ENTRIES = REGISTRY.register(Gauge(
+    "rag_cache_entries", "Entries currently held by each cache.", ("cache",),
+))
+INDEX_VECTORS = REGISTRY.register(Gauge(
+    "rag_index_vectors", "Live vectors in each shard's FAISS index.", ("namespace",),
+))
+CORPUS_CHUNKS = REGISTRY.register(Gauge(
+    "rag_corpus_chunks", "Chunks searchable in each shard.", ("namespace",),
+))
+INDEX_ARTIFACT = REGISTRY.register(Gauge(
+    "rag_index_artifact_info", "Published index version this worker is serving.", ("version",),
+))
+CORPUS_VERSION = REGISTRY.register(Gauge(
+    "rag_corpus_version", "Corpus version; bumps on every applied change.",
+))
+COALESCED_CALLS = REGISTRY.register(Counter(
+    "rag_coalesced_calls_total", "Calls saved by joining an identical call already in flight.", ("call",),
+))
+INGEST_PAGES = REGISTRY.register(Counter(
+    "rag_ingest_pages_total", "Pages seen by ingestion, by outcome.", ("source", "outcome"),
+))
+INGEST_CHUNKS = REGISTRY.register(Counter(
+    "rag_ingest_chunks_total", "Chunks embedded and indexed by ingestion.", ("source",),
+))
+INGEST_JOB_STATUS = REGISTRY.register(Gauge(
+    "rag_ingest_jobs", "Ingest jobs currently tracked, by status.", ("status",),
+))
+
+
+@contextmanager
+def stage(name: str, timings: Optional[Dict[str, float]] = None):
+    """
+    Time a pipeline stage: observe rag_stage_seconds{stage=name} and, when
+    given a timings dict, record `<name>_ms` in it (for the response body
+    and the Server-Timing header).
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        if timings is not None:
+            timings[f"{name}_ms"] = elapsed * 1000.0
+
+
+def server_timing(timings: Dict[str, float]) -> str:
+    """Render a timings dict ({"embed_ms": 12.3, ...}) as a Server-Timing header value."""
+    return ", ".join(
+        f"{name[:-3] if name.endswith('_ms') else name};dur={value:.1f}"
+        for name, value in timings.items()
+        if isinstance(value, (int, float))
+    )
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware observing rag_http_request_seconds. Labels use the
+    matched route template (/ingest/{job_id}), not the raw path, so the
+    number of series stays bounded. Streaming responses are timed until
+    their last chunk is sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        state = {"status": 500, "done": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                self._observe(scope, state, started)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Errors and disconnects before the last body chunk.
+            self._observe(scope, state, started)
+
+    @staticmethod
+    def _observe(scope, state: dict, started: float):
+        if state["done"]:
+            return
+        state["done"] = True
+        route = scope.get("route")
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            method=scope.get("method", ""),
+            route=getattr(route, "path", "unmatched"),
+            status=str(state["status"]),
+        )
@@ -0,0 +1,261 @@
+import functools
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows dev boxes have no getrusage
+    resource = None
+
+from .config import OCR_DPI, PDF_CACHE_DIR, PDF_CACHE_ENABLED, PDF_WORKERS
+
+# Bump when the extracted page format changes so cached extractions are redone.
+EXTRACT_FORMAT = 1
+
+# Worker functions live in this small module (not ingest.py) so that worker
+# processes started with spawn/forkserver only import PyPDF2/pdf2image/
+# pytesseract, not the embedding stack. Those are imported where they are
+# used, so the API process doesn't pay for them until it extracts a PDF.
+
+
+def _page_links(page) -> str:
+    links_text = ""
+    try:
+        if "/Annots" in page:
+            for annotation in page["/Annots"]:
+                annotation_obj = annotation.get_object()
+                if annotation_obj.get("/Subtype") == "/Link":
+                    uri = annotation_obj.get("/A", {}).get("/URI")
+                    if uri:
+                        links_text += f" [Link: {uri}]\n"
+    except Exception:
+        # Link extraction is optional, don't fail if it doesn't work
+        pass
+    return links_text
+
+
+def extract_pdf_text(path: str) -> List[Tuple[int, str, str]]:
+    """
+    Text layer of every page of one PDF, as (page index, text, links text).
+    Pages without a text layer come back with empty text and need OCR.
+    """
+    import PyPDF2
+
+    pages = []
+    with open(path, "rb") as f:
+        reader = PyPDF2.PdfReader(f)
+        for idx, page in enumerate(reader.pages):
+            pages.append((idx, page.extract_text() or "", _page_links(page)))
+    return pages
+
+
+def ocr_pdf_page(path: str, idx: int, dpi: int = OCR_DPI) -> Optional[str]:
+    """
+    Render a single page (not the whole document) and OCR it.
+    Returns None if rendering or OCR failed, so the result is not cached.
+    """
+    try:
+        import pytesseract
+        from pdf2image import convert_from_path
+
+        images = convert_from_path(path, dpi=dpi, first_page=idx + 1, last_page=idx + 1)
+        if not images:
+            return ""
+        return pytesseract.image_to_string(images[0]) or ""
+    except Exception as e:
+        print(f"[OCR] Failed on {path} page {idx}: {e}")
+        return None
+
+
+@functools.lru_cache(maxsize=1)
+def _tesseract_version() -> str:
+    try:
+        import pytesseract
+
+        return str(pytesseract.get_tesseract_version())
+    except Exception:
+        return "unavailable"
+
+
+def extraction_key(path: Path) -> str:
+    """
+    Everything an extraction depends on: the file bytes, the PDF library,
+    the OCR engine and its settings. Any change means re-extracting.
+    """
+    import PyPDF2
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    settings = {
+        "format": EXTRACT_FORMAT,
+        "content": h.hexdigest(),
+        "pypdf2": PyPDF2.__version__,
+        "tesseract": _tesseract_version(),
+        "ocr_dpi": OCR_DPI,
+    }
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _cache_prefix(path: Path) -> str:
+    # One cache file per PDF location; older extractions of it are replaced.
+    return hashlib.sha1(str(path.resolve()).encode("utf-8")).hexdigest()[:16]
+
+
+def load_cached_pages(path: Path, key: str) -> Optional[List[dict]]:
+    cache_file = Path(PDF_CACHE_DIR) / f"{_cache_prefix(path)}.{key}.json"
+    try:
+        with cache_file.open(encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def store_cached_pages(path: Path, key: str, pages: List[dict]):
+    root = Path(PDF_CACHE_DIR)
+    prefix = _cache_prefix(path)
+    try:
+        root.mkdir(parents=True, exist_ok=True)
+        for stale in root.glob(f"{prefix}.*.json"):
+            stale.unlink()
+        tmp = root / f"{prefix}.{key}.json.tmp"
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(pages, f)
+        os.replace(tmp, root / f"{prefix}.{key}.json")
+    except OSError as e:
+        # The cache only saves time on the next boot; never fail ingest over it.
+        print(f"[PDF] Could not cache extraction of {path}: {e}")
+
+
+def peak_rss_mb() -> Optional[Tuple[float, float]]:
+    """
+    Peak resident memory of this process and of its (finished) workers, in
+    MB; None where getrusage is unavailable.
+    """
+    if resource is None:
+        return None
+    # ru_maxrss is in KB on Linux.
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024.0
+    return own, children
+
+
+def _worker_count() -> int:
+    return max(1, PDF_WORKERS or os.cpu_count() or 1)
+
+
+def iter_pdf_pages(pdf_files: List[Path], workers: Optional[int] = None) -> Iterator[dict]:
+    """
+    Yield page dicts ({id, title, text}) for the given PDFs, in file and page
+    order, while text extraction and OCR run across a process pool.
+
+    Files whose extraction is cached (same content hash, PDF library and OCR
+    settings) cost only a hash check. For the rest, only pages without a
+    text layer are rendered, one page per OCR task, so memory stays bounded
+    by the number of workers rather than the size of the documents.
+    """
+    started = time.perf_counter()
+    workers = workers or _worker_count()
+
+    keys: List[Optional[str]] = [None] * len(pdf_files)
+    cached: List[Optional[List[dict]]] = [None] * len(pdf_files)
+    if PDF_CACHE_ENABLED:
+        for i, pdf in enumerate(pdf_files):
+            keys[i] = extraction_key(pdf)
+            cached[i] = load_cached_pages(pdf, keys[i])
+
+    # Spawned, not forked: a fork would copy the API process's threads
+    # (uvicorn, executors, index watcher) and the locks they hold.
+    executor = ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    )
+    extract_futures = [
+        executor.submit(extract_pdf_text, str(pdf)) if cached[i] is None else None
+        for i, pdf in enumerate(pdf_files)
+    ]
+    ocr_futures: Dict[int, Dict[int, Future]] = {}
+    n_pages = 0
+    n_ocr = 0
+    n_cached = sum(1 for c in cached if c is not None)
+
+    def schedule_ocr(i: int):
+        # Queue OCR for a file as soon as its text pass is done, so scanned
+        # pages of later files are OCRed while earlier files are consumed.
+        nonlocal n_ocr
+        future = extract_futures[i]
+        if future is None or i in ocr_futures or not future.done():
+            return
+        if future.exception() is not None:
+            ocr_futures[i] = {}
+            return
+        ocr_futures[i] = {
+            idx: executor.submit(ocr_pdf_page, str(pdf_files[i]), idx)
+            for idx, text, _ in future.result()
+            if not text.strip()
+        }
+        n_ocr += len(ocr_futures[i])
+
+    try:
+        for i, pdf in enumerate(pdf_files):
+            if cached[i] is not None:
+                n_pages += len(cached[i])
+                print(f"[PDF] Loaded {len(cached[i])} pages with text from {pdf} (cached)")
+                yield from cached[i]
+                continue
+
+            for j in range(i, len(pdf_files)):
+                schedule_ocr(j)
+            extracted = extract_futures[i].result()
+            schedule_ocr(i)
+
+            file_pages = []
+            complete = True
+            for idx, text, links_text in extracted:
+                if idx in ocr_futures[i]:
+                    text = ocr_futures[i].pop(idx).result()
+                    if text is None:
+                        complete = False
+                        text = ""
+
+                # Append link information to the text if found
+                if links_text:
+                    text = text + "\n\n" + links_text
+
+                # If still empty, skip this page so we don't pollute the index
+                if not text.strip():
+                    continue
+
+                page = {
+                    "id": f"{pdf.name}-page-{idx}",
+                    "title": pdf.name,
+                    "text": text,
+                }
+                file_pages.append(page)
+                n_pages += 1
+                yield page
+
+            # Don't cache a file whose OCR failed; retry it next time.
+            if keys[i] is not None and complete:
+                store_cached_pages(pdf, keys[i], file_pages)
+
+            # Log loaded pages for each PDF for visibility
+            print(f"[PDF] Loaded {len(file_pages)} pages with text from {pdf}")
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    elapsed = time.perf_counter() - started
+    rate = n_pages / elapsed if elapsed > 0 else float("inf")
+    rss = peak_rss_mb()
+    print(
+        f"[PDF] Extracted {n_pages} pages from {len(pdf_files)} files "
+        f"({n_cached} from cache) in {elapsed:.2f}s "
+        f"({rate:.1f} pages/sec, {n_ocr} OCRed, {workers} workers)"
+        + (f"; peak RSS {rss[0]:.0f} MB main, {rss[1]:.0f} MB largest worker" if rss else "")
+    )
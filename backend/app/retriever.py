@@ -0,0 +1,124 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
+
+from .config import BLOCKING_IO_WORKERS, RELEVANCE_THRESHOLD, RRF_K, TOP_K
+from .corpus import Corpus
+from .embeddings import embed_query, embed_texts
+from .metrics import stage
+from .shards import ShardView
+
+# Vector legs of concurrent /ask requests run here, next to the lexical leg.
+_executor = ThreadPoolExecutor(max_workers=BLOCKING_IO_WORKERS, thread_name_prefix="retriever")
+
+
+def _vector_search(
+    question: str,
+    corpus: Union[Corpus, ShardView],
+    top_k: int,
+    timings: Dict[str, float],
+    query_embedding: Optional[List[float]] = None,
+) -> List[Tuple[int, float]]:
+    if query_embedding is None:
+        with stage("embed", timings):
+            query_embedding = embed_query(question)
+
+    with stage("vector", timings):
+        hits = corpus.vector_search(query_embedding, top_k)
+
+    # Cosine similarity below the threshold is noise, not context.
+    return [(row, score) for row, score in hits if score >= RELEVANCE_THRESHOLD]
+
+
+def reciprocal_rank_fusion(
+    rankings: List[List[Tuple[int, float]]], k: int = RRF_K
+) -> List[Tuple[int, float]]:
+    """
+    Fuse ranked lists of (row_id, score) by summing 1 / (k + rank).
+    Scores of the individual retrievers are not comparable, ranks are.
+    """
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, (row, _) in enumerate(ranking):
+            fused[row] = fused.get(row, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(fused.items(), key=lambda kv: kv[1], reverse=True)
+
+
+def retrieve(
+    question: str,
+    corpus: Union[Corpus, ShardView],
+    top_k: int = TOP_K,
+    query_embedding: Optional[List[float]] = None,
+) -> Tuple[List[Tuple[int, float]], Dict[str, float]]:
+    """
+    Hybrid retrieval: BM25 and FAISS run concurrently, results are fused
+    with reciprocal rank fusion. Returns ((row_id, fused_score) list, timings in ms).
+    Pass query_embedding when the caller has already embedded the question.
+    Over a ShardView, each leg fans out across the selected shards and row
+    ids are (namespace, row) keys.
+    """
+    timings: Dict[str, float] = {}
+    candidates = top_k * 3
+
+    with stage("total", timings):
+        vector_future = None
+        if corpus.has_vectors:
+            vector_future = _executor.submit(
+                _vector_search, question, corpus, candidates, timings, query_embedding
+            )
+
+        with stage("lexical", timings):
+            lexical_hits = corpus.lexical_search(question, candidates)
+
+        vector_hits = vector_future.result() if vector_future is not None else []
+
+        with stage("fusion", timings):
+            fused = reciprocal_rank_fusion([lexical_hits, vector_hits])[:top_k]
+
+    return fused, timings
+
+
+def retrieve_batch(
+    questions: List[str],
+    corpus: Union[Corpus, ShardView],
+    top_k: int = TOP_K,
+    query_embeddings: Optional[List[List[float]]] = None,
+) -> Tuple[List[List[Tuple[int, float]]], Dict[str, float]]:
+    """
+    retrieve() for many questions at once: the questions are embedded in one
+    batch and the vector leg is a single multi-query FAISS search, running
+    next to the per-question BM25 searches. Returns (fused hits per
+    question, batch timings in ms).
+
+    Stages are recorded as batch_* so whole-batch timings don't skew the
+    per-question /ask latency histograms.
+    """
+    timings: Dict[str, float] = {}
+    candidates = top_k * 3
+
+    with stage("batch_total", timings):
+        if query_embeddings is None and corpus.has_vectors:
+            with stage("batch_embed", timings):
+                query_embeddings = embed_texts(questions)
+
+        def vector_leg() -> List[List[Tuple[int, float]]]:
+            with stage("batch_vector", timings):
+                hits = corpus.vector_search_batch(query_embeddings, candidates)
+            return [
+                [(row, score) for row, score in per_question if score >= RELEVANCE_THRESHOLD]
+                for per_question in hits
+            ]
+
+        vector_future = _executor.submit(vector_leg) if corpus.has_vectors else None
+
+        with stage("batch_lexical", timings):
+            lexical_hits = [corpus.lexical_search(q, candidates) for q in questions]
+
+        vector_hits = vector_future.result() if vector_future is not None else [[] for _ in questions]
+
+        with stage("batch_fusion", timings):
+            fused = [
+                reciprocal_rank_fusion([lexical, vector])[:top_k]
+                for lexical, vector in zip(lexical_hits, vector_hits)
+            ]
+
+    return fused, timings
@@ -0,0 +1,161 @@
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .config import BLOCKING_IO_WORKERS
+from .corpus import Corpus
+
+# A search hit's key: (namespace, row id within that namespace's shard).
+RowKey = Tuple[str, int]
+
+# Per-shard searches of one query run here in parallel.
+_executor = ThreadPoolExecutor(max_workers=BLOCKING_IO_WORKERS, thread_name_prefix="shard-search")
+
+
+class UnknownNamespace(KeyError):
+    pass
+
+
+def _merge(ranked: Iterable[List[Tuple[RowKey, float]]], top_k: int) -> List[Tuple[RowKey, float]]:
+    """Best `top_k` hits over several score-sorted lists."""
+    return heapq.nlargest(top_k, (hit for hits in ranked for hit in hits), key=lambda hit: hit[1])
+
+
+class ShardView:
+    """
+    The shards one query searches. Has the search interface of a Corpus
+    (lexical_search, vector_search, get_rows, ...) with hits keyed by
+    (namespace, row): every shard is searched in parallel for top_k and
+    the per-shard results are merged. Cosine scores are comparable across
+    shards (same embedding model); BM25 scores are close enough to rank by.
+    """
+
+    def __init__(self, shards: Sequence[Tuple[str, Corpus]], version: int, scope: str):
+        self.shards = list(shards)
+        # Answer cache key: version of the whole sharded corpus plus the selection.
+        self.version = version
+        self.scope = scope
+
+    @property
+    def has_vectors(self) -> bool:
+        return any(shard.has_vectors for _, shard in self.shards)
+
+    def size(self) -> int:
+        return sum(shard.size() for _, shard in self.shards)
+
+    def _map(self, fn: Callable[[str, Corpus], list]) -> List[list]:
+        if len(self.shards) == 1:
+            return [fn(*self.shards[0])]
+        return list(_executor.map(lambda item: fn(*item), self.shards))
+
+    def lexical_search(self, query: str, top_k: int) -> List[Tuple[RowKey, float]]:
+        return _merge(
+            self._map(lambda ns, shard: [((ns, row), s) for row, s in shard.lexical_search(query, top_k)]),
+            top_k,
+        )
+
+    def vector_search(self, vector: List[float], top_k: int) -> List[Tuple[RowKey, float]]:
+        return _merge(
+            self._map(lambda ns, shard: [((ns, row), s) for row, s in shard.vector_search(vector, top_k)]),
+            top_k,
+        )
+
+    def vector_search_batch(
+        self, vectors: List[List[float]], top_k: int
+    ) -> List[List[Tuple[RowKey, float]]]:
+        per_shard = self._map(
+            lambda ns, shard: [
+                [((ns, row), s) for row, s in hits]
+                for hits in shard.vector_search_batch(vectors, top_k)
+            ]
+        )
+        return [_merge([hits[q] for hits in per_shard], top_k) for q in range(len(vectors))]
+
+    def get_rows(self, keys: List[RowKey]) -> List[Tuple[RowKey, str, dict]]:
+        """(key, chunk text, metadata with its namespace) for hit keys, skipping removed rows."""
+        by_namespace: Dict[str, List[int]] = {}
+        for ns, row in keys:
+            by_namespace.setdefault(ns, []).append(row)
+        shards = dict(self.shards)
+        found: Dict[RowKey, Tuple[str, dict]] = {}
+        for ns, rows in by_namespace.items():
+            for row, text, meta in shards[ns].get_rows(rows):
+                meta["namespace"] = ns
+                found[(ns, row)] = (text, meta)
+        return [(key, *found[key]) for key in keys if key in found]
+
+
+class ShardedCorpus:
+    """
+    The served corpus, split by namespace: one Corpus (chunk store, FAISS
+    index, BM25 index) per Confluence space ("confluence:<key>") and one
+    for the PDF collection ("pdf"). A query searches only the namespaces it
+    asks for, and ingesting one space never touches another shard. Each
+    shard is published to its own directory, so an unchanged shard is
+    neither rewritten nor reloaded when another one changes.
+    """
+
+    def __init__(self, shards: Optional[Dict[str, Corpus]] = None):
+        self.shards: Dict[str, Corpus] = dict(shards or {})
+        # namespace -> (published shard directory, shard version it holds)
+        self.published: Dict[str, Tuple[str, int]] = {}
+        # Namespaces whose shard object was loaded from its published directory.
+        self.loaded: Set[str] = set()
+        # Published index version this corpus was loaded from or saved as.
+        self.artifact: Optional[str] = None
+        # Raised when installed, so the version never goes backwards in a worker.
+        self.base_version = 0
+
+    @property
+    def version(self) -> int:
+        """Changes whenever any shard changes, so caches keyed on it stay fresh."""
+        return self.base_version + sum(shard.version for shard in self.shards.values())
+
+    def namespaces(self) -> List[str]:
+        return sorted(self.shards)
+
+    def shard(self, namespace: str) -> Corpus:
+        """The shard for `namespace`, created empty if it doesn't exist yet."""
+        shard = self.shards.get(namespace)
+        if shard is None:
+            shard = Corpus()
+            # Replace rather than mutate: queries may be iterating the old dict.
+            self.shards = {**self.shards, namespace: shard}
+        return shard
+
+    def fork(self, namespace: str) -> "ShardedCorpus":
+        """
+        A corpus sharing every shard with this one except `namespace`, which
+        is a private copy (empty if the namespace is new). Ingesting into
+        the fork and publishing it leaves this corpus untouched.
+        """
+        existing = self.shards.get(namespace)
+        fork = ShardedCorpus({**self.shards, namespace: existing.copy() if existing else Corpus()})
+        fork.published = dict(self.published)
+        fork.loaded = self.loaded - {namespace}
+        fork.artifact = self.artifact
+        fork.base_version = self.base_version
+        return fork
+
+    def is_published(self, namespace: str) -> bool:
+        """True if the shard is unchanged since it was last published or loaded."""
+        published = self.published.get(namespace)
+        return published is not None and published[1] == self.shards[namespace].version
+
+    def select(self, namespaces: Optional[List[str]] = None) -> ShardView:
+        """
+        View over the given namespaces (all of them when None). Raises
+        UnknownNamespace for a namespace that has no shard.
+        """
+        shards = self.shards
+        if namespaces is None:
+            return ShardView(sorted(shards.items()), self.version, "")
+        missing = [ns for ns in namespaces if ns not in shards]
+        if missing:
+            raise UnknownNamespace(", ".join(missing))
+        selected = sorted(set(namespaces))
+        return ShardView([(ns, shards[ns]) for ns in selected], self.version, ",".join(selected))
+
+    def size(self) -> int:
+        """Number of live chunks over all shards."""
+        return sum(shard.size() for shard in self.shards.values())
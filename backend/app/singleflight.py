@@ -0,0 +1,172 @@
+import asyncio
+import threading
+from typing import AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple, TypeVar
+
+from .config import COALESCE_REQUESTS
+from .metrics import COALESCED_CALLS
+
+T = TypeVar("T")
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Thread-safe call coalescing: while do(key, fn) is running, other do()
+    calls with the same key wait for it and get its result (or its
+    exception) instead of calling fn themselves. Every joined call counts
+    as saved in rag_coalesced_calls_total{call=name}.
+    """
+
+    def __init__(self, name: str, enabled: bool = COALESCE_REQUESTS):
+        self.name = name
+        self.enabled = enabled
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        if not self.enabled:
+            return fn()
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            COALESCED_CALLS.inc(call=self.name)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class _Stream:
+    """Events of one in-flight producer, kept so late joiners replay them from the start."""
+
+    def __init__(self):
+        self.events: List = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+
+    def _notify(self):
+        self._wakeup.set()
+        self._wakeup = asyncio.Event()
+
+    def publish(self, event):
+        self.events.append(event)
+        self._notify()
+
+    def finish(self, error: Optional[BaseException] = None):
+        self.finished = True
+        self.error = error
+        self._notify()
+
+    async def follow(self) -> AsyncIterator:
+        i = 0
+        while True:
+            while i < len(self.events):
+                yield self.events[i]
+                i += 1
+            if self.finished:
+                if self.error is not None:
+                    raise self.error
+                return
+            await self._wakeup.wait()
+
+
+class AsyncSingleFlight:
+    """
+    Call coalescing for request handlers on one event loop. Identical
+    requests in flight share a single task: do() for a result, stream() for
+    an async generator of events that every joined request receives in full,
+    including events produced before it joined. Waiters are plain awaits,
+    so they hold no executor thread. Joined calls count as saved in
+    rag_coalesced_calls_total{call=name}.
+    """
+
+    def __init__(self, name: str, enabled: bool = COALESCE_REQUESTS):
+        self.name = name
+        self.enabled = enabled
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self._streams: Dict[Hashable, _Stream] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """Await fn(), or the identical call already in flight. Returns (result, joined)."""
+        if not self.enabled:
+            return await fn(), False
+        task = self._calls.get(key)
+        joined = task is not None
+        if joined:
+            COALESCED_CALLS.inc(call=self.name)
+        else:
+            task = self._calls[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda _: self._forget(self._calls, key, task))
+        # Shielded: one waiter disconnecting must not cancel the others' answer.
+        return await asyncio.shield(task), joined
+
+    def stream(self, key: Hashable, fn: Callable[[], AsyncIterator]) -> Tuple[AsyncIterator, bool]:
+        """
+        Events of fn()'s async generator, or of the identical stream already
+        in flight. Returns (events, joined). The producer runs as its own
+        task and is cancelled once every consumer has gone away.
+        """
+        if not self.enabled:
+            return fn(), False
+        stream = self._streams.get(key)
+        joined = stream is not None
+        if joined:
+            COALESCED_CALLS.inc(call=self.name)
+        else:
+            stream = self._streams[key] = _Stream()
+            stream.task = asyncio.ensure_future(self._produce(key, stream, fn))
+        return self._consume(key, stream), joined
+
+    @staticmethod
+    def _forget(calls: dict, key: Hashable, call):
+        if calls.get(key) is call:
+            del calls[key]
+
+    async def _produce(self, key: Hashable, stream: _Stream, fn: Callable[[], AsyncIterator]):
+        error = None
+        try:
+            async for event in fn():
+                stream.publish(event)
+        except asyncio.CancelledError:
+            error = RuntimeError("stream cancelled")
+            raise
+        except Exception as e:
+            error = e
+        finally:
+            self._forget(self._streams, key, stream)
+            stream.finish(error)
+
+    async def _consume(self, key: Hashable, stream: _Stream) -> AsyncIterator:
+        stream.subscribers += 1
+        try:
+            async for event in stream.follow():
+                yield event
+        finally:
+            stream.subscribers -= 1
+            if stream.subscribers == 0 and not stream.finished:
+                # Nobody is listening; later requests start a fresh stream.
+                self._forget(self._streams, key, stream)
+                stream.task.cancel()
@@ -0,0 +1,69 @@
+"""
+Questions/minute answering a question set one /ask at a time versus
+through the batch path (one embedding batch, one multi-query FAISS search,
+bounded LLM fan-out), with a fake Bedrock client of configurable latency.
+
+    python -m benchmarks.ask_batch --questions 200 --llm-latency 0.5 --concurrency 8
+"""
+import argparse
+import json
+import os
+import time
+
+os.environ.setdefault("EMBED_CACHE_ENABLED", "false")
+os.environ.setdefault("ANSWER_CACHE_ENABLED", "false")
+os.environ.setdefault("EMBED_RATE_LIMIT", "100000")
+
+from app import main  # noqa: E402
+from app.batch import answer_questions  # noqa: E402
+from app.corpus import Corpus  # noqa: E402
+from app.shards import ShardedCorpus  # noqa: E402
+
+from . import fake_bedrock  # noqa: E402
+from .ask_concurrency import WORDS, synthetic_pages  # noqa: E402
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--embed-latency", type=float, default=0.05)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--json", help="write the result to this file as JSON")
+    args = parser.parse_args()
+
+    fake = fake_bedrock.install(fake_bedrock.FakeBedrockClient(llm_latency=args.llm_latency))
+    corpus = Corpus()
+    corpus.sync_pages(synthetic_pages(args.pages), source="bench")
+    main.CORPUS = ShardedCorpus({"bench": corpus})
+    fake.embed_latency = args.embed_latency
+
+    questions = [
+        f"how do I get {WORDS[i % len(WORDS)]} {WORDS[(i * 7) % len(WORDS)]} access {i}"
+        for i in range(args.questions)
+    ]
+
+    started = time.perf_counter()
+    for q in questions:
+        main._answer_question(q, bypass_cache=True)
+    serial = time.perf_counter() - started
+
+    started = time.perf_counter()
+    answered = sum(1 for _ in answer_questions(questions, main.CORPUS.select(), True, args.concurrency))
+    batch = time.perf_counter() - started
+
+    result = {
+        "questions": len(questions),
+        "serial_questions_per_minute": len(questions) / serial * 60.0,
+        "batch_questions_per_minute": answered / batch * 60.0,
+        "concurrency": args.concurrency,
+    }
+    print(json.dumps(result, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
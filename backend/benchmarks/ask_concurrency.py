@@ -0,0 +1,137 @@
+"""
+p50/p99 /ask latency under N parallel clients, against a real uvicorn
+server with a fake Bedrock client of configurable latency.
+
+--mode inline reproduces the old behaviour (blocking work on the event
+loop) for a before/after comparison:
+    python -m benchmarks.ask_concurrency --clients 16 --mode executor
+    python -m benchmarks.ask_concurrency --clients 16 --mode inline
+"""
+import argparse
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+# Keep benchmark runs away from the real cache and index locations.
+_TMP = tempfile.mkdtemp(prefix="ask-bench-")
+os.environ.setdefault("EMBED_CACHE_ENABLED", "false")
+os.environ.setdefault("ANSWER_CACHE_ENABLED", "false")
+os.environ.setdefault("INDEX_DIR", os.path.join(_TMP, "index"))
+
+import uvicorn  # noqa: E402
+
+from app import main  # noqa: E402
+from app.corpus import Corpus  # noqa: E402
+from app.shards import ShardedCorpus  # noqa: E402
+
+from . import fake_bedrock  # noqa: E402
+
+WORDS = (
+    "access github jira confluence vault vpn laptop ticket manager approval "
+    "portal request onboarding team service hub account password sso okta "
+    "slack email calendar training policy security badge office"
+).split()
+
+
+def synthetic_pages(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    for i in range(n):
+        words = rng.choice(WORDS, size=120)
+        yield {"id": f"bench-{i}", "title": f"Bench page {i}", "text": " ".join(words)}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(mode: str) -> str:
+    if mode == "inline":
+        @main.app.post("/ask_inline")
+        async def ask_inline(request: main.AskRequest):
+            return main._answer_question(request.question)
+
+    # The benchmark installs its own corpus; skip the PDF startup ingest.
+    main.app.router.on_startup.clear()
+
+    port = _free_port()
+    server = uvicorn.Server(
+        uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+def run_clients(url: str, clients: int, requests_per_client: int):
+    def client(i):
+        session = requests.Session()
+        latencies = []
+        for j in range(requests_per_client):
+            question = f"how do I get {WORDS[(i + j) % len(WORDS)]} access"
+            started = time.perf_counter()
+            r = session.post(url, json={"question": question}, timeout=120)
+            r.raise_for_status()
+            latencies.append((time.perf_counter() - started) * 1000.0)
+        return latencies
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        results = list(pool.map(client, range(clients)))
+    wall = time.perf_counter() - started
+    latencies = [lat for per_client in results for lat in per_client]
+    return latencies, wall
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=10, help="requests per client")
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--embed-latency", type=float, default=0.05)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--mode", choices=("executor", "inline"), default="executor")
+    parser.add_argument("--json", help="write the result to this file as JSON")
+    args = parser.parse_args()
+
+    fake = fake_bedrock.install(
+        fake_bedrock.FakeBedrockClient(
+            embed_latency=0.0, llm_latency=args.llm_latency
+        )
+    )
+
+    corpus = Corpus()
+    corpus.sync_pages(synthetic_pages(args.pages), source="bench")
+    main.CORPUS = ShardedCorpus({"bench": corpus})
+    main.READY.set()
+    fake.embed_latency = args.embed_latency
+
+    base = start_server(args.mode)
+    path = "/ask" if args.mode == "executor" else "/ask_inline"
+    latencies, wall = run_clients(base + path, args.clients, args.requests)
+
+    result = {
+        "mode": args.mode,
+        "clients": args.clients,
+        "requests": len(latencies),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "throughput_rps": len(latencies) / wall,
+    }
+    print(json.dumps(result, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,114 @@
+"""
+Compare the structure-aware chunker with the old fixed character windows on
+synthetic onboarding documents (headings, numbered steps with portal links,
+repeated page footers): chunk count, tokens embedded, ingest time, index
+size and retrieval hit rate.
+
+    python -m benchmarks.chunking --docs 200 --embed-latency 0.002
+"""
+import argparse
+import json
+import os
+import time
+
+# Keep benchmark runs away from the real embedding cache; the fake client
+# has no quota, so don't measure the rate limiter either.
+os.environ.setdefault("EMBED_CACHE_ENABLED", "false")
+os.environ.setdefault("EMBED_RATE_LIMIT", "100000")
+
+import numpy as np  # noqa: E402
+
+from app import ingest  # noqa: E402
+from app.chunking import count_tokens  # noqa: E402
+from app.corpus import Corpus  # noqa: E402
+from app.retriever import retrieve  # noqa: E402
+
+from . import fake_bedrock  # noqa: E402
+
+SYSTEMS = (
+    "github jira confluence vault vpn okta slack datadog sentry jenkins "
+    "artifactory kibana grafana snowflake tableau salesforce workday zoom "
+    "figma miro notion airflow databricks pagerduty"
+).split()
+TEAMS = "leadinsights platform data sales finance marketing support security".split()
+FILLER = (
+    "Requests are usually approved within two working days. If your manager "
+    "is away, a team lead can approve on their behalf. Keep your ticket "
+    "number so the service desk can find the request quickly. "
+)
+
+
+def synthetic_docs(n_docs: int, seed: int = 0):
+    """Pages plus (question, expected link) pairs; every step's link is unique."""
+    rng = np.random.default_rng(seed)
+    pages, questions = [], []
+    for d in range(n_docs):
+        team = TEAMS[d % len(TEAMS)]
+        lines = [f"{team.title()} onboarding guide {d}", ""]
+        for s, system in enumerate(rng.choice(SYSTEMS, size=4, replace=False)):
+            url = f"https://portal.example.com/request/{system}/{team}-{d}"
+            lines += [
+                f"{system.title()} Access",
+                f"{FILLER * int(rng.integers(1, 4))}To get {system} access for the {team} team:",
+                f"1. Open the service portal at {url} and choose {system}.",
+                f"2. Select the {team} group and add your manager as approver.",
+                "3. Submit the request and wait for the confirmation email.",
+                "",
+            ]
+            questions.append((f"How do I get {system} access for the {team} team in guide {d}?", url))
+        lines += ["Informa confidential - internal use only. Page 1 of 1.", ""]
+        pages.append({"id": f"doc-{d}", "title": f"guide-{d}.pdf", "text": "\n".join(lines)})
+    return pages, questions
+
+
+def run(chunker: str, pages, questions, top_k: int) -> dict:
+    ingest.CHUNKER = chunker
+    corpus = Corpus()
+
+    started = time.perf_counter()
+    corpus.sync_pages(pages, source="bench")
+    ingest_seconds = time.perf_counter() - started
+
+    chunks = list(corpus.store.texts(corpus.store.live_rows()))
+    hits = 0
+    for question, url in questions:
+        rows, _ = retrieve(question, corpus, top_k=top_k)
+        if any(url in text for text in corpus.get_chunks([row for row, _ in rows])):
+            hits += 1
+
+    return {
+        "chunker": chunker,
+        "chunks": len(chunks),
+        "tokens_embedded": sum(count_tokens(c) for c in chunks),
+        "ingest_seconds": ingest_seconds,
+        "index_mb": corpus.index.size() * corpus.index.dim * 4 / 1e6,
+        "hit_rate": hits / len(questions),
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=4)
+    parser.add_argument("--embed-latency", type=float, default=0.002, help="fake Bedrock latency per embedding (s)")
+    parser.add_argument("--json", help="write the results to this file as JSON")
+    args = parser.parse_args()
+
+    fake_bedrock.install(fake_bedrock.FakeBedrockClient(embed_latency=args.embed_latency))
+    pages, questions = synthetic_docs(args.docs)
+
+    results = [run(chunker, pages, questions, args.top_k) for chunker in ("chars", "structured")]
+    for r in results:
+        print(
+            f"{r['chunker']:>10}: {r['chunks']:6d} chunks  {r['tokens_embedded']:8d} tokens  "
+            f"ingest {r['ingest_seconds']:6.2f}s  index {r['index_mb']:6.1f} MB  "
+            f"hit@{args.top_k} {r['hit_rate']:.3f}"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,109 @@
+"""
+A cohort asking the same question at once: N clients hit /ask (or
+/ask/stream) with one identical question in the same instant, against a
+real uvicorn server and a fake Bedrock client. Reports Bedrock embedding
+and Claude calls and latency with request coalescing on and off.
+
+    python -m benchmarks.coalescing --clients 50 --llm-latency 1.0
+"""
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("EMBED_CACHE_ENABLED", "false")
+os.environ.setdefault("ANSWER_CACHE_ENABLED", "false")
+os.environ.setdefault("EMBED_RATE_LIMIT", "100000")
+
+import requests  # noqa: E402
+
+from app import embeddings, main  # noqa: E402
+from app.corpus import Corpus  # noqa: E402
+from app.metrics import COALESCED_CALLS  # noqa: E402
+from app.shards import ShardedCorpus  # noqa: E402
+
+from . import fake_bedrock  # noqa: E402
+from .ask_concurrency import start_server, synthetic_pages  # noqa: E402
+
+FLIGHTS = (main._ask_flights, main._stream_flights, embeddings._query_flights, embeddings._bedrock_flights)
+
+
+def _saved() -> dict:
+    return {flight.name: COALESCED_CALLS.value(call=flight.name) for flight in FLIGHTS}
+
+
+def burst(url: str, clients: int, question: str, stream: bool):
+    """All clients post the same question at the same moment; per-client latencies in ms."""
+    gate = threading.Barrier(clients)
+
+    def client(_):
+        session = requests.Session()
+        gate.wait()
+        started = time.perf_counter()
+        r = session.post(url, json={"question": question}, timeout=300, stream=stream)
+        r.raise_for_status()
+        body = r.text
+        if stream and "event: done" not in body:
+            raise RuntimeError("stream ended without a done event")
+        return (time.perf_counter() - started) * 1000.0
+
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        return list(pool.map(client, range(clients)))
+
+
+def run(base: str, fake, clients: int, rounds: int, stream: bool, coalesce: bool) -> dict:
+    for flight in FLIGHTS:
+        flight.enabled = coalesce
+    path = "/ask/stream" if stream else "/ask"
+    embed_before, llm_before, saved_before = fake.embed_calls, fake.llm_calls, _saved()
+    latencies = []
+    for i in range(rounds):
+        # A new question each round, so nothing is answered from the caches.
+        latencies += burst(base + path, clients, f"how do I request vpn access, cohort {coalesce} {stream} {i}", stream)
+    saved = _saved()
+    return {
+        "endpoint": path,
+        "coalesce": coalesce,
+        "requests": clients * rounds,
+        "bedrock_embed_calls": fake.embed_calls - embed_before,
+        "claude_calls": fake.llm_calls - llm_before,
+        "calls_saved": {name: saved[name] - saved_before[name] for name in saved},
+        "p50_ms": statistics.median(latencies),
+        "max_ms": max(latencies),
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--embed-latency", type=float, default=0.05)
+    parser.add_argument("--llm-latency", type=float, default=1.0)
+    parser.add_argument("--json", help="write the result to this file as JSON")
+    args = parser.parse_args()
+
+    fake = fake_bedrock.install(fake_bedrock.FakeBedrockClient(embed_latency=0.0, llm_latency=args.llm_latency))
+    corpus = Corpus()
+    corpus.sync_pages(synthetic_pages(args.pages), source="bench")
+    main.CORPUS = ShardedCorpus({"bench": corpus})
+    main.READY.set()
+    fake.embed_latency = args.embed_latency
+    base = start_server("executor")
+
+    result = {"clients": args.clients, "runs": []}
+    for stream in (False, True):
+        for coalesce in (False, True):
+            result["runs"].append(run(base, fake, args.clients, args.rounds, stream, coalesce))
+
+    print(json.dumps(result, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
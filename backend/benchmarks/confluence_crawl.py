@@ -0,0 +1,158 @@
+"""
+Crawl a local stub Confluence server and report pages/sec, then re-crawl
+to show that unchanged pages are skipped without fetching their bodies.
+
+    python -m benchmarks.confluence_crawl --pages 500 --latency 0.05 --workers 1 8 16
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Keep benchmark runs away from the real embedding cache.
+os.environ.setdefault("EMBED_CACHE_ENABLED", "false")
+# The fake Bedrock client has no quota; measure the crawler, not the rate limiter.
+os.environ.setdefault("EMBED_RATE_LIMIT", "100000")
+
+from app.confluence import ConfluenceCrawler  # noqa: E402
+from app.corpus import Corpus  # noqa: E402
+
+from . import fake_bedrock  # noqa: E402
+
+
+class StubConfluence:
+    """Minimal /rest/api/content listing and page endpoints over fake pages."""
+
+    def __init__(self, n_pages: int, latency: float):
+        self.latency = latency
+        self.pages = {
+            str(i): {
+                "id": str(i),
+                "title": f"Stub page {i}",
+                "version": {"number": 1, "when": "2024-01-01T00:00:00.000Z"},
+                "html": f"<p>Page {i} explains onboarding step {i} and how to request access.</p>",
+            }
+            for i in range(n_pages)
+        }
+        self.requests = {"list": 0, "page": 0}
+        self._lock = threading.Lock()
+
+    def edit(self, page_id: str):
+        page = self.pages[page_id]
+        page["version"] = {"number": page["version"]["number"] + 1, "when": time.strftime("%Y-%m-%dT%H:%M:%SZ")}
+        page["html"] += "<p>Updated.</p>"
+
+    def handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; avoid delayed-ACK stalls.
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                if stub.latency:
+                    time.sleep(stub.latency)
+                if url.path == "/rest/api/content":
+                    body = stub._list(int(query.get("start", 0)), int(query.get("limit", 25)))
+                    kind = "list"
+                elif url.path.startswith("/rest/api/content/"):
+                    page = stub.pages.get(url.path.rsplit("/", 1)[-1])
+                    if page is None:
+                        self.send_error(404)
+                        return
+                    body = stub._item(page, with_body=True)
+                    kind = "page"
+                else:
+                    self.send_error(404)
+                    return
+                with stub._lock:
+                    stub.requests[kind] += 1
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+    def _item(self, page: dict, with_body: bool = False) -> dict:
+        item = {"id": page["id"], "title": page["title"], "version": page["version"]}
+        if with_body:
+            item["body"] = {"storage": {"value": page["html"]}}
+        return item
+
+    def _list(self, start: int, limit: int) -> dict:
+        ids = list(self.pages)[start:start + limit]
+        body = {"results": [self._item(self.pages[i]) for i in ids], "size": len(ids), "_links": {}}
+        if start + limit < len(self.pages):
+            body["_links"]["next"] = f"/rest/api/content?start={start + limit}&limit={limit}"
+        return body
+
+    def serve(self) -> str:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), self.handler())
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def crawl_once(base_url: str, workers: int, corpus: Corpus, source: str) -> dict:
+    crawler = ConfluenceCrawler(base_url=base_url, workers=workers)
+    started = time.perf_counter()
+    stats = corpus.sync_pages(crawler.crawl("BENCH", known=corpus.page_fingerprints(source)), source=source)
+    elapsed = time.perf_counter() - started
+    return {
+        "workers": workers,
+        "crawl": crawler.stats,
+        "sync": stats,
+        "ingest_seconds": elapsed,
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.05, help="stub server latency per request (s)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8, 16])
+    parser.add_argument("--edit", type=int, default=10, help="pages edited before the re-crawl")
+    parser.add_argument("--json", help="write the results to this file as JSON")
+    args = parser.parse_args()
+
+    fake_bedrock.install(fake_bedrock.FakeBedrockClient())
+
+    results = []
+    for workers in args.workers:
+        stub = StubConfluence(args.pages, args.latency)
+        base_url = stub.serve()
+        corpus = Corpus()
+        source = "confluence:BENCH"
+
+        first = crawl_once(base_url, workers, corpus, source)
+        for i in range(args.edit):
+            stub.edit(str(i))
+        requests_before = dict(stub.requests)
+        second = crawl_once(base_url, workers, corpus, source)
+        second["page_requests"] = stub.requests["page"] - requests_before["page"]
+        results.append({"full": first, "recrawl": second})
+        print(
+            f"workers={workers:3d} full: {first['crawl']['pages_per_sec']:8.1f} pages/sec  "
+            f"re-crawl: {second['crawl']['pages_per_sec']:8.1f} pages/sec "
+            f"({second['page_requests']} bodies fetched, {second['sync']['unchanged']} unchanged)"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
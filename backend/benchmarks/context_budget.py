@@ -0,0 +1,70 @@
+"""
+Prompt context size before and after context assembly (merging neighbouring
+chunks, dropping repeated sentences, token budget), and whether the chunk
+that answers the question still makes it into the prompt.
+
+    python -m benchmarks.context_budget --docs 200 --chunker chars --budget 1500
+"""
+import argparse
+import json
+import os
+
+os.environ.setdefault("EMBED_CACHE_ENABLED", "false")
+os.environ.setdefault("EMBED_RATE_LIMIT", "100000")
+
+import numpy as np  # noqa: E402
+
+from app import ingest  # noqa: E402
+from app.chunking import count_tokens  # noqa: E402
+from app.config import CONTEXT_CANDIDATES  # noqa: E402
+from app.context import assemble_context  # noqa: E402
+from app.corpus import Corpus  # noqa: E402
+from app.retriever import retrieve  # noqa: E402
+
+from . import fake_bedrock  # noqa: E402
+from .chunking import synthetic_docs  # noqa: E402
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--chunker", choices=("chars", "structured"), default="chars")
+    parser.add_argument("--candidates", type=int, default=CONTEXT_CANDIDATES)
+    parser.add_argument("--budget", type=int, default=1500)
+    parser.add_argument("--json", help="write the result to this file as JSON")
+    args = parser.parse_args()
+
+    fake_bedrock.install(fake_bedrock.FakeBedrockClient())
+    ingest.CHUNKER = args.chunker
+    pages, questions = synthetic_docs(args.docs)
+    corpus = Corpus()
+    corpus.sync_pages(pages, source="bench")
+
+    raw_tokens, context_tokens = [], []
+    raw_covered = context_covered = 0
+    for question, url in questions:
+        hits, _ = retrieve(question, corpus, top_k=args.candidates)
+        raw = corpus.get_chunks([row for row, _ in hits])
+        passages, _ = assemble_context(hits, corpus, budget=args.budget)
+
+        raw_tokens.append(sum(count_tokens(c) for c in raw))
+        context_tokens.append(sum(count_tokens(p) for p in passages))
+        raw_covered += any(url in c for c in raw)
+        context_covered += any(url in p for p in passages)
+
+    result = {
+        "chunker": args.chunker,
+        "questions": len(questions),
+        "raw_tokens_mean": float(np.mean(raw_tokens)),
+        "context_tokens_mean": float(np.mean(context_tokens)),
+        "raw_coverage": raw_covered / len(questions),
+        "context_coverage": context_covered / len(questions),
+    }
+    print(json.dumps(result, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,147 @@
+"""
+Recall@k versus latency for the FaissIndex types and stored vector
+precisions, measured against the exact float32 flat index on a synthetic
+clustered corpus. int8 runs are reported with and without rescoring.
+
+Run from backend/:
+    python -m benchmarks.faiss_recall --n 100000 --dim 1024 --k 10
+    python -m benchmarks.faiss_recall --dim 256 --types flat hnsw --dtypes float32 float16 int8
+"""
+import argparse
+import json
+import time
+
+import faiss
+import numpy as np
+
+from app.faiss_index import FaissIndex
+
+# (index_type, parameter name, values swept at search time)
+SWEEPS = [
+    ("flat", None, [None]),
+    ("hnsw", "ef_search", [16, 32, 64, 128, 256]),
+    ("ivf", "nprobe", [1, 4, 16, 64]),
+    ("ivfpq", "nprobe", [1, 4, 16, 64]),
+    ("sq8", None, [None]),
+]
+
+
+def synthetic_vectors(n: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    """Gaussian blobs around random centroids, closer to real embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centroids = rng.standard_normal((clusters, dim)).astype("float32")
+    assignment = rng.integers(0, clusters, size=n)
+    noise = rng.standard_normal((n, dim)).astype("float32") * 0.6
+    return centroids[assignment] + noise
+
+
+def index_bytes(index: FaissIndex) -> int:
+    writer = faiss.VectorIOWriter()
+    faiss.write_index(index.index, writer)
+    return writer.data.size()
+
+
+def rescore_bytes(index: FaissIndex) -> int:
+    """Size of the float16 copy int8 indexes re-rank with (memory-mapped when served)."""
+    return index._exact[: index._next_id].nbytes if index._rescore else 0
+
+
+def search_all(index: FaissIndex, queries: np.ndarray, k: int):
+    latencies = []
+    results = []
+    for q in queries:
+        started = time.perf_counter()
+        hits = index.search_ids(q, k)
+        latencies.append((time.perf_counter() - started) * 1000.0)
+        results.append([row for row, _ in hits])
+    return results, latencies
+
+
+def recall_at_k(truth, results, k: int) -> float:
+    found = sum(len(set(t[:k]) & set(r[:k])) for t, r in zip(truth, results))
+    return found / float(k * len(truth))
+
+
+def run(args) -> list:
+    data = synthetic_vectors(args.n, args.dim, args.clusters, args.seed)
+    queries = synthetic_vectors(args.queries, args.dim, args.clusters, args.seed + 1)
+    metadatas = [{}] * args.n
+
+    exact = FaissIndex(args.dim, index_type="flat")
+    exact.add(data, metadatas)
+    truth, _ = search_all(exact, queries, args.k)
+
+    report = []
+    for index_type, param, values in SWEEPS:
+        if args.types and index_type not in args.types:
+            continue
+        # ivfpq and sq8 pick their own encoding.
+        dtypes = args.dtypes if index_type in ("flat", "hnsw", "ivf") else ["float32"]
+
+        for vector_dtype in dtypes:
+            started = time.perf_counter()
+            index = FaissIndex(args.dim, index_type=index_type, vector_dtype=vector_dtype)
+            index.add(data, metadatas)
+            build_s = time.perf_counter() - started
+            size = index_bytes(index)
+
+            for rescore in ([True, False] if index._rescore else [False]):
+                index._rescore = rescore
+                for value in values:
+                    if param is not None:
+                        index.set_search_params(**{param: value})
+                    results, latencies = search_all(index, queries, args.k)
+                    report.append({
+                        "index_type": index_type,
+                        "vector_dtype": vector_dtype,
+                        "rescore": rescore,
+                        "param": param,
+                        "value": value,
+                        "recall_at_k": recall_at_k(truth, results, args.k),
+                        "p50_ms": float(np.percentile(latencies, 50)),
+                        "p99_ms": float(np.percentile(latencies, 99)),
+                        "build_s": build_s,
+                        "index_mb": size / 1e6,
+                        "rescore_mb": rescore_bytes(index) / 1e6,
+                    })
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--n", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--clusters", type=int, default=256)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--types", nargs="*", help="subset of index types to run")
+    parser.add_argument(
+        "--dtypes", nargs="+", default=["float32"], choices=["float32", "float16", "int8"],
+        help="stored vector precisions for flat, hnsw and ivf",
+    )
+    parser.add_argument("--json", help="write the report to this file as JSON")
+    args = parser.parse_args()
+
+    report = run(args)
+
+    print(
+        f"{'type':<7}{'dtype':<9}{'rescore':<8}{'param':<11}{'value':>6}{'recall@k':>10}"
+        f"{'p50 ms':>9}{'p99 ms':>9}{'build s':>9}{'MB':>9}{'+f16 MB':>9}"
+    )
+    for r in report:
+        print(
+            f"{r['index_type']:<7}{r['vector_dtype']:<9}{'yes' if r['rescore'] else '-':<8}"
+            f"{r['param'] or '-':<11}{str(r['value'] or '-'):>6}"
+            f"{r['recall_at_k']:>10.3f}{r['p50_ms']:>9.3f}{r['p99_ms']:>9.3f}"
+            f"{r['build_s']:>9.2f}{r['index_mb']:>9.1f}{r['rescore_mb']:>9.1f}"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
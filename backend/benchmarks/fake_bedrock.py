@@ -0,0 +1,83 @@
+"""
+Deterministic local stand-in for the bedrock-runtime client, with
+configurable latency, so benchmarks exercise the real code paths without
+AWS credentials or network variance.
+"""
+import hashlib
+import io
+import json
+import threading
+import time
+
+import numpy as np
+
+
+def fake_embedding(text: str, dim: int) -> np.ndarray:
+    """Bag-of-hashed-words vector: texts sharing words get similar vectors."""
+    v = np.zeros(dim, dtype="float32")
+    for token in text.lower().split():
+        h = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+        v[h % dim] += 1.0 if (h >> 32) & 1 else -1.0
+    if not v.any():
+        v[0] = 1.0
+    return v
+
+
+class FakeBedrockClient:
+    def __init__(
+        self,
+        dim: int = 1024,
+        embed_latency: float = 0.0,
+        llm_latency: float = 0.0,
+        llm_tokens: int = 50,
+        token_latency: float = 0.0,
+    ):
+        self.dim = dim
+        self.embed_latency = embed_latency
+        self.llm_latency = llm_latency
+        self.llm_tokens = llm_tokens
+        self.token_latency = token_latency
+        self.embed_calls = 0
+        self.llm_calls = 0
+        self._lock = threading.Lock()
+
+    def invoke_model(self, modelId, body, accept=None, contentType=None):
+        with self._lock:
+            self.embed_calls += 1
+        if self.embed_latency:
+            time.sleep(self.embed_latency)
+        request = json.loads(body)
+        dim = request.get("dimensions", self.dim)
+        vector = fake_embedding(request["inputText"], dim)
+        payload = json.dumps({
+            "embedding": vector.tolist(),
+            "inputTextTokenCount": len(request["inputText"].split()),
+        }).encode("utf-8")
+        return {"body": io.BytesIO(payload)}
+
+    def _stream(self):
+        start = {"type": "message_start", "message": {"usage": {"input_tokens": 1000, "output_tokens": 1}}}
+        yield {"chunk": {"bytes": json.dumps(start).encode("utf-8")}}
+        for i in range(self.llm_tokens):
+            if self.token_latency:
+                time.sleep(self.token_latency)
+            delta = {"type": "content_block_delta", "delta": {"text": f"token{i} "}}
+            yield {"chunk": {"bytes": json.dumps(delta).encode("utf-8")}}
+        end = {"type": "message_delta", "delta": {}, "usage": {"output_tokens": self.llm_tokens}}
+        yield {"chunk": {"bytes": json.dumps(end).encode("utf-8")}}
+
+    def invoke_model_with_response_stream(self, modelId, body, contentType=None, accept=None):
+        with self._lock:
+            self.llm_calls += 1
+        if self.llm_latency:
+            time.sleep(self.llm_latency)
+        return {"body": self._stream()}
+
+
+def install(client: FakeBedrockClient):
+    """Route the app's embedding and LLM modules to the fake client."""
+    from app import embeddings, llm
+
+    embeddings._get_bedrock_client = lambda: client
+    llm._get_bedrock_client = lambda: client
+    return client
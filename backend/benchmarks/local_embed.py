@@ -0,0 +1,111 @@
+"""
+Chunks/sec of the local sentence-transformers backend versus the previous
+path (model loaded at import, encode() called on each small ingest batch in
+arrival order), plus the import cost of app.embeddings before the model is
+touched. Needs sentence-transformers installed.
+
+    python -m benchmarks.local_embed --chunks 20000 --processes 1 4 --quantize
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("USE_LOCAL_EMBEDDINGS", "true")
+os.environ.setdefault("EMBED_CACHE_ENABLED", "false")
+
+import numpy as np  # noqa: E402
+
+from app import local_embeddings  # noqa: E402
+from app.ingest import split_page  # noqa: E402
+
+from .chunking import synthetic_docs  # noqa: E402
+
+
+def synthetic_texts(n: int):
+    """Chunks of the synthetic onboarding docs, cut by the real chunker (varied lengths)."""
+    texts = []
+    pages, _ = synthetic_docs(max(1, n // 4))
+    while len(texts) < n:
+        for page in pages:
+            texts.extend(chunk for _, chunk in split_page(page["text"]))
+    return texts[:n]
+
+
+def import_seconds() -> float:
+    """Wall time of a fresh `import app.embeddings` with local embeddings enabled."""
+    code = "import time; t = time.perf_counter(); import app.embeddings; print(time.perf_counter() - t)"
+    out = subprocess.check_output([sys.executable, "-c", code], env=dict(os.environ), text=True)
+    return float(out.strip().splitlines()[-1])
+
+
+def baseline(texts, batch: int) -> float:
+    """Old behaviour: encode each ingest batch as it comes, default batch size."""
+    model = local_embeddings.get_model()
+    started = time.perf_counter()
+    for i in range(0, len(texts), batch):
+        model.encode(texts[i:i + batch])
+    return len(texts) / (time.perf_counter() - started)
+
+
+def configured(texts, batch_size: int, processes: int, quantize: bool) -> dict:
+    local_embeddings.LOCAL_EMBED_PROCESSES = processes
+    local_embeddings.LOCAL_EMBED_QUANTIZE = quantize
+    local_embeddings._model = None
+    local_embeddings._pool = None
+
+    started = time.perf_counter()
+    local_embeddings.encode(texts[: batch_size * 2 * max(processes, 1)], batch_size)  # load + warm
+    warm = time.perf_counter() - started
+
+    per_call = local_embeddings.ingest_batch_size()
+    started = time.perf_counter()
+    parts = [
+        local_embeddings.encode(texts[i:i + per_call], batch_size)
+        for i in range(0, len(texts), per_call)
+    ]
+    elapsed = time.perf_counter() - started
+    if local_embeddings._pool is not None:
+        local_embeddings._pool.shutdown()
+    return {
+        "processes": processes,
+        "quantize": quantize,
+        "batch_size": batch_size,
+        "warm_up_s": warm,
+        "chunks_per_sec": len(texts) / elapsed,
+        "dim": int(np.vstack(parts).shape[1]),
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--baseline-batch", type=int, default=16, help="ingest batch size of the old path")
+    parser.add_argument("--batch-size", type=int, default=local_embeddings.LOCAL_EMBED_BATCH_SIZE)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--quantize", action="store_true", help="also measure int8-quantized models")
+    parser.add_argument("--json", help="write the result to this file as JSON")
+    args = parser.parse_args()
+
+    texts = synthetic_texts(args.chunks)
+    result = {
+        "chunks": len(texts),
+        "cpus": os.cpu_count(),
+        "import_app_embeddings_s": import_seconds(),
+        "baseline_chunks_per_sec": baseline(texts, args.baseline_batch),
+        "runs": [],
+    }
+    for quantize in ([False, True] if args.quantize else [False]):
+        for processes in args.processes:
+            result["runs"].append(configured(texts, args.batch_size, processes, quantize))
+
+    print(json.dumps(result, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,115 @@
+"""
+Namespace sharding: retrieval latency over one monolithic corpus versus the
+same pages split into per-namespace shards (all shards fanned out in
+parallel, and a single-namespace filter), plus the cost of re-publishing
+after one namespace changes. Bedrock is replaced by the fake client.
+
+    python -m benchmarks.shards --namespaces 8 --pages 500 --queries 200
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("EMBED_CACHE_ENABLED", "false")
+os.environ.setdefault("EMBED_RATE_LIMIT", "1000000")
+
+from app.corpus import Corpus  # noqa: E402
+from app.index_store import load_corpus, save_corpus  # noqa: E402
+from app.retriever import retrieve  # noqa: E402
+from app.shards import ShardedCorpus  # noqa: E402
+
+from . import fake_bedrock  # noqa: E402
+from .ask_concurrency import WORDS, synthetic_pages  # noqa: E402
+
+MANIFEST = {"format": "bench"}
+
+
+def _pages(namespace: str, n: int, seed: int):
+    for page in synthetic_pages(n, seed=seed):
+        yield dict(page, id=f"{namespace}-{page['id']}")
+
+
+def _latency_ms(corpus, questions) -> dict:
+    times = []
+    for question in questions:
+        started = time.perf_counter()
+        retrieve(question, corpus)
+        times.append((time.perf_counter() - started) * 1000.0)
+    times.sort()
+    return {"p50_ms": statistics.median(times), "p99_ms": times[int(len(times) * 0.99) - 1]}
+
+
+def _timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--namespaces", type=int, default=8)
+    parser.add_argument("--pages", type=int, default=500, help="pages per namespace")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--json", help="write the result to this file as JSON")
+    args = parser.parse_args()
+
+    fake_bedrock.install(fake_bedrock.FakeBedrockClient())
+    names = [f"confluence:S{i}" for i in range(args.namespaces)]
+
+    monolith = Corpus()
+    sharded = ShardedCorpus()
+    for seed, ns in enumerate(names):
+        monolith.sync_pages(_pages(ns, args.pages, seed), source=ns)
+        sharded.shard(ns).sync_pages(_pages(ns, args.pages, seed), source=ns)
+
+    questions = [
+        f"how do I get {WORDS[i % len(WORDS)]} {WORDS[(i * 7) % len(WORDS)]} access"
+        for i in range(args.queries)
+    ]
+    result = {
+        "namespaces": args.namespaces,
+        "chunks": monolith.size(),
+        "search": {
+            "monolithic": _latency_ms(monolith, questions),
+            "sharded_all": _latency_ms(sharded.select(), questions),
+            "sharded_one_namespace": _latency_ms(sharded.select(names[:1]), questions),
+        },
+    }
+
+    # Re-publish after one namespace changed: the monolith rewrites
+    # everything, the sharded corpus only the changed shard.
+    tmp = tempfile.mkdtemp(prefix="shards-bench-")
+    try:
+        whole = ShardedCorpus({"all": monolith})
+        save_corpus(MANIFEST, whole, os.path.join(tmp, "monolith"))
+        save_corpus(MANIFEST, sharded, os.path.join(tmp, "sharded"))
+        # sync_pages takes a namespace's full page set: keep it, add 10 pages.
+        changed = list(_pages(names[0], args.pages, 0)) + list(_pages(f"{names[0]}-new", 10, 10_000))
+        monolith.sync_pages(changed, source=names[0])
+        sharded.shard(names[0]).sync_pages(changed, source=names[0])
+
+        _, mono_save = _timed(save_corpus, MANIFEST, whole, os.path.join(tmp, "monolith"))
+        _, shard_save = _timed(save_corpus, MANIFEST, sharded, os.path.join(tmp, "sharded"))
+        previous, _ = load_corpus(MANIFEST, os.path.join(tmp, "sharded"))
+        changed += list(_pages(f"{names[0]}-newer", 10, 20_000))
+        sharded.shard(names[0]).sync_pages(changed, source=names[0])
+        save_corpus(MANIFEST, sharded, os.path.join(tmp, "sharded"))
+        _, full_load = _timed(load_corpus, MANIFEST, os.path.join(tmp, "sharded"))
+        _, reuse_load = _timed(load_corpus, MANIFEST, os.path.join(tmp, "sharded"), previous)
+        result["publish_after_one_namespace_changed_s"] = {"monolithic": mono_save, "sharded": shard_save}
+        result["load_new_version_s"] = {"from_scratch": full_load, "reusing_unchanged_shards": reuse_load}
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print(json.dumps(result, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,181 @@
+"""
+Startup cost of the API: wall time of `import app.main`, and for a real
+uvicorn process, the time until the port answers (time-to-listen) and until
+the index is loaded (time-to-ready), both for a cold start that builds the
+index from a generated PDF and a warm start that loads the published one.
+Bedrock is replaced by the fake client in benchmarks/fake_bedrock.py.
+
+    python -m benchmarks.startup --pages 200 --embed-latency 0.005 --json startup.json
+
+Builds without /readyz count as ready once they listen.
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+from .chunking import synthetic_docs
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _pdf_string(text: str) -> str:
+    text = text.encode("latin-1", "replace").decode("latin-1")
+    return "(" + text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+
+def write_pdf(path: str, pages):
+    """Minimal text-only PDF, one page per entry of `pages` (lists of lines)."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        ops = " T* ".join(f"{_pdf_string(line[:110])} Tj" for line in lines[:60])
+        stream = f"BT /F1 9 Tf 11 TL 40 800 Td {ops} ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        content = len(objects)
+        objects.append(
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content} 0 R >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def import_seconds(runs: int) -> float:
+    """Median wall time of a fresh `import app.main`."""
+    code = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+    times = []
+    for _ in range(runs):
+        out = subprocess.check_output(
+            [sys.executable, "-c", code], cwd=BACKEND_DIR, env=dict(os.environ), text=True,
+            stderr=subprocess.DEVNULL,
+        )
+        times.append(float(out.strip().splitlines()[-1]))
+    return statistics.median(times)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_once(env: dict, embed_latency: float, timeout: float) -> dict:
+    """Start a server process and time when it listens and when it is ready."""
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.startup", "--serve", str(port),
+         "--embed-latency", str(embed_latency)],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    result = {"listen_s": None, "ready_s": None, "ask_while_starting": None}
+    try:
+        while time.perf_counter() - started < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"server exited with {proc.returncode}")
+            try:
+                ready = requests.get(f"{url}/readyz", timeout=1)
+            except requests.ConnectionError:
+                time.sleep(0.01)
+                continue
+            now = time.perf_counter() - started
+            if result["listen_s"] is None:
+                result["listen_s"] = now
+                if ready.status_code != 200:
+                    ask = requests.post(f"{url}/ask", json={"question": "vpn access"}, timeout=5)
+                    result["ask_while_starting"] = {
+                        "status": ask.status_code,
+                        "retry_after": ask.headers.get("Retry-After"),
+                    }
+            if ready.status_code in (200, 404):
+                result["ready_s"] = now
+                result["index_version"] = ready.json().get("index_version") if ready.status_code == 200 else None
+                break
+            time.sleep(0.02)
+    finally:
+        proc.terminate()
+        proc.wait()
+    return result
+
+
+def serve(port: int, embed_latency: float):
+    from . import fake_bedrock
+
+    fake_bedrock.install(fake_bedrock.FakeBedrockClient(embed_latency=embed_latency))
+    import uvicorn
+
+    uvicorn.run("app.main:app", host="127.0.0.1", port=port, log_level="warning")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=200, help="pages in the generated PDF")
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="fake Bedrock seconds per embedding")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("--json", help="write the result to this file as JSON")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.embed_latency)
+        return
+
+    tmp = tempfile.mkdtemp(prefix="startup-bench-")
+    docs, _ = synthetic_docs(args.pages)
+    pdf_path = os.path.join(tmp, "onboarding.pdf")
+    write_pdf(pdf_path, [doc["text"].splitlines() for doc in docs])
+
+    result = {"pages": args.pages, "import_app_main_s": import_seconds(args.runs), "cold": [], "warm": []}
+    for run in range(args.runs):
+        env = dict(
+            os.environ,
+            PYTHONPATH=BACKEND_DIR,
+            PDF_PATH=pdf_path,
+            INDEX_DIR=os.path.join(tmp, f"index-{run}"),
+            PDF_CACHE_DIR=os.path.join(tmp, f"pdf-cache-{run}"),
+            EMBED_CACHE_ENABLED="false",
+            ANSWER_CACHE_ENABLED="false",
+            EMBED_RATE_LIMIT="1000000",
+            INDEX_POLL_SECONDS="0",
+        )
+        # Cold: nothing published yet, startup extracts and embeds the PDF.
+        # Warm: same INDEX_DIR, startup loads the version the cold run published.
+        result["cold"].append(start_once(env, args.embed_latency, args.timeout))
+        result["warm"].append(start_once(env, args.embed_latency, args.timeout))
+
+    for kind in ("cold", "warm"):
+        for key in ("listen_s", "ready_s"):
+            values = [r[key] for r in result[kind] if r[key] is not None]
+            result[f"{kind}_{key}_median"] = statistics.median(values) if values else None
+
+    print(json.dumps(result, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
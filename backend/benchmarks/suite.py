@@ -0,0 +1,280 @@
+"""
+Benchmark suite: ingest throughput, index build time, memory footprint,
+per-stage /ask latency percentiles and retrieval recall on synthetic
+corpora of configurable size, with Bedrock replaced by the deterministic
+fake in benchmarks/fake_bedrock.py.
+
+Results are JSON, so runs on two commits can be compared:
+    python -m benchmarks.suite --sizes 1000 10000 100000 --out base.json
+    python -m benchmarks.suite --sizes 1000 10000 100000 --compare base.json
+
+For 1M chunks use a smaller --dim (vectors alone are n * dim * 4 bytes).
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from typing import Tuple
+
+# Keep benchmark runs away from the real caches; the fake client has no
+# quota, so don't measure the rate limiter either.
+os.environ.setdefault("EMBED_CACHE_ENABLED", "false")
+os.environ.setdefault("ANSWER_CACHE_ENABLED", "false")
+os.environ.setdefault("EMBED_RATE_LIMIT", "1000000")
+
+import faiss  # noqa: E402
+import numpy as np  # noqa: E402
+
+from app import main  # noqa: E402
+from app.config import TOP_K  # noqa: E402
+from app.corpus import Corpus  # noqa: E402
+from app.faiss_index import FaissIndex  # noqa: E402
+from app.retriever import retrieve  # noqa: E402
+from app.shards import ShardedCorpus  # noqa: E402
+
+from . import fake_bedrock  # noqa: E402
+
+STAGES = ("embed_ms", "lexical_ms", "vector_ms", "fusion_ms", "context_ms", "generate_ms", "total_ms")
+
+# metric -> True if higher is better; used by --compare.
+HIGHER_IS_BETTER = {
+    "ingest_chunks_per_sec": True,
+    "index_build_s": False,
+    "lexical_build_s": False,
+    "rss_mb": False,
+    "index_mb": False,
+    "recall_hybrid": True,
+    "recall_lexical": True,
+    "recall_vector": True,
+}
+
+
+def _word(i: int) -> str:
+    # Letters only: the chunker's dedupe ignores digits, so "term12" and
+    # "term13" would look like the same word.
+    i += 26 * 26 * 26
+    letters = ""
+    while i:
+        i, r = divmod(i, 26)
+        letters = chr(ord("a") + r) + letters
+    return letters
+
+
+def synthetic_chunks(n: int, vocab: int = 20000, words: int = 60, seed: int = 0):
+    """Chunks of Zipf-distributed pseudo-words: a few very common, a long tail of rare ones."""
+    rng = np.random.default_rng(seed)
+    ids = (rng.zipf(1.3, size=(n, words)) - 1) % vocab
+    names = [_word(i) for i in range(vocab)]
+    return [" ".join(names[i] for i in row) for row in ids]
+
+
+def rss_mb() -> float:
+    """Current resident set size; falls back to peak RSS off Linux."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def percentiles(values) -> dict:
+    if not values:
+        return {}
+    return {f"p{p}": float(np.percentile(values, p)) for p in (50, 95, 99)}
+
+
+def measure_ingest(chunks, fake, embed_latency: float) -> dict:
+    """Full pipeline (chunk, embed through the fake client, index) on one chunk per page."""
+    fake.embed_latency = embed_latency
+    corpus = Corpus()
+    pages = ({"id": f"p{i}", "title": f"page {i}", "text": text} for i, text in enumerate(chunks))
+    started = time.perf_counter()
+    corpus.sync_pages(pages, source="bench")
+    elapsed = time.perf_counter() - started
+    fake.embed_latency = 0.0
+    return {
+        "ingest_chunks": corpus.size(),
+        "ingest_s": elapsed,
+        "ingest_chunks_per_sec": corpus.size() / elapsed if elapsed > 0 else None,
+    }
+
+
+def build_corpus(chunks, dim: int) -> Tuple[Corpus, dict]:
+    """Build index and BM25 for every chunk directly from fake vectors, timing each part."""
+    vectors = np.stack([fake_bedrock.fake_embedding(text, dim) for text in chunks])
+    metadatas = [{"page_id": f"p{i}", "title": f"page {i}", "chunk_index": 0} for i in range(len(chunks))]
+    rss_before = rss_mb()
+
+    started = time.perf_counter()
+    index = FaissIndex(dim)
+    index.add(vectors, metadatas, list(range(len(chunks))))
+    index_build = time.perf_counter() - started
+    del vectors
+
+    started = time.perf_counter()
+    corpus = Corpus.from_parts(index, list(chunks), metadatas, {})
+    lexical_build = time.perf_counter() - started
+
+    writer = faiss.VectorIOWriter()
+    faiss.write_index(index.index, writer)
+    return corpus, {
+        "index_build_s": index_build,
+        "lexical_build_s": lexical_build,
+        "rss_mb": rss_mb() - rss_before,
+        "index_mb": writer.data.size() / 1e6,
+    }
+
+
+def make_questions(chunks, n: int, seed: int):
+    """(question, target row): a handful of the target chunk's own words."""
+    rng = np.random.default_rng(seed)
+    questions = []
+    for row in rng.choice(len(chunks), size=min(n, len(chunks)), replace=False):
+        words = chunks[row].split()
+        picked = rng.choice(words, size=min(6, len(words)), replace=False)
+        questions.append(("what about " + " ".join(picked), int(row)))
+    return questions
+
+
+def measure_recall(corpus: Corpus, questions, dim: int, k: int) -> dict:
+    hybrid = lexical = vector = 0
+    for question, row in questions:
+        hits, _ = retrieve(question, corpus, top_k=k)
+        hybrid += row in [r for r, _ in hits]
+        lexical += row in [r for r, _ in corpus.lexical_search(question, k)]
+        vector += row in [r for r, _ in corpus.vector_search(fake_bedrock.fake_embedding(question, dim), k)]
+    n = float(len(questions))
+    return {"recall_hybrid": hybrid / n, "recall_lexical": lexical / n, "recall_vector": vector / n}
+
+
+def measure_ask(corpus: Corpus, questions) -> dict:
+    """Per-stage latency of the real /ask path (_answer_question) over the fake client."""
+    main.CORPUS = ShardedCorpus({"bench": corpus})
+    stages = {stage: [] for stage in STAGES}
+    end_to_end = []
+    for question, _ in questions:
+        started = time.perf_counter()
+        result = main._answer_question(question, bypass_cache=True)
+        end_to_end.append((time.perf_counter() - started) * 1000.0)
+        for stage, value in result.get("timings", {}).items():
+            if stage in stages:
+                stages[stage].append(value)
+    latency = {stage: percentiles(values) for stage, values in stages.items() if values}
+    latency["end_to_end_ms"] = percentiles(end_to_end)
+    return latency
+
+
+def run_size(n: int, args, fake) -> dict:
+    print(f"[SUITE] {n} chunks", file=sys.stderr)
+    chunks = synthetic_chunks(n, seed=args.seed)
+    result = {"chunks": n}
+    result.update(measure_ingest(chunks[: min(n, args.ingest_sample)], fake, args.embed_latency))
+
+    corpus, build = build_corpus(chunks, args.dim)
+    result.update(build)
+
+    questions = make_questions(chunks, args.queries, args.seed + 1)
+    result.update(measure_recall(corpus, questions, args.dim, args.k))
+
+    fake.embed_latency = args.embed_latency
+    result["latency"] = measure_ask(corpus, questions)
+    fake.embed_latency = 0.0
+    return result
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def _flatten(result: dict) -> dict:
+    flat = {k: v for k, v in result.items() if k in HIGHER_IS_BETTER}
+    for stage, pcts in result.get("latency", {}).items():
+        for p, value in pcts.items():
+            flat[f"{stage}.{p}"] = value
+    return flat
+
+
+def compare(baseline: dict, current: dict, tolerance: float, min_ms: float) -> int:
+    """
+    Print relative changes per metric; return the number of regressions
+    beyond tolerance. Latency changes smaller than `min_ms` are noise.
+    """
+    regressions = 0
+    base_by_size = {r["chunks"]: r for r in baseline["results"]}
+    for result in current["results"]:
+        base = base_by_size.get(result["chunks"])
+        if base is None:
+            continue
+        print(f"\n{result['chunks']} chunks (baseline {baseline['meta']['commit']} -> {current['meta']['commit']})")
+        old, new = _flatten(base), _flatten(result)
+        for metric in sorted(set(old) & set(new)):
+            if not old[metric]:
+                continue
+            change = (new[metric] - old[metric]) / abs(old[metric])
+            # Latencies and sizes: lower is better.
+            worse = -change if HIGHER_IS_BETTER.get(metric, False) else change
+            noise = metric.split(".")[0].endswith("_ms") and abs(new[metric] - old[metric]) < min_ms
+            flag = "REGRESSION" if worse > tolerance and not noise else ""
+            regressions += bool(flag)
+            print(f"  {metric:28s} {old[metric]:12.3f} -> {new[metric]:12.3f} ({change:+7.1%}) {flag}")
+    return regressions
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=TOP_K)
+    parser.add_argument("--ingest-sample", type=int, default=5000, help="chunks pushed through the full ingest pipeline")
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="fake Bedrock latency per embedding (s)")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="fake Claude latency per call (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the results to this file as JSON")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="relative change counted as a regression")
+    parser.add_argument("--min-ms", type=float, default=1.0, help="ignore latency changes smaller than this")
+    args = parser.parse_args()
+
+    fake = fake_bedrock.install(fake_bedrock.FakeBedrockClient(dim=args.dim, llm_latency=args.llm_latency))
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "faiss": faiss.__version__,
+            "cpus": os.cpu_count(),
+            "args": vars(args),
+        },
+        "results": [run_size(n, args, fake) for n in args.sizes],
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(baseline, report, args.tolerance, args.min_ms):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,27 @@
+"""
+Shared test setup. Settings are read from the environment when app modules
+are imported, so caches, rate limits and the index directory are set here
+first. Bedrock is replaced by the deterministic client the benchmarks use.
+
+Run from backend/:
+
+    python -m pytest -q
+"""
+import os
+import tempfile
+
+os.environ.setdefault("EMBED_CACHE_ENABLED", "false")
+os.environ.setdefault("ANSWER_CACHE_ENABLED", "false")
+os.environ.setdefault("EMBED_RATE_LIMIT", "0")
+os.environ.setdefault("INDEX_DIR", tempfile.mkdtemp(prefix="rag-test-index-"))
+os.environ.setdefault("INDEX_POLL_SECONDS", "0")
+
+import pytest  # noqa: E402
+
+from benchmarks import fake_bedrock  # noqa: E402
+
+
+@pytest.fixture
+def bedrock():
+    """Fake bedrock-runtime client (embeddings and Claude), counting its calls."""
+    return fake_bedrock.install(fake_bedrock.FakeBedrockClient(dim=64))
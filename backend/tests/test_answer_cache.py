@@ -0,0 +1,112 @@
+import pytest
+
+from app import answer_cache
+from app.answer_cache import AnswerCache, normalize_question
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(answer_cache, "time", clock)
+    return clock
+
+
+def cache(**kwargs) -> AnswerCache:
+    settings = {"max_entries": 10, "ttl": 60.0, "similarity": 0.9}
+    settings.update(kwargs)
+    return AnswerCache(**settings)
+
+
+def test_normalize_question_ignores_case_spacing_and_punctuation():
+    assert normalize_question("  How do I get  VPN access?! ") == "how do i get vpn access"
+
+
+def test_exact_hit_on_normalized_question(clock):
+    answers = cache()
+    answers.put("How do I get VPN?", None, "Use the IT Service Hub.", version=1)
+
+    assert answers.get_exact("how do i get vpn", version=1) == "Use the IT Service Hub."
+    assert answers.get_exact("how do i get a laptop", version=1) is None
+    assert answers.stats()["exact_hits"] == 1
+
+
+def test_semantic_hit_needs_the_similarity_threshold(clock):
+    answers = cache()
+    answers.put("How do I get VPN?", [1.0, 0.0], "Use the IT Service Hub.", version=1)
+
+    assert answers.get_similar([0.99, 0.05], version=1) == "Use the IT Service Hub."
+    assert answers.get_similar([0.5, 0.5], version=1) is None
+    assert (answers.semantic_hits, answers.misses) == (1, 1)
+
+
+def test_answers_are_scoped_to_the_namespaces_they_came_from(clock):
+    answers = cache()
+    answers.put("VPN?", [1.0, 0.0], "From Confluence", version=1, scope="confluence:ENG")
+
+    assert answers.get_exact("VPN?", version=1) is None
+    assert answers.get_similar([1.0, 0.0], version=1, scope="pdf") is None
+    assert answers.get_exact("VPN?", version=1, scope="confluence:ENG") == "From Confluence"
+
+
+def test_least_recently_used_entries_are_evicted(clock):
+    answers = cache(max_entries=2)
+    answers.put("a", None, "A", version=1)
+    answers.put("b", None, "B", version=1)
+    answers.get_exact("a", version=1)
+    answers.put("c", None, "C", version=1)
+
+    assert answers.get_exact("b", version=1) is None
+    assert answers.get_exact("a", version=1) == "A"
+    assert answers.evictions == 1
+
+
+def test_entries_expire_after_ttl(clock):
+    answers = cache(ttl=60.0)
+    answers.put("VPN?", [1.0, 0.0], "Old answer", version=1)
+    clock.now += 61
+
+    assert answers.get_exact("VPN?", version=1) is None
+    assert answers.get_similar([1.0, 0.0], version=1) is None
+
+
+def test_expired_best_match_does_not_hide_a_live_one(clock):
+    answers = cache(similarity=0.9)
+    answers.put("VPN access?", [1.0, 0.0], "Stale", version=1)
+    answers.get_similar([1.0, 0.0], version=1)  # builds the matrix
+    clock.now += 50
+    answers.put("VPN access please", [0.95, 0.31], "Fresh", version=1)
+    answers.get_similar([1.0, 0.0], version=1)
+    clock.now += 20
+
+    assert answers.get_similar([1.0, 0.0], version=1) == "Fresh"
+
+
+def test_newer_corpus_version_drops_every_answer(clock):
+    answers = cache()
+    answers.put("VPN?", [1.0, 0.0], "Old corpus", version=1)
+
+    assert answers.get_exact("VPN?", version=2) is None
+    assert answers.get_similar([1.0, 0.0], version=2) is None
+    assert answers.stats()["entries"] == 0
+    assert answers.invalidations == 1
+
+
+def test_requests_on_an_older_version_leave_the_cache_alone(clock):
+    answers = cache()
+    answers.put("VPN?", [1.0, 0.0], "New corpus", version=2)
+
+    # A request that started before the hot swap finishes on version 1.
+    assert answers.get_exact("VPN?", version=1) is None
+    assert answers.get_similar([1.0, 0.0], version=1) is None
+    answers.put("VPN?", [1.0, 0.0], "Old corpus", version=1)
+
+    assert answers.get_exact("VPN?", version=2) == "New corpus"
+    assert answers.invalidations == 0
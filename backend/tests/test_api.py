@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+
+from app import main
+from app.shards import ShardedCorpus
+from benchmarks import fake_bedrock
+
+PAGES = [
+    {"id": "vpn", "title": "VPN", "text": "Request VPN access in the IT Service Hub portal", "version": 1},
+    {"id": "laptop", "title": "Laptop", "text": "Collect your laptop from the third floor desk", "version": 1},
+]
+
+
+@pytest.fixture
+def serving(monkeypatch):
+    """A small corpus installed as the one being served, as after startup."""
+    client = fake_bedrock.install(fake_bedrock.FakeBedrockClient(dim=64, llm_tokens=5))
+    corpus = ShardedCorpus()
+    corpus.shard(main.PDF_SOURCE).sync_pages(PAGES, source=main.PDF_SOURCE)
+    monkeypatch.setattr(main, "CORPUS", corpus)
+    main.READY.set()
+    yield client
+    main.READY.clear()
+
+
+def request(*calls):
+    """Send (method, path, json) requests to the app concurrently; returns (response, seconds) pairs."""
+
+    async def timed(client, method, path, body):
+        started = time.perf_counter()
+        response = await client.request(method, path, json=body)
+        return response, time.perf_counter() - started
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(timed(client, *call) for call in calls))
+
+    return asyncio.run(run())
+
+
+def test_ask_answers_with_server_timing(serving):
+    [(response, _)] = request(("POST", "/ask", {"question": "How do I get VPN access?"}))
+
+    assert response.status_code == 200
+    assert response.json()["answer"].startswith("token0")
+    stages = [part.split(";")[0] for part in response.headers["Server-Timing"].split(", ")]
+    assert {"embed", "vector", "lexical", "context", "generate"} <= set(stages)
+
+
+def test_slow_answer_does_not_block_other_requests(serving):
+    serving.llm_latency = 0.5
+
+    (ask, ask_seconds), (health, health_seconds) = request(
+        ("POST", "/ask", {"question": "How do I get VPN access?", "bypass_cache": True}),
+        ("GET", "/healthz", None),
+    )
+
+    assert ask.status_code == health.status_code == 200
+    assert ask_seconds >= 0.5
+    assert health_seconds < 0.25
+
+
+def test_ask_is_unavailable_until_an_index_is_loaded(serving):
+    main.READY.clear()
+
+    [(response, _)] = request(("POST", "/ask", {"question": "VPN?"}))
+
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
+
+
+def test_ingest_returns_at_once_and_runs_as_a_job(serving, monkeypatch):
+    release = threading.Event()
+
+    def slow_ingest(space_key):
+        release.wait(5)
+        return {"namespace": f"confluence:{space_key}", "updated": 3}
+
+    monkeypatch.setattr(main, "_run_confluence_ingest", slow_ingest)
+
+    [(accepted, seconds)] = request(("POST", "/ingest", {"space_key": "ENG"}))
+    assert accepted.status_code == 202 and seconds < 0.5
+    job_id = accepted.json()["job_id"]
+
+    release.set()
+    deadline = time.monotonic() + 5
+    while True:
+        [(status, _)] = request(("GET", f"/ingest/{job_id}", None))
+        if status.json()["status"] == "succeeded" or time.monotonic() > deadline:
+            break
+        time.sleep(0.01)
+
+    assert status.json()["result"] == {"namespace": "confluence:ENG", "updated": 3}
+    [(missing, _)] = request(("GET", "/ingest/" + "0" * 32, None))
+    assert missing.status_code == 404
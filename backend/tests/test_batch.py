@@ -0,0 +1,105 @@
+import json
+import sys
+
+import pytest
+
+from app import batch
+from app.batch import _read_questions, answer_questions
+from app.llm import NO_CONTEXT_ANSWER
+from app.shards import ShardedCorpus
+
+PAGES = [
+    {"id": "vpn", "title": "VPN", "text": "Request VPN access in the IT Service Hub portal", "version": 1},
+    {"id": "laptop", "title": "Laptop", "text": "Collect your laptop from the third floor desk", "version": 1},
+]
+
+
+@pytest.fixture
+def corpus(bedrock) -> ShardedCorpus:
+    corpus = ShardedCorpus()
+    corpus.shard("pdf").sync_pages(PAGES, source="pdf")
+    return corpus
+
+
+def test_question_lines_are_read_in_every_supported_form():
+    lines = [
+        '{"id": "q1", "question": "How do I get VPN access?"}\n',
+        "\n",
+        '{"request_id": "q2", "title": "Where is my laptop?"}\n',
+        '{"body": "Who approves expenses?"}\n',
+        '"Where do I park?"\n',
+        "How do I book a desk?\n",
+        '{"id": "q7", "answer": "no question here"}\n',
+    ]
+
+    assert _read_questions(lines) == [
+        {"id": "q1", "question": "How do I get VPN access?"},
+        {"id": "q2", "question": "Where is my laptop?"},
+        {"id": None, "question": "Who approves expenses?"},
+        {"id": None, "question": "Where do I park?"},
+        {"id": None, "question": "How do I book a desk?"},
+    ]
+
+
+def test_json_lines_that_are_not_questions_become_error_rows():
+    items = _read_questions(['{"question": "VPN?"}', "42", '["VPN?"]', "null"])
+
+    assert items[0] == {"id": None, "question": "VPN?"}
+    assert [(item["line"], item["error"]) for item in items[1:]] == [
+        (2, "expected a JSON object or string, got int"),
+        (3, "expected a JSON object or string, got list"),
+        (4, "expected a JSON object or string, got NoneType"),
+    ]
+
+
+def test_repeated_questions_are_answered_once(corpus, bedrock):
+    questions = ["How do I get VPN access?", "where is my laptop", "how do i get  VPN access"]
+
+    results = sorted(answer_questions(questions, corpus.select(), bypass_cache=True), key=lambda r: r["index"])
+
+    assert [r["question"] for r in results] == questions
+    assert results[0]["answer"] == results[2]["answer"]
+    assert bedrock.llm_calls == 2
+
+
+def test_question_without_context_gets_the_no_context_answer(corpus, bedrock, monkeypatch):
+    monkeypatch.setattr(batch, "assemble_context", lambda hits, corpus: ([], {}))
+
+    [result] = answer_questions(["Who approves expenses?"], corpus.select(), bypass_cache=True)
+
+    assert result["answer"] == NO_CONTEXT_ANSWER and result["no_context"] is True
+    assert bedrock.llm_calls == 0
+
+
+def test_failed_answer_becomes_an_error_row_for_that_question_only(corpus, monkeypatch):
+    def generate(question, passages):
+        if "laptop" in question:
+            raise RuntimeError("model overloaded")
+        return "Use the portal."
+
+    monkeypatch.setattr(batch, "generate_answer", generate)
+
+    results = {
+        r["index"]: r
+        for r in answer_questions(["How do I get VPN access?", "Where is my laptop?"], corpus.select(), bypass_cache=True)
+    }
+
+    assert results[0]["answer"] == "Use the portal." and "error" not in results[0]
+    assert results[1]["answer"] is None and results[1]["error"] == "RuntimeError: model overloaded"
+
+
+def test_cli_writes_rejected_lines_and_answers_with_their_ids(corpus, tmp_path, monkeypatch):
+    questions = tmp_path / "questions.jsonl"
+    questions.write_text('{"id": "vpn", "question": "How do I get VPN access?"}\n[1, 2]\nWhere is my laptop?\n')
+    output = tmp_path / "answers.jsonl"
+    monkeypatch.setattr(batch, "_load_corpus", lambda: corpus)
+    monkeypatch.setattr(sys, "argv", ["batch", str(questions), "-o", str(output), "--bypass-cache"])
+
+    batch.main()
+
+    rows = [json.loads(line) for line in output.read_text().splitlines()]
+    assert rows[0] == {"line": 2, "error": "expected a JSON object or string, got list"}
+    assert {row["question"]: row["id"] for row in rows[1:]} == {
+        "How do I get VPN access?": "vpn", "Where is my laptop?": None,
+    }
+    assert all(row["answer"] for row in rows[1:])
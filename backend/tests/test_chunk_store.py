@@ -0,0 +1,87 @@
+import pytest
+
+from app.chunk_store import ChunkStore
+
+
+def meta(page_id: str, position: int, title: str = "") -> dict:
+    return {"page_id": page_id, "title": title or f"Title {page_id}", "chunk_index": position}
+
+
+def filled_store() -> ChunkStore:
+    store = ChunkStore()
+    store.append(["alpha one", "alpha two"], [meta("a", 0), meta("a", 1)])
+    store.append(["béta — ünïcode ✓"], [meta("b", 0, title="Bêta")])
+    store.append(["gamma"], [meta("c", 3)])
+    return store
+
+
+def test_append_assigns_rows_and_keeps_metadata():
+    store = ChunkStore()
+    assert store.append(["x", "y"], [meta("p", 0), meta("p", 1)]) == [0, 1]
+    assert store.append(["z"], [meta("q", 0)]) == [2]
+
+    assert store.text(1) == "y"
+    assert store.meta(2) == {"page_id": "q", "title": "Title q", "chunk_index": 0}
+    assert store.page_rows("p") == [0, 1]
+    assert store.live_count() == 3
+
+
+def test_remove_page_keeps_row_ids_stable():
+    store = filled_store()
+
+    assert store.remove_page("a") == [0, 1]
+
+    assert len(store) == 4
+    assert store.live_rows().tolist() == [2, 3]
+    assert store.removed_rows().tolist() == [0, 1]
+    assert store.text(0) is None and store.meta(0) is None
+    assert list(store.texts([0, 1, 3])) == ["gamma"]
+    assert store.page_rows("a") == []
+    assert store.append(["alpha again"], [meta("a", 0)]) == [4]
+    assert store.page_rows("a") == [4]
+
+
+@pytest.mark.parametrize("mmap_files", [True, False])
+def test_save_load_round_trip(tmp_path, mmap_files):
+    store = filled_store()
+    store.remove_page("c")
+    store.save(tmp_path)
+
+    loaded = ChunkStore.load(tmp_path, mmap_files=mmap_files)
+
+    assert len(loaded) == len(store)
+    assert loaded.live_rows().tolist() == store.live_rows().tolist()
+    for row in range(len(store)):
+        assert loaded.text(row) == store.text(row)
+        assert loaded.meta(row) == store.meta(row)
+    assert loaded.page_rows("a") == [0, 1]
+    assert loaded.page_rows("c") == []
+
+
+def test_loaded_store_copies_before_writing(tmp_path):
+    filled_store().save(tmp_path)
+    loaded = ChunkStore.load(tmp_path, mmap_files=True)
+
+    loaded.remove_page("a")
+    loaded.append(["delta"], [meta("d", 0)])
+
+    assert loaded.text(4) == "delta"
+    again = ChunkStore.load(tmp_path, mmap_files=True)
+    assert len(again) == 4
+    assert again.page_rows("a") == [0, 1]
+
+
+def test_copy_is_independent(tmp_path):
+    filled_store().save(tmp_path)
+    for original in (filled_store(), ChunkStore.load(tmp_path, mmap_files=True)):
+        copy = original.copy()
+
+        copy.remove_page("a")
+        copy.append(["delta"], [meta("d", 0)])
+        original.append(["epsilon"], [meta("e", 0)])
+
+        assert original.page_rows("a") == [0, 1]
+        assert original.text(4) == "epsilon"
+        assert copy.text(4) == "delta"
+        assert copy.page_rows("e") == []
+        assert copy.page_rows("a") == []
@@ -0,0 +1,78 @@
+from app.chunking import ChunkDeduper, chunk_signature, chunk_text, count_tokens, dedupe_chunks
+from app.corpus import Corpus
+from app.ingest import build_corpus_and_embeddings
+
+BOILERPLATE = (
+    "Support\n"
+    "This document is for Informa employees only. Questions about access, hardware, "
+    "software licences or accounts go to the IT Service Hub, which is staffed during "
+    "office hours in every region. Urgent security issues such as a lost laptop or a "
+    "suspected phishing email must be reported straight away by phone, and never by "
+    "replying to the message itself. Keep this guide up to date by raising a request "
+    "with the onboarding team whenever a step no longer matches what you see."
+)
+
+
+def page(page_id: str, body: str, footer: str = BOILERPLATE) -> dict:
+    return {"id": page_id, "title": page_id, "text": f"{body}\n\n{footer}", "version": 1}
+
+
+def test_chunks_stay_within_budget_and_repeat_their_heading():
+    text = "VPN access\n" + " ".join(f"Step {i} of the VPN guide is done." for i in range(80))
+
+    chunks = chunk_text(text, max_tokens=60)
+
+    assert len(chunks) > 1
+    assert all(c.startswith("VPN access\n") for c in chunks)
+    # Pieces are budgeted one by one; the separators joining them may add a token.
+    assert all(count_tokens(c) <= 62 for c in chunks)
+
+
+def test_signature_ignores_numbers_dates_and_punctuation():
+    assert chunk_signature("Informa | Page 3 of 12 (2024-01-05)") == "informa page of"
+
+
+def test_dedupe_keeps_positions_of_the_chunks_it_keeps():
+    chunks = ["Intro to VPN", "Page 1 of 3", "Set up the client", "Page 2 of 3", "---"]
+
+    assert dedupe_chunks(chunks) == [(0, "Intro to VPN"), (1, "Page 1 of 3"), (2, "Set up the client")]
+
+
+def test_near_duplicates_are_dropped_but_different_text_is_kept():
+    deduper = ChunkDeduper(threshold=0.8)
+    edited = BOILERPLATE.replace("every region", "each region")
+    different = BOILERPLATE.replace("Support", "Hardware").replace("IT Service Hub", "facilities desk")
+    rewritten = "Support\nRaise laptop and monitor requests in the facilities portal."
+
+    assert not deduper.is_duplicate(BOILERPLATE)
+    assert deduper.is_duplicate(edited)
+    assert not deduper.is_duplicate(rewritten)
+    # Several edits push the shared shingles below the threshold.
+    assert not deduper.is_duplicate(different.replace("phone", "the hotline").replace("office", "business"))
+
+
+def test_boilerplate_is_embedded_once_per_batch(bedrock):
+    pages = [
+        page("vpn", "VPN\nRequest VPN access in the IT Service Hub."),
+        page("laptop", "Laptop\nCollect your laptop from the third floor."),
+        page("expenses", "Expenses\nSubmit receipts in Concur.", BOILERPLATE.replace("every", "each")),
+    ]
+
+    chunks, metadatas, vectors = build_corpus_and_embeddings(pages)
+
+    assert sum("IT Service Hub, which" in c for c in chunks) == 1
+    assert len(chunks) == len(metadatas) == len(vectors) == 4
+    assert [(m["page_id"], m["chunk_index"]) for m in metadatas] == [
+        ("vpn", 0), ("vpn", 1), ("laptop", 0), ("expenses", 0),
+    ]
+
+
+def test_sync_dedupes_across_its_batches(bedrock):
+    corpus = Corpus()
+    pages = [page(f"p{i}", f"Step {'abcdef'[i]}\nDo the {'abcdef'[i]} thing first.") for i in range(6)]
+
+    corpus.sync_pages(pages, source="pdf", batch_pages=2)
+
+    assert corpus.size() == 7
+    hits = corpus.lexical_search("phishing", 10)
+    assert [row for row, _ in hits] == corpus.store.page_rows("p0")[1:]
@@ -0,0 +1,104 @@
+import pytest
+
+from app.confluence import ConfluenceCrawler, _html_to_text
+from app.corpus import Corpus
+from benchmarks.confluence_crawl import StubConfluence
+
+SOURCE = "confluence:ENG"
+
+
+class FlakyConfluence(StubConfluence):
+    """Answers the first `failures` requests with 503 Service Unavailable."""
+
+    def __init__(self, n_pages: int, failures: int):
+        super().__init__(n_pages, latency=0)
+        self.failures = failures
+
+    def handler(self):
+        stub = self
+
+        class Handler(super().handler()):
+            def do_GET(self):
+                with stub._lock:
+                    fail = stub.failures > 0
+                    stub.failures -= fail
+                if fail:
+                    self.send_error(503)
+                    return
+                super().do_GET()
+
+        return Handler
+
+
+@pytest.fixture
+def stub():
+    return StubConfluence(7, latency=0)
+
+
+def test_html_keeps_block_structure_as_line_breaks():
+    html = (
+        "<h2>VPN</h2><p>Request access in the <b>IT Service Hub</b>.</p>"
+        "<ul><li>Install the client</li><li>Sign in</li></ul><script>track()</script>"
+    )
+
+    text = _html_to_text(html)
+
+    assert [line for line in text.splitlines() if line] == [
+        "VPN", "Request access in the IT Service Hub.", "- Install the client", "- Sign in",
+    ]
+    assert "track" not in text
+
+
+def test_listing_follows_pages_of_results(stub):
+    crawler = ConfluenceCrawler(base_url=stub.serve(), workers=2, page_size=3)
+
+    summaries = list(crawler.list_pages("ENG"))
+
+    assert [s["id"] for s in summaries] == [str(i) for i in range(7)]
+    assert summaries[0]["version"] == 1 and summaries[0]["last_modified"]
+    assert stub.requests == {"list": 3, "page": 0}
+
+
+def test_listing_stops_at_max_pages(stub):
+    crawler = ConfluenceCrawler(base_url=stub.serve(), workers=2, page_size=3)
+
+    assert len(list(crawler.list_pages("ENG", max_pages=4))) == 4
+    assert stub.requests["list"] == 2
+
+
+def test_crawl_fetches_every_body(stub):
+    crawler = ConfluenceCrawler(base_url=stub.serve(), workers=4, page_size=3)
+
+    pages = {p["id"]: p for p in crawler.crawl("ENG")}
+
+    assert sorted(pages, key=int) == [str(i) for i in range(7)]
+    assert pages["3"]["text"] == "Page 3 explains onboarding step 3 and how to request access."
+    assert stub.requests["page"] == 7
+    assert (crawler.stats["listed"], crawler.stats["fetched"], crawler.stats["skipped"]) == (7, 7, 0)
+
+
+def test_recrawl_only_fetches_changed_pages(stub, bedrock):
+    base_url = stub.serve()
+    corpus = Corpus()
+    corpus.sync_pages(ConfluenceCrawler(base_url=base_url, workers=4).crawl("ENG"), source=SOURCE)
+    stub.edit("2")
+    stub.requests["page"] = 0
+
+    crawler = ConfluenceCrawler(base_url=base_url, workers=4)
+    pages = list(crawler.crawl("ENG", known=corpus.page_fingerprints(SOURCE)))
+
+    assert stub.requests["page"] == 1
+    assert [p["id"] for p in pages if "text" in p] == ["2"]
+    assert len(pages) == 7 and crawler.stats["skipped"] == 6
+    stats = corpus.sync_pages(pages, source=SOURCE)
+    assert (stats["updated"], stats["unchanged"]) == (1, 6)
+
+
+def test_server_errors_are_retried():
+    stub = FlakyConfluence(3, failures=2)
+    crawler = ConfluenceCrawler(base_url=stub.serve(), workers=1)
+
+    pages = list(crawler.crawl("ENG"))
+
+    assert len(pages) == 3 and all(p["text"] for p in pages)
+    assert stub.failures == 0
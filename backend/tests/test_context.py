@@ -0,0 +1,105 @@
+from typing import Dict, List, Tuple
+
+from app.chunking import count_tokens
+from app.context import _join_neighbours, assemble_context, merge_adjacent
+
+
+class Rows:
+    """Just enough of a Corpus for assemble_context: rows by id."""
+
+    def __init__(self, rows: Dict[int, Tuple[str, str, int]]):
+        # row id -> (page id, chunk text, chunk index)
+        self.rows = rows
+
+    def get_rows(self, row_ids: List[int]):
+        return [
+            (row, self.rows[row][1], {"page_id": self.rows[row][0], "chunk_index": self.rows[row][2]})
+            for row in row_ids
+        ]
+
+
+def sentences(topic: str, n: int) -> str:
+    return " ".join(f"The {topic} guide covers step number {i} in some detail." for i in range(n))
+
+
+def test_neighbours_are_stitched_without_repeating_heading_or_overlap():
+    a = "VPN access\nInstall the client. Then sign in with your badge"
+    b = "VPN access\nsign in with your badge number. Approve the push."
+
+    assert _join_neighbours(a, b) == "VPN access\nInstall the client. Then sign in with your badge number. Approve the push."
+
+
+def test_only_consecutive_chunks_of_a_page_are_merged():
+    corpus = Rows({
+        10: ("vpn", "Step one.", 0),
+        11: ("vpn", "Step two.", 1),
+        13: ("vpn", "Step four.", 3),
+        20: ("laptop", "Collect it.", 0),
+    })
+    scores = {10: 0.2, 11: 0.9, 13: 0.5, 20: 0.4}
+
+    passages = merge_adjacent(corpus.get_rows([13, 20, 11, 10]), scores)
+
+    assert sorted(passages) == [(0.4, "Collect it."), (0.5, "Step four."), (0.9, "Step one.\nStep two.")]
+
+
+def test_passages_are_added_best_first_without_repeated_sentences():
+    shared = "Report a lost laptop to the service desk at once."
+    corpus = Rows({
+        1: ("vpn", f"Request VPN access in the portal. {shared}", 0),
+        2: ("laptop", f"Collect your laptop on the third floor. {shared}", 0),
+    })
+
+    passages, stats = assemble_context([(1, 0.3), (2, 0.8)], corpus, budget=500)
+
+    assert passages == [
+        f"Collect your laptop on the third floor. {shared}",
+        "Request VPN access in the portal.",
+    ]
+    assert stats["chunks"] == 2 and stats["passages"] == 2
+    assert stats["context_tokens"] < stats["raw_tokens"]
+
+
+def test_short_sentences_may_repeat():
+    corpus = Rows({1: ("a", "Done. Open the portal first.", 0), 2: ("b", "Done. Close the portal last.", 0)})
+
+    passages, _ = assemble_context([(1, 0.9), (2, 0.8)], corpus, budget=500)
+
+    assert all(p.startswith("Done.") for p in passages)
+
+
+def test_budget_is_filled_and_the_last_passage_cut_at_a_sentence():
+    corpus = Rows({1: ("vpn", sentences("VPN", 8), 0), 2: ("laptop", sentences("laptop", 40), 0)})
+    first = count_tokens(sentences("VPN", 8))
+    budget = first + 150
+
+    passages, stats = assemble_context([(1, 0.9), (2, 0.8)], corpus, budget=budget)
+
+    assert len(passages) == 2 and stats["context_tokens"] <= budget
+    assert passages[1].endswith("in some detail.")
+    assert sentences("laptop", 40).startswith(passages[1])
+    # Sentences are counted one by one, so the joined text may come in a little under.
+    assert stats["context_tokens"] > budget - 2 * count_tokens("The laptop guide covers step number 10 in some detail.")
+
+
+def test_small_leftover_budget_is_not_used_for_a_fragment():
+    corpus = Rows({1: ("vpn", sentences("VPN", 8), 0), 2: ("laptop", sentences("laptop", 40), 0)})
+    budget = count_tokens(sentences("VPN", 8)) + 30
+
+    passages, _ = assemble_context([(1, 0.9), (2, 0.8)], corpus, budget=budget)
+
+    assert passages == [sentences("VPN", 8)]
+
+
+def test_sentences_of_a_passage_left_out_are_kept_for_later_ones():
+    shared = "Report a lost laptop to the service desk at once."
+    corpus = Rows({
+        1: ("vpn", sentences("VPN", 8), 0),
+        2: ("long", sentences("long", 60) + " " + shared, 0),
+        3: ("laptop", f"Collect your laptop. {shared}", 0),
+    })
+    budget = count_tokens(sentences("VPN", 8)) + 40
+
+    passages, _ = assemble_context([(1, 0.9), (2, 0.8), (3, 0.7)], corpus, budget=budget)
+
+    assert passages[-1] == f"Collect your laptop. {shared}"
@@ -0,0 +1,118 @@
+from app.corpus import Corpus, page_fingerprint
+from app.embeddings import embed_query
+
+SOURCE = "confluence:ENG"
+
+
+def page(page_id: str, text: str, version: int = 1) -> dict:
+    return {"id": page_id, "title": f"Page {page_id}", "text": text, "version": version}
+
+
+def space(version: int = 1) -> list:
+    return [
+        page("vpn", "Request VPN access through the IT Service Hub portal", version),
+        page("laptop", "Laptop setup: install the client and sign in with SSO"),
+        page("expenses", "Expense reports are submitted in Concur every month"),
+    ]
+
+
+def rows_of(corpus: Corpus, page_id: str):
+    return corpus.store.page_rows(page_id)
+
+
+def test_first_sync_indexes_every_page(bedrock):
+    corpus = Corpus()
+
+    stats = corpus.sync_pages(space(), source=SOURCE)
+
+    assert stats == {"updated": 3, "removed": 0, "unchanged": 0, "chunks": corpus.size()}
+    assert corpus.size() == corpus.index.size() > 0
+    assert corpus.page_fingerprints(SOURCE) == {p["id"]: page_fingerprint(p) for p in space()}
+    assert corpus.lexical_search("concur", 1)[0][0] in rows_of(corpus, "expenses")
+
+
+def test_unchanged_pages_are_not_embedded_again(bedrock):
+    corpus = Corpus()
+    corpus.sync_pages(space(), source=SOURCE)
+    calls, version = bedrock.embed_calls, corpus.version
+
+    stats = corpus.sync_pages(space(), source=SOURCE)
+
+    assert stats["updated"] == 0 and stats["unchanged"] == 3
+    assert bedrock.embed_calls == calls
+    assert corpus.version == version
+
+
+def test_changed_page_replaces_its_chunks(bedrock):
+    corpus = Corpus()
+    corpus.sync_pages(space(), source=SOURCE)
+    old_rows = rows_of(corpus, "vpn")
+    size = corpus.size()
+
+    changed = space()
+    changed[0] = page("vpn", "VPN access is now requested in the Okta dashboard", version=2)
+    stats = corpus.sync_pages(changed, source=SOURCE)
+
+    assert stats["updated"] == 1 and stats["unchanged"] == 2
+    new_rows = rows_of(corpus, "vpn")
+    assert new_rows and not set(new_rows) & set(old_rows)
+    assert all(not corpus.store.is_live(r) for r in old_rows)
+    assert corpus.size() == corpus.index.size() == size - len(old_rows) + len(new_rows)
+    assert corpus.lexical_search("okta dashboard", 1)[0][0] in new_rows
+    assert corpus.lexical_search("service hub portal", 5) == []
+    vector_hits = corpus.vector_search(embed_query("VPN access Okta dashboard"), 10)
+    assert not {row for row, _ in vector_hits} & set(old_rows)
+
+
+def test_missing_pages_are_pruned_only_when_asked(bedrock):
+    corpus = Corpus()
+    corpus.sync_pages(space(), source=SOURCE)
+
+    kept = corpus.sync_pages(space()[:2], source=SOURCE, prune=False)
+    assert kept["removed"] == 0 and rows_of(corpus, "expenses")
+
+    pruned = corpus.sync_pages(space()[:2], source=SOURCE)
+    assert pruned["removed"] == 1
+    assert rows_of(corpus, "expenses") == []
+    assert "expenses" not in corpus.pages
+    assert corpus.lexical_search("concur", 3) == []
+
+
+def test_prune_leaves_other_sources_alone(bedrock):
+    corpus = Corpus()
+    corpus.sync_pages(space(), source=SOURCE)
+    corpus.sync_pages([page("pdf-1", "Benefits enrolment closes in March")], source="pdf")
+
+    corpus.sync_pages([], source="pdf")
+
+    assert set(corpus.pages) == {"vpn", "laptop", "expenses"}
+    assert corpus.sync_pages(space(), source=SOURCE)["unchanged"] == 3
+
+
+def test_pages_can_arrive_as_a_generator_in_batches(bedrock):
+    corpus = Corpus()
+    pages = [page(f"p{i}", f"Onboarding step {i}: collect badge number {i}") for i in range(7)]
+
+    stats = corpus.sync_pages(iter(pages), source=SOURCE, batch_pages=3)
+
+    assert stats["updated"] == 7
+    assert set(corpus.pages) == {p["id"] for p in pages}
+    assert corpus.size() == corpus.index.size()
+
+
+def test_sync_on_a_copy_leaves_the_original_untouched(bedrock):
+    served = Corpus()
+    served.sync_pages(space(), source=SOURCE)
+    size, version = served.size(), served.version
+    vpn_rows = rows_of(served, "vpn")
+
+    copy = served.copy()
+    changed = space(version=2)[:2]
+    changed[0]["text"] = "VPN access is now requested in the Okta dashboard"
+    copy.sync_pages(changed, source=SOURCE)
+
+    assert (served.size(), served.version) == (size, version)
+    assert rows_of(served, "vpn") == vpn_rows
+    assert served.lexical_search("okta", 3) == []
+    assert served.index.size() == size
+    assert copy.lexical_search("okta", 1) and "expenses" not in copy.pages
@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+
+from app import embedding_cache, embeddings
+from app.embedding_cache import EmbeddingCache, cache_key
+
+MODEL = "amazon.titan-embed-text-v2:0"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(embedding_cache, "time", clock)
+    return clock
+
+
+def vec(*values) -> np.ndarray:
+    return np.array(values, dtype="float32")
+
+
+def last_used(cache: EmbeddingCache, text: str) -> float:
+    (used,) = cache._conn.execute(
+        "SELECT last_used FROM embeddings WHERE key = ?", (cache_key(MODEL, text),)
+    ).fetchone()
+    return used
+
+
+def test_key_ignores_whitespace_but_not_model():
+    assert cache_key(MODEL, "  VPN\n access ") == cache_key(MODEL, "VPN access")
+    assert cache_key(MODEL, "VPN access") != cache_key("other-model", "VPN access")
+
+
+def test_get_many_returns_cached_vectors_in_input_order(tmp_path, clock):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"), max_entries=100)
+    cache.put_many(MODEL, ["vpn", "laptop"], [vec(1, 0), vec(0, 1)])
+
+    found = cache.get_many(MODEL, ["laptop", "expenses", "vpn", "laptop"])
+
+    assert found[1] is None
+    np.testing.assert_array_equal(found[0], vec(0, 1))
+    np.testing.assert_array_equal(found[2], vec(1, 0))
+    np.testing.assert_array_equal(found[3], vec(0, 1))
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_entries_survive_reopening(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite")
+    EmbeddingCache(path, max_entries=100).put_many(MODEL, ["vpn"], [vec(1, 2)])
+
+    reopened = EmbeddingCache(path, max_entries=100)
+
+    np.testing.assert_array_equal(reopened.get_many(MODEL, ["vpn"])[0], vec(1, 2))
+    assert reopened._count == 1
+
+
+def test_storing_an_existing_key_does_not_grow_the_count(tmp_path, clock):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"), max_entries=100)
+    cache.put_many(MODEL, ["vpn", "laptop"], [vec(1, 0), vec(0, 1)])
+    cache.put_many(MODEL, ["vpn"], [vec(1, 0)])
+
+    assert cache._count == cache.size() == 2
+
+
+def test_hits_are_touched_in_batches(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(embedding_cache, "_TOUCH_FLUSH_ENTRIES", 2)
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"), max_entries=100)
+    cache.put_many(MODEL, ["vpn", "laptop"], [vec(1, 0), vec(0, 1)])
+
+    clock.now = 1010.0
+    cache.get_many(MODEL, ["vpn"])
+    assert last_used(cache, "vpn") == 1000.0
+
+    clock.now = 1020.0
+    cache.get_many(MODEL, ["laptop"])
+    assert (last_used(cache, "vpn"), last_used(cache, "laptop")) == (1010.0, 1020.0)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"), max_entries=10)
+    texts = [f"text {i}" for i in range(10)]
+    for i, text in enumerate(texts):
+        clock.now = 1000.0 + i
+        cache.put_many(MODEL, [text], [vec(i, 0)])
+    # A hit on the oldest entry is still pending when the eviction runs.
+    clock.now = 2000.0
+    cache.get_many(MODEL, ["text 0"])
+
+    cache.put_many(MODEL, ["text 10"], [vec(10, 0)])
+
+    present = [v is not None for v in cache.get_many(MODEL, texts + ["text 10"])]
+    assert present == [True, False, False] + [True] * 8
+    assert cache.evictions == 2
+    assert cache._count == cache.size() == 9
+
+
+def test_embed_texts_only_embeds_uncached_texts_once(tmp_path, bedrock, monkeypatch):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"), max_entries=100)
+    monkeypatch.setattr(embeddings, "get_embedding_cache", lambda: cache)
+
+    first = embeddings.embed_texts(["vpn", "laptop", "vpn"])
+    calls = bedrock.embed_calls
+    second = embeddings.embed_texts(["laptop", "vpn", "expenses"])
+
+    assert calls == 2
+    assert bedrock.embed_calls == calls + 1
+    np.testing.assert_array_equal(second[0], first[1])
+    np.testing.assert_array_equal(second[1], first[0])
@@ -0,0 +1,250 @@
+import numpy as np
+import pytest
+
+from app import faiss_index, index_store
+from app.faiss_index import INDEX_TYPES, FaissIndex
+from app.index_store import load_corpus, save_corpus
+from app.shards import ShardedCorpus
+
+MANIFEST = {"format": index_store.ARTIFACT_FORMAT, "embed_model": "fake", "sources": {}}
+
+
+@pytest.fixture
+def index_settings(monkeypatch):
+    """Switch FAISS_INDEX_TYPE / FAISS_VECTOR_DTYPE the way the environment would."""
+
+    def use(index_type: str, vector_dtype: str = "float32", min_train_points: int = 64):
+        monkeypatch.setattr(faiss_index, "FAISS_INDEX_TYPE", index_type)
+        monkeypatch.setattr(faiss_index, "FAISS_VECTOR_DTYPE", vector_dtype)
+        monkeypatch.setattr(faiss_index, "FAISS_MIN_TRAIN_POINTS", min_train_points)
+        # Each PQ sub-quantizer trains its own 256-centroid codebook; keep it quick.
+        monkeypatch.setattr(faiss_index, "FAISS_PQ_M", 1)
+        monkeypatch.setattr(FaissIndex.__init__, "__defaults__", (index_type, vector_dtype))
+
+    return use
+
+
+def stored_vector(corpus, row: int) -> np.ndarray:
+    # A stored vector is its own nearest neighbour.
+    return corpus.index._vectors(np.array([row]))[0]
+
+
+def word(i: int) -> str:
+    # Page texts must differ in letters: digits alone make them duplicates.
+    return "".join(chr(ord("a") + int(d)) for d in str(i))
+
+
+def pages(n: int, version: int = 1):
+    return [
+        {
+            "id": f"p{i}",
+            "title": f"Page {i}",
+            "text": f"Onboarding step {word(i)}: ask the team {word(i % 7)} about badge {word(i)}",
+            "version": version,
+        }
+        for i in range(n)
+    ]
+
+
+@pytest.mark.parametrize(
+    "index_type, vector_dtype",
+    [(t, "float32") for t in INDEX_TYPES] + [("ivf", "int8"), ("hnsw", "int8")],
+)
+def test_loaded_index_can_be_forked_and_synced(tmp_path, bedrock, index_settings, index_type, vector_dtype):
+    # ivfpq trains 256 centroids per sub-quantizer, so build past that.
+    index_settings(index_type, vector_dtype, min_train_points=300)
+    built = ShardedCorpus()
+    built.shard("pdf").sync_pages(pages(320), source="pdf")
+    assert built.shard("pdf").index.index_type == index_type
+    save_corpus(MANIFEST, built, str(tmp_path))
+    serving, _ = load_corpus(MANIFEST, str(tmp_path))
+    served = serving.shards["pdf"]
+    size = served.size()
+
+    fork = serving.fork("pdf")
+    changed = pages(320)[:-1]
+    changed[0] = dict(changed[0], text="Badges are now collected at reception", version=2)
+    stats = fork.shard("pdf").sync_pages(changed, source="pdf")
+
+    shard = fork.shard("pdf")
+    assert (stats["updated"], stats["removed"]) == (1, 1)
+    assert shard.size() == shard.index.size() == size - 1
+    new_rows = shard.store.page_rows("p0")
+    hits = shard.vector_search(stored_vector(shard, new_rows[0]), 5)
+    assert hits and hits[0][0] in new_rows
+    # The shard being served is unchanged.
+    assert served.size() == served.index.size() == size
+    assert "p319" in served.pages
+
+
+
+def random_vectors(n: int, dim: int = 32, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((n, dim)).astype("float32")
+
+
+def metas(n: int, start: int = 0):
+    return [{"page_id": f"p{(start + i) // 4}"} for i in range(n)]
+
+
+def self_matches(index: FaissIndex, vectors: np.ndarray) -> int:
+    """How many of vectors[i] come back with id i on top (lossy codecs miss a few)."""
+    hits = index.search_ids_batch(vectors, top_k=1)
+    return sum(row[0][0] == i for i, row in enumerate(hits))
+
+
+def base_index(index: FaissIndex):
+    return faiss_index.faiss.downcast_index(
+        index.index.index if hasattr(index.index, "id_map") else index.index
+    )
+
+
+def test_factory_strings():
+    assert faiss_index.factory_string("flat", 64, 0) == "Flat"
+    assert faiss_index.factory_string("hnsw", 64, 0, "float16").startswith("HNSW")
+    assert faiss_index.factory_string("ivf", 64, 40_000, "int8") == "IVF800,SQ8"
+    assert faiss_index.factory_string("sq8", 64, 0) == "SQ8"
+    with pytest.raises(ValueError):
+        FaissIndex(64, index_type="annoy")
+
+
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+def test_every_type_finds_each_vector_and_removes_pages(index_settings, index_type):
+    index_settings(index_type, min_train_points=300)
+    index = FaissIndex(32, index_type)
+    vectors = random_vectors(400)
+    index.add(vectors, metas(400))
+
+    assert self_matches(index, vectors[:20]) >= 18
+
+    removed = index.remove_page("p0")
+    assert removed == [0, 1, 2, 3]
+    assert index.size() == 396
+    assert all(hit not in removed for hit, _ in index.search_ids(vectors[0], top_k=10))
+
+
+@pytest.mark.parametrize("index_type", ["ivf", "ivfpq", "sq8"])
+def test_trained_types_start_flat_and_are_rebuilt_on_the_whole_corpus(index_settings, index_type):
+    index_settings(index_type, min_train_points=300)
+    index = FaissIndex(32, index_type)
+    vectors = random_vectors(400)
+    for start in range(0, 400, 32):
+        # Ingest batches are far smaller than what training needs.
+        index.add(vectors[start:start + 32], metas(len(vectors[start:start + 32]), start))
+        assert isinstance(base_index(index), faiss_index.faiss.IndexFlat)
+
+    assert index.rebuild_due()
+    rebuilt = index.rebuilt()
+
+    assert not isinstance(base_index(rebuilt), faiss_index.faiss.IndexFlat)
+    assert rebuilt._trained_size == 400 and not rebuilt.rebuild_due()
+    assert rebuilt.size() == 400 and rebuilt.metadatas == index.metadatas
+    assert self_matches(rebuilt, vectors[:20]) >= 18
+    # Training again only pays off once the corpus has doubled.
+    rebuilt.add(random_vectors(100, seed=1), metas(100, 400))
+    assert not rebuilt.rebuild_due()
+
+
+def test_adding_a_whole_corpus_at_once_trains_directly(index_settings):
+    index_settings("ivf", min_train_points=300)
+    index = FaissIndex(32, "ivf")
+
+    index.add(random_vectors(400))
+
+    assert faiss_index.faiss.try_extract_index_ivf(index.index) is not None
+    assert index._trained_size == 400 and not index.rebuild_due()
+
+
+def test_hnsw_tombstones_are_hidden_and_compacted(index_settings, monkeypatch):
+    index_settings("hnsw")
+    monkeypatch.setattr(faiss_index, "FAISS_COMPACT_RATIO", 0.2)
+    index = FaissIndex(32, "hnsw")
+    vectors = random_vectors(200)
+    index.add(vectors, metas(200))
+
+    # The removed pages cluster right next to the query.
+    query = vectors[:60].mean(axis=0)
+    removed = [row for p in range(10) for row in index.remove_page(f"p{p}")]
+    assert index._tombstones == set(removed) and not index.rebuild_due()
+
+    hits = index.search_ids(query, top_k=10)
+    assert len(hits) == 10 and not {row for row, _ in hits} & set(removed)
+
+    for p in range(10, 15):
+        index.remove_page(f"p{p}")
+    assert index.rebuild_due()
+    compacted = index.rebuilt()
+    assert compacted.index.ntotal == compacted.size() == 140
+    assert not compacted._tombstones
+
+
+def recall_at_10(index: FaissIndex, base: np.ndarray, queries: np.ndarray) -> float:
+    normed = base / np.linalg.norm(base, axis=1, keepdims=True)
+    q = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    truth = np.argsort(-q @ normed.T, axis=1)[:, :10]
+    hits = index.search_ids_batch(queries, top_k=10)
+    return float(np.mean([len({idx for idx, _ in row} & set(t)) / 10 for row, t in zip(hits, truth)]))
+
+
+def trained_int8(n: int = 2000) -> FaissIndex:
+    index = FaissIndex(32, "flat", "int8")
+    index.add(random_vectors(n), metas(n))
+    return index.rebuilt()
+
+
+def test_int8_rescoring_recovers_float_recall(index_settings, monkeypatch):
+    index_settings("flat", "int8", min_train_points=300)
+    queries = random_vectors(50, seed=1)
+    recall = {}
+    for factor in (0, 4):
+        monkeypatch.setattr(faiss_index, "FAISS_RESCORE_FACTOR", factor)
+        recall[factor] = recall_at_10(trained_int8(), random_vectors(2000), queries)
+
+    assert recall[4] >= 0.99 and recall[4] > recall[0]
+
+
+def test_rescored_scores_are_float16_inner_products(index_settings):
+    index_settings("flat", "int8", min_train_points=300)
+    index = trained_int8()
+    base = random_vectors(2000)
+    query = random_vectors(1, seed=1)[0]
+
+    hits = index.search_ids(query, top_k=5)
+
+    normed = base / np.linalg.norm(base, axis=1, keepdims=True)
+    q = query / np.linalg.norm(query)
+    for idx, score in hits:
+        assert score == pytest.approx(float(normed[idx] @ q), abs=2e-3)
+
+
+def test_int8_float16_copy_is_saved_and_memory_mapped(tmp_path, index_settings):
+    index_settings("flat", "int8", min_train_points=300)
+    index = trained_int8()
+    query = random_vectors(1, seed=1)[0]
+    path = str(tmp_path / "index.faiss")
+
+    index.save(path)
+    exact = np.load(str(tmp_path / "index_f16.npy"))
+    assert exact.shape == (2000, 32) and exact.dtype == np.float16
+
+    by_id = [index.metadatas[i] for i in range(2000)]
+    loaded = FaissIndex.load(path, metadatas=by_id, mmap=True)
+    assert loaded._rescore and isinstance(loaded._exact, np.memmap)
+    assert loaded.search_ids(query, top_k=10) == index.search_ids(query, top_k=10)
+
+    (tmp_path / "index_f16.npy").unlink()
+    assert not FaissIndex.load(path, metadatas=by_id)._rescore
+
+
+def test_float16_storage_needs_no_training_or_rescoring(tmp_path, index_settings):
+    index_settings("flat", "float16")
+    index = FaissIndex(32, "flat", "float16")
+    vectors = random_vectors(100)
+    index.add(vectors, metas(100))
+
+    base = base_index(index)
+    assert isinstance(base, faiss_index.faiss.IndexScalarQuantizer)
+    assert base.sq.qtype == faiss_index.faiss.ScalarQuantizer.QT_fp16
+    assert not index.rebuild_due()
+    assert self_matches(index, vectors[:20]) == 20
+    index.save(str(tmp_path / "index.faiss"))
+    assert not (tmp_path / "index_f16.npy").exists()
@@ -0,0 +1,168 @@
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from app import index_store
+from app.corpus import Corpus
+from app.index_store import current_version, load_corpus, save_corpus, writer_lock
+from app.shards import ShardedCorpus
+
+MANIFEST = {"format": index_store.ARTIFACT_FORMAT, "embed_model": "fake", "sources": {"a.pdf": "1"}}
+
+
+def word(i: int) -> str:
+    # Page texts must differ in letters: digits alone make them duplicates.
+    return "".join(chr(ord("a") + int(d)) for d in str(i))
+
+
+def pages(prefix: str, n: int, version: int = 1):
+    return [
+        {
+            "id": f"{prefix}-{i}",
+            "title": f"{prefix} page {i}",
+            "text": f"{prefix} onboarding step {word(i)}: request vpn access and laptop {word(i)}",
+            "version": version,
+        }
+        for i in range(n)
+    ]
+
+
+@pytest.fixture
+def sharded(bedrock):
+    corpus = ShardedCorpus()
+    corpus.shard("pdf").sync_pages(pages("pdf", 5), source="pdf")
+    corpus.shard("confluence:ENG").sync_pages(pages("eng", 4), source="confluence:ENG")
+    return corpus
+
+
+def test_publish_and_load_round_trip(tmp_path, sharded):
+    name = save_corpus(MANIFEST, sharded, str(tmp_path))
+
+    loaded, up_to_date = load_corpus(MANIFEST, str(tmp_path))
+
+    assert up_to_date and loaded.artifact == name == current_version(str(tmp_path))
+    assert loaded.namespaces() == ["confluence:ENG", "pdf"]
+    assert loaded.size() == sharded.size()
+    for ns in loaded.namespaces():
+        before, after = sharded.shards[ns], loaded.shards[ns]
+        assert after.pages == before.pages
+        assert after.lexical_search("vpn laptop", 3) == before.lexical_search("vpn laptop", 3)
+        assert after.index.size() == before.index.size()
+
+
+def test_load_checks_the_manifest(tmp_path, sharded):
+    save_corpus(MANIFEST, sharded, str(tmp_path))
+
+    changed_sources = dict(MANIFEST, sources={"a.pdf": "2"})
+    loaded, up_to_date = load_corpus(changed_sources, str(tmp_path))
+    assert loaded is not None and not up_to_date
+
+    other_model = dict(MANIFEST, embed_model="other")
+    assert load_corpus(other_model, str(tmp_path)) == (None, False)
+    assert load_corpus(MANIFEST, str(tmp_path / "empty")) == (None, False)
+
+
+def test_publish_rewrites_only_changed_shards(tmp_path, sharded):
+    save_corpus(MANIFEST, sharded, str(tmp_path))
+    before = dict(sharded.published)
+
+    sharded.shard("confluence:ENG").sync_pages(pages("eng", 5), source="confluence:ENG")
+    save_corpus(MANIFEST, sharded, str(tmp_path))
+
+    assert sharded.published["pdf"] == before["pdf"]
+    assert sharded.published["confluence:ENG"][0] != before["confluence:ENG"][0]
+
+
+def test_hot_swap_reuses_unchanged_shards(tmp_path, sharded):
+    save_corpus(MANIFEST, sharded, str(tmp_path))
+    serving, _ = load_corpus(MANIFEST, str(tmp_path))
+    old_eng = serving.shards["confluence:ENG"]
+
+    # Another worker publishes a new version of one namespace, built on a fork.
+    fork = serving.fork("confluence:ENG")
+    fork.shard("confluence:ENG").sync_pages(pages("eng", 6), source="confluence:ENG")
+    name = save_corpus(MANIFEST, fork, str(tmp_path))
+
+    swapped, _ = load_corpus(MANIFEST, str(tmp_path), previous=serving)
+
+    assert swapped.artifact == name
+    assert swapped.shards["pdf"] is serving.shards["pdf"]
+    assert swapped.shards["confluence:ENG"].size() == 6
+    # The corpus being served was never modified; in-flight queries finish on it.
+    assert old_eng.size() == 4 and serving.shards["confluence:ENG"] is old_eng
+
+
+def test_old_versions_are_pruned(tmp_path, sharded, monkeypatch):
+    monkeypatch.setattr(index_store, "INDEX_KEEP_VERSIONS", 2)
+    names = []
+    for n in range(4):
+        sharded.shard("pdf").sync_pages(pages("pdf", 5 + n), source="pdf")
+        names.append(save_corpus(MANIFEST, sharded, str(tmp_path)))
+
+    versions = sorted(p.name for p in (tmp_path / index_store.VERSIONS_DIR).iterdir())
+    assert versions == names[-2:]
+    pdf_dirs = list((tmp_path / index_store.SHARDS_DIR).glob("pdf-*/s*"))
+    assert len(pdf_dirs) == 2
+
+
+def test_writer_lock_is_exclusive(tmp_path):
+    order = []
+    held = threading.Event()
+
+    def first():
+        with writer_lock(str(tmp_path)):
+            held.set()
+            time.sleep(0.1)
+            order.append("first")
+
+    def second():
+        held.wait(5)
+        with writer_lock(str(tmp_path)):
+            order.append("second")
+
+    threads = [threading.Thread(target=first), threading.Thread(target=second)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+
+    assert order == ["first", "second"]
+
+
+def test_writer_lock_is_exclusive_across_processes(tmp_path):
+    holder = subprocess.Popen(
+        [
+            sys.executable, "-c",
+            "import sys, time\n"
+            "from app.index_store import writer_lock\n"
+            "with writer_lock(sys.argv[1]):\n"
+            "    print('locked', flush=True)\n"
+            "    time.sleep(0.5)\n",
+            str(tmp_path),
+        ],
+        cwd=Path(__file__).resolve().parents[1],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        assert holder.stdout.readline().strip() == "locked"
+        started = time.perf_counter()
+        with writer_lock(str(tmp_path)):
+            waited = time.perf_counter() - started
+    finally:
+        holder.wait(10)
+
+    assert waited > 0.2
+
+
+def test_from_store_without_saved_postings_rebuilds_them(bedrock):
+    corpus = Corpus()
+    corpus.sync_pages(pages("pdf", 3), source="pdf")
+
+    rebuilt = Corpus.from_store(corpus.index, corpus.store, corpus.pages)
+
+    assert rebuilt.lexical_search("vpn", 3) == corpus.lexical_search("vpn", 3)
@@ -0,0 +1,99 @@
+import threading
+
+from app.index_store import JOBS_DIR
+from app.jobs import JobQueue
+
+
+def drain(queue: JobQueue):
+    """Wait for every job submitted so far; jobs run one at a time, in order."""
+    queue._executor.submit(lambda: None).result(timeout=5)
+
+
+def test_job_runs_in_the_background_and_reports_its_result(tmp_path):
+    queue = JobQueue(str(tmp_path), history=10)
+    release = threading.Event()
+
+    job = queue.submit("confluence", lambda: release.wait(5) and {"updated": 3}, space_key="ENG")
+
+    assert job["status"] in ("queued", "running") and job["params"] == {"space_key": "ENG"}
+    assert queue.get(job["job_id"])["status"] in ("queued", "running")
+    release.set()
+    drain(queue)
+    done = queue.get(job["job_id"])
+    assert done["status"] == "succeeded" and done["result"] == {"updated": 3}
+    assert done["submitted_at"] <= done["started_at"] <= done["finished_at"]
+
+
+def test_failed_job_records_the_error(tmp_path):
+    queue = JobQueue(str(tmp_path), history=10)
+
+    def broken():
+        raise ValueError("space not found")
+
+    job = queue.submit("confluence", broken, space_key="NOPE")
+    drain(queue)
+
+    failed = queue.get(job["job_id"])
+    assert failed["status"] == "failed" and failed["error"] == "ValueError: space not found"
+    assert failed["result"] is None and failed["finished_at"] is not None
+
+
+def test_jobs_run_one_at_a_time_in_submission_order(tmp_path):
+    queue = JobQueue(str(tmp_path), history=10)
+    order, running = [], []
+
+    def job(n):
+        def run():
+            running.append(n)
+            order.append((n, len(running)))
+            running.remove(n)
+            return {"n": n}
+        return run
+
+    ids = [queue.submit("pdf", job(n))["job_id"] for n in range(5)]
+    drain(queue)
+
+    assert order == [(n, 1) for n in range(5)]
+    assert [job["job_id"] for job in queue.list()] == ids
+
+
+def test_status_is_shared_through_the_index_dir(tmp_path):
+    queue = JobQueue(str(tmp_path), history=10)
+    job = queue.submit("pdf", lambda: {"updated": 1})
+    drain(queue)
+
+    # As seen from another uvicorn worker.
+    other = JobQueue(str(tmp_path), history=10)
+
+    assert other.get(job["job_id"])["result"] == {"updated": 1}
+    assert (tmp_path / JOBS_DIR / f"{job['job_id']}.json").exists()
+
+
+def test_only_well_formed_known_ids_are_looked_up(tmp_path):
+    queue = JobQueue(str(tmp_path), history=10)
+    queue.submit("pdf", lambda: {})
+    drain(queue)
+
+    assert queue.get("0" * 32) is None
+    assert queue.get("../../manifest") is None
+    assert queue.get("A" * 32) is None
+
+
+def test_old_finished_jobs_are_trimmed_on_submit(tmp_path):
+    queue = JobQueue(str(tmp_path), history=2)
+    ids = []
+    for n in range(5):
+        ids.append(queue.submit("pdf", lambda: {})["job_id"])
+        drain(queue)
+
+    assert [job["job_id"] for job in queue.list()] == ids[2:]
+
+
+def test_unreadable_job_files_are_skipped(tmp_path):
+    queue = JobQueue(str(tmp_path), history=10)
+    job = queue.submit("pdf", lambda: {})
+    drain(queue)
+    (tmp_path / JOBS_DIR / f"{'f' * 32}.json").write_text("{not json")
+
+    assert [j["job_id"] for j in queue.list()] == [job["job_id"]]
+    assert queue.get("f" * 32) is None
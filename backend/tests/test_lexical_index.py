@@ -0,0 +1,108 @@
+import pytest
+
+from app.lexical_index import BM25Index, tokenize
+
+TEXTS = [
+    "Request VPN access through the IT Service Hub portal",
+    "Laptop setup: install the VPN client and sign in",
+    "Expense reports are submitted in Concur every month",
+    "Ask your manager to approve Jira and Confluence access",
+    "The VPN client needs a restart after password changes",
+]
+QUERIES = ["vpn access", "vpn client restart", "expense concur", "jira approve", "nothing matches"]
+
+
+def assert_same_results(got, expected):
+    assert [doc for doc, _ in got] == [doc for doc, _ in expected]
+    assert [score for _, score in got] == pytest.approx([score for _, score in expected])
+
+
+def test_tokenize_drops_short_words_and_stopwords():
+    assert tokenize("How do I get the VPN?") == ["vpn"]
+
+
+def test_search_ranks_docs_by_bm25():
+    index = BM25Index.from_texts(TEXTS)
+
+    hits = index.search("vpn restart", top_k=3)
+
+    assert hits[0][0] == 4
+    assert {doc for doc, _ in hits} <= {0, 1, 4}
+    assert [score for _, score in hits] == sorted((score for _, score in hits), reverse=True)
+    assert index.search("nothing matches") == []
+
+
+def test_removed_docs_score_like_a_fresh_index():
+    index = BM25Index.from_texts(TEXTS)
+    index.remove(1, TEXTS[1])
+    index.remove(4, TEXTS[4])
+
+    fresh = BM25Index.from_texts([None if i in (1, 4) else t for i, t in enumerate(TEXTS)])
+    assert index.size() == fresh.size() == 3
+    for query in QUERIES:
+        assert_same_results(index.search(query, 5), fresh.search(query, 5))
+
+
+def test_compacted_drops_tombstones_without_changing_results():
+    index = BM25Index.from_texts(TEXTS)
+    index.remove(0, TEXTS[0])
+    index.remove(3, TEXTS[3])
+    assert index.compaction_due()
+
+    compacted = index.compacted()
+
+    assert not compacted.compaction_due()
+    for query in QUERIES:
+        assert_same_results(compacted.search(query, 5), index.search(query, 5))
+    # The original keeps serving unchanged.
+    assert index.size() == compacted.size() == 3
+
+
+def test_reused_doc_id_does_not_bring_back_old_postings():
+    index = BM25Index.from_texts(TEXTS)
+    index.remove(2, TEXTS[2])
+    index.add(["Travel bookings go through Egencia"], [2])
+
+    assert index.search("expense concur") == []
+    assert [doc for doc, _ in index.search("travel egencia")] == [2]
+
+
+@pytest.mark.parametrize("mmap_files", [True, False])
+def test_save_load_round_trip(tmp_path, mmap_files):
+    index = BM25Index.from_texts(TEXTS)
+    index.remove(1, TEXTS[1])
+    index.save(tmp_path)
+
+    loaded = BM25Index.load(tmp_path, mmap_files=mmap_files)
+
+    assert loaded.size() == index.size()
+    for query in QUERIES:
+        assert_same_results(loaded.search(query, 5), index.search(query, 5))
+
+
+def test_loaded_index_accepts_adds_and_removes(tmp_path):
+    BM25Index.from_texts(TEXTS).save(tmp_path)
+    loaded = BM25Index.load(tmp_path)
+
+    extra = "Order a second monitor from the VPN-free hardware catalogue"
+    loaded.add([extra], [len(TEXTS)])
+    loaded.remove(0, TEXTS[0])
+
+    fresh = BM25Index.from_texts([None] + TEXTS[1:] + [extra])
+    for query in QUERIES + ["monitor hardware"]:
+        assert_same_results(loaded.search(query, 5), fresh.search(query, 5))
+    # The files on disk still hold the saved postings.
+    assert BM25Index.load(tmp_path).size() == len(TEXTS)
+
+
+def test_copy_is_independent():
+    index = BM25Index.from_texts(TEXTS)
+    copy = index.copy()
+
+    copy.remove(0, TEXTS[0])
+    copy.add(["Benefits enrolment closes in March"], [len(TEXTS)])
+
+    assert index.size() == len(TEXTS)
+    assert index.search("benefits enrolment") == []
+    assert [doc for doc, _ in copy.search("benefits enrolment")] == [len(TEXTS)]
+    assert 0 in [doc for doc, _ in index.search("vpn access portal")]
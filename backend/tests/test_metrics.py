@@ -0,0 +1,40 @@
+from app.answer_cache import AnswerCache
+from app.metrics import CACHE_REQUESTS, REGISTRY, Counter, Histogram
+
+
+def test_counter_and_histogram_render_in_prometheus_format():
+    counter = Counter("test_calls_total", "Calls.", ("outcome",))
+    counter.inc(outcome="ok")
+    counter.inc(2, outcome="ok")
+    histogram = Histogram("test_seconds", "Latency.", buckets=(0.1, 1.0))
+    histogram.observe(0.5)
+
+    assert counter.render() == [
+        "# HELP test_calls_total Calls.",
+        "# TYPE test_calls_total counter",
+        'test_calls_total{outcome="ok"} 3.0',
+    ]
+    assert histogram.render()[2:] == [
+        'test_seconds_bucket{le="0.1"} 0',
+        'test_seconds_bucket{le="1.0"} 1',
+        'test_seconds_bucket{le="+Inf"} 1',
+        "test_seconds_sum 0.5",
+        "test_seconds_count 1",
+    ]
+
+
+def test_cache_lookups_are_counted_as_they_happen():
+    cache = AnswerCache(max_entries=10, ttl=60.0, similarity=0.9)
+    before = {
+        outcome: CACHE_REQUESTS.value(cache="answer", outcome=outcome)
+        for outcome in ("exact_hit", "semantic_hit", "miss")
+    }
+    cache.put("VPN?", [1.0, 0.0], "Use the IT Service Hub.", version=1)
+
+    cache.get_exact("VPN?", version=1)
+    cache.get_similar([1.0, 0.0], version=1)
+    cache.get_similar([0.0, 1.0], version=1)
+
+    for outcome in before:
+        assert CACHE_REQUESTS.value(cache="answer", outcome=outcome) == before[outcome] + 1
+    assert "# TYPE rag_cache_requests_total counter" in REGISTRY.render()
@@ -0,0 +1,179 @@
+from pathlib import Path
+from typing import List, Optional
+
+import pytest
+
+from app import pdf_pipeline
+from app.pdf_pipeline import extract_pdf_text, iter_pdf_pages, peak_rss_mb
+
+
+def write_pdf(path: Path, pages: List[Optional[str]], link: Optional[str] = None) -> Path:
+    """
+    Write a minimal PDF with one text line per page; None gives a page with
+    no text layer. `link` adds a URI link annotation to the first page.
+    """
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page objects are numbered
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for i, text in enumerate(pages):
+        content = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET" if text is not None else ""
+        objects.append(f"<< /Length {len(content)} >>\nstream\n{content}\nendstream")
+        annots = ""
+        if link and i == 0:
+            objects.append(
+                f"<< /Type /Annot /Subtype /Link /Rect [72 700 300 730] "
+                f"/A << /S /URI /URI ({link}) >> >>"
+            )
+            annots = f" /Annots [{len(objects)} 0 R]"
+            content_ref = len(objects) - 1
+        else:
+            content_ref = len(objects)
+        objects.append(
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_ref} 0 R{annots} >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    path.write_bytes(out)
+    return path
+
+
+@pytest.fixture
+def no_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(pdf_pipeline, "PDF_CACHE_ENABLED", False)
+    monkeypatch.setattr(pdf_pipeline, "PDF_CACHE_DIR", str(tmp_path / "cache"))
+
+
+def test_extract_pdf_text_returns_every_page_with_its_links(tmp_path):
+    pdf = write_pdf(tmp_path / "vpn.pdf", ["Request VPN access", None], link="https://it.example.com/vpn")
+
+    first, blank = extract_pdf_text(str(pdf))
+
+    assert first[0] == 0 and "Request VPN access" in first[1]
+    assert "[Link: https://it.example.com/vpn]" in first[2]
+    assert blank == (1, "", "")
+
+
+def test_pages_come_back_in_file_and_page_order(tmp_path, no_cache):
+    files = [
+        write_pdf(tmp_path / f"guide{n}.pdf", [f"Guide {n} step {step}" for step in "abc"])
+        for n in range(4)
+    ]
+
+    pages = list(iter_pdf_pages(files, workers=2))
+
+    assert [p["id"] for p in pages] == [f"guide{n}.pdf-page-{i}" for n in range(4) for i in range(3)]
+    assert all(p["title"] == p["id"].split("-page-")[0] for p in pages)
+    assert "Guide 2 step b" in pages[7]["text"]
+
+
+def test_links_are_appended_to_the_page_text(tmp_path, no_cache):
+    pdf = write_pdf(tmp_path / "vpn.pdf", ["Request VPN access"], link="https://it.example.com/vpn")
+
+    [page] = iter_pdf_pages([pdf], workers=1)
+
+    assert page["text"].endswith("[Link: https://it.example.com/vpn]\n")
+
+
+def test_pages_left_without_text_are_skipped(tmp_path, no_cache):
+    # No OCR engine here, so the blank page's OCR fails and it stays empty.
+    pdf = write_pdf(tmp_path / "scan.pdf", ["Cover page", None, "Back page"])
+
+    pages = list(iter_pdf_pages([pdf], workers=2))
+
+    assert [p["id"] for p in pages] == ["scan.pdf-page-0", "scan.pdf-page-2"]
+
+
+def test_peak_rss_reports_this_process():
+    rss = peak_rss_mb()
+    if pdf_pipeline.resource is None:
+        assert rss is None
+    else:
+        own, children = rss
+        assert own > 0 and children >= 0
+
+
+@pytest.fixture
+def cache_dir(monkeypatch, tmp_path) -> Path:
+    monkeypatch.setattr(pdf_pipeline, "PDF_CACHE_ENABLED", True)
+    monkeypatch.setattr(pdf_pipeline, "PDF_CACHE_DIR", str(tmp_path / "cache"))
+    return tmp_path / "cache"
+
+
+def test_extraction_key_follows_content_and_ocr_settings(tmp_path, monkeypatch):
+    pdf = write_pdf(tmp_path / "vpn.pdf", ["Request VPN access"])
+    key = pdf_pipeline.extraction_key(pdf)
+
+    assert pdf_pipeline.extraction_key(pdf) == key
+    write_pdf(pdf, ["Request VPN access today"])
+    edited = pdf_pipeline.extraction_key(pdf)
+    assert edited != key
+    monkeypatch.setattr(pdf_pipeline, "OCR_DPI", pdf_pipeline.OCR_DPI + 100)
+    assert pdf_pipeline.extraction_key(pdf) not in (key, edited)
+
+
+def test_cached_pages_round_trip_under_their_key(tmp_path, cache_dir):
+    pdf = write_pdf(tmp_path / "vpn.pdf", ["Request VPN access"])
+    pages = [{"id": "vpn.pdf-page-0", "title": "vpn.pdf", "text": "Request VPN access"}]
+
+    pdf_pipeline.store_cached_pages(pdf, "key1", pages)
+
+    assert pdf_pipeline.load_cached_pages(pdf, "key1") == pages
+    assert pdf_pipeline.load_cached_pages(pdf, "key2") is None
+
+
+def test_second_run_is_served_from_the_cache(tmp_path, cache_dir):
+    pdf = write_pdf(tmp_path / "vpn.pdf", ["Request VPN access"])
+    first = list(iter_pdf_pages([pdf], workers=1))
+    [cache_file] = cache_dir.glob("*.json")
+    # Edit the cached extraction to tell a cache hit from a re-extraction.
+    cache_file.write_text(cache_file.read_text().replace("Request", "Cached"))
+
+    second = list(iter_pdf_pages([pdf], workers=1))
+
+    assert [p["id"] for p in second] == [p["id"] for p in first]
+    assert second[0]["text"].startswith("Cached VPN access")
+
+
+def test_changed_file_is_re_extracted_and_replaces_its_cache_entry(tmp_path, cache_dir):
+    pdf = write_pdf(tmp_path / "vpn.pdf", ["Request VPN access"])
+    list(iter_pdf_pages([pdf], workers=1))
+    write_pdf(pdf, ["Request VPN access from IT"])
+
+    [page] = iter_pdf_pages([pdf], workers=1)
+
+    assert "from IT" in page["text"]
+    [cache_file] = cache_dir.glob("*.json")
+    assert cache_file.name.endswith(f".{pdf_pipeline.extraction_key(pdf)}.json")
+
+
+def test_file_whose_ocr_failed_is_not_cached(tmp_path, cache_dir):
+    # No OCR engine here, so OCR of the page without a text layer fails.
+    scan = write_pdf(tmp_path / "scan.pdf", ["Cover page", None])
+    text_only = write_pdf(tmp_path / "vpn.pdf", ["Request VPN access"])
+
+    list(iter_pdf_pages([scan, text_only], workers=2))
+
+    assert pdf_pipeline.load_cached_pages(scan, pdf_pipeline.extraction_key(scan)) is None
+    assert pdf_pipeline.load_cached_pages(text_only, pdf_pipeline.extraction_key(text_only)) is not None
+
+
+def test_nothing_is_written_when_the_cache_is_disabled(tmp_path, no_cache):
+    pdf = write_pdf(tmp_path / "vpn.pdf", ["Request VPN access"])
+
+    list(iter_pdf_pages([pdf], workers=1))
+
+    assert not (tmp_path / "cache").exists()
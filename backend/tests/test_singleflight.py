@@ -0,0 +1,139 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.metrics import COALESCED_CALLS
+from app.singleflight import AsyncSingleFlight, SingleFlight
+
+
+def test_concurrent_calls_share_one_result():
+    flight = SingleFlight("test_share", enabled=True)
+    release = threading.Event()
+    started = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {"answer": 42}
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        leader = pool.submit(flight.do, "q", slow)
+        started.wait(5)
+        followers = [pool.submit(flight.do, "q", slow) for _ in range(3)]
+        while COALESCED_CALLS.value(call="test_share") < 3:
+            pass
+        release.set()
+        results = [leader.result()] + [f.result() for f in followers]
+
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+    # Once finished, the next call runs again.
+    assert flight.do("q", lambda: "fresh") == "fresh"
+
+
+def test_joined_calls_get_the_leaders_exception():
+    flight = SingleFlight("test_error", enabled=True)
+    release = threading.Event()
+    started = threading.Event()
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise ValueError("bedrock down")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flight.do, "q", failing)
+        started.wait(5)
+        follower = pool.submit(flight.do, "q", failing)
+        while COALESCED_CALLS.value(call="test_error") < 1:
+            pass
+        release.set()
+        for future in (leader, follower):
+            with pytest.raises(ValueError, match="bedrock down"):
+                future.result()
+
+
+def test_disabled_flight_calls_every_time():
+    flight = SingleFlight("test_disabled", enabled=False)
+    calls = []
+    for _ in range(3):
+        flight.do("q", lambda: calls.append(1))
+    assert len(calls) == 3
+
+
+def test_async_do_runs_once_for_identical_requests():
+    flight = AsyncSingleFlight("test_async_do", enabled=True)
+    calls = []
+
+    async def answer():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def main():
+        return await asyncio.gather(*(flight.do("q", answer) for _ in range(5)))
+
+    results = asyncio.run(main())
+
+    assert len(calls) == 1
+    assert [r for r, _ in results] == ["answer"] * 5
+    assert sorted(joined for _, joined in results) == [False] + [True] * 4
+
+
+def test_async_stream_replays_events_to_late_joiners():
+    flight = AsyncSingleFlight("test_async_stream", enabled=True)
+    produced = []
+
+    async def events():
+        for i in range(3):
+            produced.append(i)
+            yield i
+            await asyncio.sleep(0.01)
+
+    async def consume(events):
+        return [event async for event in events]
+
+    async def main():
+        first, joined_first = flight.stream("q", events)
+        first_task = asyncio.ensure_future(consume(first))
+        await asyncio.sleep(0.015)
+        second, joined_second = flight.stream("q", events)
+        return await first_task, await consume(second), joined_first, joined_second
+
+    first, second, joined_first, joined_second = asyncio.run(main())
+
+    assert first == second == [0, 1, 2]
+    assert produced == [0, 1, 2]
+    assert (joined_first, joined_second) == (False, True)
+
+
+def test_async_stream_is_cancelled_once_every_consumer_left():
+    flight = AsyncSingleFlight("test_async_cancel", enabled=True)
+
+    async def main():
+        done = asyncio.Event()
+
+        async def events():
+            try:
+                for i in range(100):
+                    yield i
+                    await asyncio.sleep(0.01)
+            finally:
+                done.set()
+
+        stream, _ = flight.stream("q", events)
+        async for event in stream:
+            if event == 1:
+                break
+        await stream.aclose()
+        await asyncio.wait_for(done.wait(), 1)
+        # A new request starts a fresh stream rather than joining the dead one.
+        fresh, joined = flight.stream("q", events)
+        await fresh.aclose()
+        return joined
+
+    assert asyncio.run(main()) is False
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from app.llm import StreamingPostProcessor, _post_process_answer
+
+URL = "https://informa.service-now.com/iportal?id=sc_home"
+
+ANSWERS = [
+    "Raise a ticket in the IT Service Hub and wait for approval.",
+    "  Open the Informa IT Service Hub, then pick Access Requests.",
+    f"Use the IT Service Hub ({URL}) to request it.",
+    f"The portal lives at {URL}; the IT Service Hub team owns it.",
+    "Ask your manager, then the it service hub, then the IT Service Hub again.",
+    "Nothing to link here.",
+    "Ends with the IT Service Hub",
+]
+
+
+def stream(answer: str, sizes) -> str:
+    post = StreamingPostProcessor()
+    out, i, n = [], 0, 0
+    while i < len(answer):
+        size = sizes[n % len(sizes)]
+        out.append(post.feed(answer[i:i + size]))
+        i, n = i + size, n + 1
+    out.append(post.finish())
+    return "".join(out)
+
+
+@pytest.mark.parametrize("answer", ANSWERS)
+@pytest.mark.parametrize("sizes", [[1], [3, 7], [len(max(ANSWERS, key=len))]])
+def test_streamed_answer_matches_post_processed_answer(answer, sizes):
+    assert stream(answer, sizes) == _post_process_answer(answer.strip())
+
+
+def test_url_is_injected_once_after_first_mention():
+    text = stream("IT Service Hub first, IT Service Hub second.", [2])
+    assert text == f"IT Service Hub ({URL}) first, IT Service Hub second."
+
+
+def test_service_name_split_across_deltas_is_recognised():
+    post = StreamingPostProcessor()
+    emitted = post.feed("Go to the IT Serv")
+    # The partial name is held back until the rest arrives.
+    assert "Serv" not in emitted
+    emitted += post.feed("ice Hub now.") + post.finish()
+    assert emitted == f"Go to the IT Service Hub ({URL}) now."
+
+
+@pytest.mark.parametrize("stage", ["_lookup_cached_answer", "_retrieve_context"])
+def test_stream_ends_with_error_event_when_a_stage_fails(monkeypatch, stage):
+    from app import main
+    from app.metrics import ANSWERS
+    from app.shards import ShardView
+
+    def fail(*args):
+        raise RuntimeError("bedrock unavailable")
+
+    monkeypatch.setattr(main, "_lookup_cached_answer", lambda *args: (None, None, None, 0, {}))
+    monkeypatch.setattr(main, stage, fail)
+    errors = ANSWERS.value(endpoint="stream", result="error")
+
+    async def collect():
+        corpus = ShardView([], version=0, scope="")
+        return [item async for item in main._stream_events("How do I get VPN?", False, corpus)]
+
+    events = asyncio.run(collect())
+
+    assert events == [({"error": "bedrock unavailable"}, "error")]
+    assert ANSWERS.value(endpoint="stream", result="error") == errors + 1
@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+from botocore.exceptions import ClientError
+
+from app import embeddings, throttle
+from app.config import BEDROCK_EMBED_MODEL
+from app.metrics import BEDROCK_CALLS
+from app.throttle import TokenBucket, call_with_backoff
+from benchmarks import fake_bedrock
+
+
+class Clock:
+    """Stands in for the time module: sleep() advances monotonic() instantly."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(throttle, "time", clock)
+    return clock
+
+
+def throttling_error() -> ClientError:
+    return ClientError({"Error": {"Code": "ThrottlingException"}}, "InvokeModel")
+
+
+def test_bucket_allows_a_burst_then_holds_callers_to_the_rate(clock):
+    bucket = TokenBucket(rate=10, capacity=3)
+
+    for _ in range(3):
+        bucket.acquire()
+    assert clock.sleeps == []
+
+    bucket.acquire()
+    assert clock.sleeps == [pytest.approx(0.1)]
+
+    clock.now += 1.0
+    for _ in range(3):
+        bucket.acquire()
+    assert len(clock.sleeps) == 1
+
+
+def test_zero_rate_disables_limiting(clock):
+    bucket = TokenBucket(rate=0)
+    for _ in range(100):
+        bucket.acquire()
+    assert clock.sleeps == []
+
+
+def test_backoff_retries_retryable_errors_with_capped_exponential_delays(clock, monkeypatch):
+    monkeypatch.setattr(throttle.random, "uniform", lambda low, high: high)
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 5:
+            raise throttling_error()
+        return "ok"
+
+    result = call_with_backoff(flaky, lambda e: True, max_retries=6, base_delay=0.5, max_delay=3.0)
+
+    assert result == "ok"
+    assert clock.sleeps == [0.5, 1.0, 2.0, 3.0]
+
+
+def test_backoff_gives_up_after_max_retries(clock):
+    def throttled():
+        raise throttling_error()
+
+    with pytest.raises(ClientError):
+        call_with_backoff(throttled, lambda e: True, max_retries=2, base_delay=0.1)
+    assert len(clock.sleeps) == 2
+
+
+def test_backoff_does_not_retry_other_errors(clock):
+    def broken():
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        call_with_backoff(broken, lambda e: False, max_retries=5, base_delay=0.1)
+    assert clock.sleeps == []
+
+
+class ThrottlingBedrock(fake_bedrock.FakeBedrockClient):
+    """Throttles every other embedding call."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.throttled = 0
+
+    def invoke_model(self, modelId, body, accept=None, contentType=None):
+        with self._lock:
+            throttle_this = (self.embed_calls + self.throttled) % 2 == 0
+            if throttle_this:
+                self.throttled += 1
+        if throttle_this:
+            raise throttling_error()
+        return super().invoke_model(modelId, body, accept, contentType)
+
+
+def test_embed_texts_retries_throttled_calls_and_keeps_order(monkeypatch):
+    client = fake_bedrock.install(ThrottlingBedrock(dim=64))
+    monkeypatch.setattr(embeddings, "EMBED_BACKOFF_BASE", 0.001)
+    texts = [f"onboarding question {word}" for word in "abcdefghijklmnop"]
+    throttled = BEDROCK_CALLS.value(model=BEDROCK_EMBED_MODEL, outcome="throttled")
+
+    vectors = embeddings.embed_texts(texts)
+
+    assert client.throttled >= 1
+    assert BEDROCK_CALLS.value(model=BEDROCK_EMBED_MODEL, outcome="throttled") == throttled + client.throttled
+    assert client.embed_calls == len(texts)
+    expected = np.stack([fake_bedrock.fake_embedding(t, 64) for t in texts])
+    np.testing.assert_array_equal(vectors, expected)
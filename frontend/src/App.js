@@ -1,11 +1,12 @@
 import React, { useState, useEffect, useRef } from "react";
 import ChatMessage from "./ChatMessage";
-import { askQuestion } from "./api";
+import { askQuestionStream } from "./api";
 
 function App() {
   const [input, setInput] = useState("");
   const [messages, setMessages] = useState([]);
   const [loading, setLoading] = useState(false);
+  const [streaming, setStreaming] = useState(false);
   const [error, setError] = useState("");
   const messagesEndRef = useRef(null);
 
@@ -20,16 +21,34 @@ function App() {
   const handleSubmit = async (e) => {
     e.preventDefault();
     const q = input.trim();
-    if (!q || loading) return;
+    if (!q || loading || streaming) return;
 
     setError("");
     setLoading(true);
+    setStreaming(true);
     setInput("");
     setMessages((prev) => [...prev, { role: "user", text: q }]);
 
+    // Render the answer token by token: the first delta replaces the
+    // "Thinking..." bubble, later ones are appended to the same message.
+    let started = false;
+    const appendDelta = (delta) => {
+      if (!started) {
+        started = true;
+        setLoading(false);
+        setMessages((prev) => [...prev, { role: "assistant", text: delta }]);
+        return;
+      }
+      setMessages((prev) => {
+        const next = prev.slice();
+        const last = next[next.length - 1];
+        next[next.length - 1] = { ...last, text: last.text + delta };
+        return next;
+      });
+    };
+
     try {
-      const answer = await askQuestion(q);
-      setMessages((prev) => [...prev, { role: "assistant", text: answer }]);
+      await askQuestionStream(q, appendDelta);
     } catch (err) {
       console.error(err);
       setError("Failed to reach backend. Is it running on port 8000?");
@@ -42,6 +61,7 @@ function App() {
       ]);
     } finally {
       setLoading(false);
+      setStreaming(false);
     }
   };
 
@@ -176,7 +196,7 @@ function App() {
           />
           <button
             type="submit"
-            disabled={loading || !input.trim()}
+            disabled={loading || streaming || !input.trim()}
             style={{
               padding: "10px 16px",
               borderRadius: 999,
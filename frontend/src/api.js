@@ -17,3 +17,59 @@ export async function askQuestion(question) {
 }
 
 
+
+// Streams the answer from /ask/stream (Server-Sent Events over a POST),
+// calling onDelta with each text fragment as it arrives.
+// Resolves with the full answer text once the stream completes.
+export async function askQuestionStream(question, onDelta) {
+  const resp = await fetch("http://localhost:8001/ask/stream", {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+      Accept: "text/event-stream",
+    },
+    body: JSON.stringify({ question }),
+  });
+
+  if (!resp.ok || !resp.body) {
+    const text = await resp.text();
+    throw new Error(`Backend error ${resp.status}: ${text}`);
+  }
+
+  const reader = resp.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let answer = "";
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // SSE events are separated by a blank line.
+    let sep;
+    while ((sep = buffer.indexOf("\n\n")) !== -1) {
+      const rawEvent = buffer.slice(0, sep);
+      buffer = buffer.slice(sep + 2);
+
+      let event = "message";
+      let data = "";
+      for (const line of rawEvent.split("\n")) {
+        if (line.startsWith("event:")) event = line.slice(6).trim();
+        else if (line.startsWith("data:")) data += line.slice(5).trim();
+      }
+      if (!data) continue;
+
+      const payload = JSON.parse(data);
+      if (event === "error") {
+        throw new Error(payload.error || "Streaming failed");
+      }
+      if (event === "message" && payload.delta) {
+        answer += payload.delta;
+        onDelta(payload.delta);
+      }
+    }
+  }
+
+  return answer;
+}